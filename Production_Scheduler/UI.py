@@ -1,11 +1,25 @@
 import streamlit as st
 import pandas as pd
+import math
+import uuid
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
-from or_tools import solve_schedule
+from or_tools import default_solver_config, SEARCH_BRANCHINGS
+from dispatching import solve_dispatch_best
+from streaming import SolveStream
+from cache import get_default_cache, make_cache_key
+from gantt import gantt_figure, DETAIL_LIMIT as GANTT_DETAIL_LIMIT
+from data_io import import_data, export_data, export_schedule, parquet_available, KINDS as DATA_KINDS, \
+    FORMATS as DATA_FORMATS
+from setup_matrix import as_setup_matrix
 from demodata import get_demo_data
 from large_demodata import get_large_demo_data, get_extreme_large_demo_data
 from time import time as get_time
+import logging
+import os
+
+# Solver log output (the "Log Search Progress" option logs to 'or_tools.search')
+logging.basicConfig(level=os.environ.get('SCHEDULER_LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
 
 st.set_page_config(page_title="Production Scheduler", layout="wide")
 
@@ -20,6 +34,166 @@ if 'setup_times' not in st.session_state:
     st.session_state.setup_times = {}
 if 'orders' not in st.session_state:
     st.session_state.orders = []
+if 'solver_config' not in st.session_state:
+    st.session_state.solver_config = default_solver_config()
+if 'orders_version' not in st.session_state:
+    st.session_state.orders_version = 0  # Bumped when the order list is replaced outside the editor
+
+# Entries per page in the master-data lists
+PAGE_SIZE = 20
+
+
+def paginate(items, key):
+    """
+    Offset and items of the current page, with a page selector for long lists.
+    """
+    pages = max(1, math.ceil(len(items) / PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=key) if pages > 1 else 1
+    offset = (min(page, pages) - 1) * PAGE_SIZE
+    return offset, items[offset:offset + PAGE_SIZE]
+
+
+def replace_orders(orders):
+    # Replaces the order list and resets the order editor to it
+    st.session_state.orders = orders
+    st.session_state.orders_version += 1
+
+
+def store_result(result):
+    # Every result gets its own key, so the cached table and chart views
+    # below never hash the schedule itself (the caches are shared by sessions)
+    st.session_state.result = result
+    st.session_state.result_key = uuid.uuid4().hex
+
+
+def session_inputs_key(start_datetime):
+    """
+    Hash of the current machines, products, setup times, orders and solver settings.
+    """
+    return make_cache_key(st.session_state.machines, st.session_state.products, st.session_state.setup_times,
+                          st.session_state.orders, solver_config=st.session_state.solver_config,
+                          start_time=start_datetime)
+
+
+# Memoized views: explicit keys instead of hashing large arguments
+# (arguments starting with an underscore are not hashed by st.cache_data)
+@st.cache_data(max_entries=4, show_spinner=False)
+def dispatch_preview(inputs_key, start_time, _machines, _products, _setup_times, _orders):
+    return solve_dispatch_best(_machines, _products, _setup_times, _orders, start_time)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def schedule_table(result_key, _schedule):
+    return pd.DataFrame(_schedule)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def gantt_chart(result_key, window, _schedule, start_datetime):
+    return gantt_figure(_schedule, start_datetime, window=window)
+
+
+# Long lists are rendered in fragments: their widgets rerun only the fragment
+@st.fragment
+def machine_list():
+    if not st.session_state.machines:
+        st.info("No machines added yet")
+        return
+    offset, page = paginate(st.session_state.machines, 'machine_page')
+    for idx, machine in enumerate(page, start=offset):
+        with st.expander(f"{machine['name']}"):
+            st.write(f"**Operations:** {', '.join(machine['operations'])}")
+            if st.button(f"Remove", key=f"remove_machine_{idx}"):
+                st.session_state.machines.pop(idx)
+                st.rerun()
+
+
+@st.fragment
+def product_list():
+    if not st.session_state.products:
+        st.info("No products added yet")
+        return
+    offset, page = paginate(st.session_state.products, 'product_page')
+    for idx, product in enumerate(page, start=offset):
+        with st.expander(f"{product['name']}"):
+            for task in product['tasks']:
+                st.write(f"- {task['operation']}: {task['duration']}h")
+            if st.button(f"Remove", key=f"remove_product_{idx}"):
+                st.session_state.products.pop(idx)
+                st.rerun()
+
+
+@st.fragment
+def order_editor():
+    """
+    Editable order table. The grid is virtualized and a cell edit only reruns
+    this fragment; adding or deleting rows reruns the app (order counts).
+    """
+    if not st.session_state.orders:
+        st.info("No orders added yet")
+        return
+    # The editor keeps its edits relative to the frame it started from, so
+    # that frame only changes together with the widget key
+    version = st.session_state.orders_version
+    if st.session_state.get('orders_frame_version') != version:
+        st.session_state.orders_frame = pd.DataFrame(st.session_state.orders,
+                                                     columns=['product', 'quantity', 'deadline'])
+        st.session_state.orders_frame_version = version
+    product_names = [p['name'] for p in st.session_state.products]
+    edited = st.data_editor(
+        st.session_state.orders_frame, key=f"order_editor_{version}", num_rows="dynamic", width="stretch",
+        column_config={
+            'product': st.column_config.SelectboxColumn("Product", options=product_names, required=True),
+            'quantity': st.column_config.NumberColumn("Quantity", min_value=1, step=1, required=True),
+            'deadline': st.column_config.NumberColumn("Deadline (h)", min_value=1, step=1, required=True),
+        })
+    orders = [{'product': row.product, 'quantity': int(row.quantity), 'deadline': int(row.deadline)}
+              for row in edited.dropna().itertuples()]
+    resized = len(orders) != len(st.session_state.orders)
+    st.session_state.orders = orders
+    if resized:
+        st.rerun()
+
+
+@st.fragment
+def result_view():
+    """
+    Schedule table and Gantt chart of the current result; the chart button and
+    window slider only rerun this fragment, and table and figure come from
+    the cache as long as the result is unchanged.
+    """
+    result = st.session_state.result
+    result_key = st.session_state.get('result_key', '')
+
+    st.subheader("Schedule Details")
+    st.dataframe(schedule_table(result_key, result['schedule']), width="stretch")
+
+    # Gantt Chart Visualization - Button to generate
+    st.write("---")
+    if st.button("Generate Gantt Chart Visualization", type="secondary", width="stretch"):
+        st.session_state.show_gantt = True
+    if st.session_state.get('show_gantt') and result['schedule']:
+        # Large schedules are drawn aggregated; a time window shows
+        # part of the horizon at full detail
+        window = None
+        if len(result['schedule']) > GANTT_DETAIL_LIMIT:
+            makespan = max(1, result['makespan'])
+            window = st.slider("Gantt window (hours from start)", 0, makespan, (0, makespan))
+            if window == (0, makespan):
+                window = None
+        with st.spinner("Generating Gantt chart..."):
+            fig, gantt_info = gantt_chart(result_key, window, result['schedule'], result['start_datetime'])
+        if gantt_info['merged']:
+            st.caption(f"{gantt_info['tasks']} tasks drawn as {gantt_info['blocks']} merged blocks - "
+                       f"narrow the window for full detail")
+        st.plotly_chart(fig, width="stretch")
+
+    # Files are only written when a download button is clicked; Parquet needs pyarrow
+    if parquet_available():
+        st.download_button("Download Schedule (Parquet)", data=lambda: export_schedule(result),
+                           file_name="schedule.parquet", mime="application/vnd.apache.parquet")
+    else:
+        st.download_button("Download Schedule (CSV)", data=lambda: export_schedule(result, format='csv'),
+                           file_name="schedule.csv", mime="text/csv")
 
 # Create tabs for different sections
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["Machines", "Products", "Setup Times", "Orders", "Schedule"])
@@ -49,15 +223,7 @@ with tab1:
 
     with col2:
         st.subheader("Current Machines")
-        if st.session_state.machines:
-            for idx, machine in enumerate(st.session_state.machines):
-                with st.expander(f"{machine['name']}"):
-                    st.write(f"**Operations:** {', '.join(machine['operations'])}")
-                    if st.button(f"Remove", key=f"remove_machine_{idx}"):
-                        st.session_state.machines.pop(idx)
-                        st.rerun()
-        else:
-            st.info("No machines added yet")
+        machine_list()
 
 # ==================== TAB 2: PRODUCTS ====================
 with tab2:
@@ -95,16 +261,7 @@ with tab2:
 
     with col2:
         st.subheader("Current Products")
-        if st.session_state.products:
-            for idx, product in enumerate(st.session_state.products):
-                with st.expander(f"{product['name']}"):
-                    for task in product['tasks']:
-                        st.write(f"- {task['operation']}: {task['duration']}h")
-                    if st.button(f"Remove", key=f"remove_product_{idx}"):
-                        st.session_state.products.pop(idx)
-                        st.rerun()
-        else:
-            st.info("No products added yet")
+        product_list()
 
 # ==================== TAB 3: SETUP TIMES ====================
 with tab3:
@@ -133,9 +290,10 @@ with tab3:
         with col2:
             st.subheader("Current Setup Times")
             if st.session_state.setup_times:
-                for key, time in st.session_state.setup_times.items():
-                    from_p, to_p = key.split('-')
-                    st.write(f"{from_p} → {to_p}: {time}h")
+                # Keys are split against the product names, so hyphenated names work
+                setup_matrix = as_setup_matrix(st.session_state.setup_times, st.session_state.products)
+                st.dataframe(pd.DataFrame(list(setup_matrix.items()), columns=["From", "To", "Hours"]),
+                             hide_index=True, width="stretch")
             else:
                 st.info("No setup times defined")
     else:
@@ -156,27 +314,17 @@ with tab4:
                 deadline = st.number_input("Deadline (hours from start)", min_value=1, value=100)
 
                 if st.form_submit_button("Add Order"):
-                    st.session_state.orders.append({
+                    replace_orders(st.session_state.orders + [{
                         'product': order_product,
                         'quantity': quantity,
                         'deadline': deadline
-                    })
+                    }])
                     st.success(f"Order added: {quantity} x {order_product}")
                     st.rerun()
 
         with col2:
             st.subheader("Current Orders")
-            if st.session_state.orders:
-                for idx, order in enumerate(st.session_state.orders):
-                    with st.expander(f"Order {idx+1}"):
-                        st.write(f"**Product:** {order['product']}")
-                        st.write(f"**Quantity:** {order['quantity']}")
-                        st.write(f"**Deadline:** {order['deadline']}h")
-                        if st.button(f"Remove", key=f"remove_order_{idx}"):
-                            st.session_state.orders.pop(idx)
-                            st.rerun()
-            else:
-                st.info("No orders added yet")
+            order_editor()
     else:
         st.info("Please add products first")
 
@@ -186,6 +334,9 @@ with tab5:
 
     col1, col2 = st.columns([1, 2])
 
+    with col2:
+        live_view = st.empty()  # Objective, gap and solution count while the solver runs
+
     with col1:
         start_datetime = st.date_input("Production Start Date", value=datetime.now())
         start_time_input = st.time_input("Production Start Time", value=datetime.now().time())
@@ -197,6 +348,10 @@ with tab5:
         st.write(f"**Products:** {len(st.session_state.products)}")
         st.write(f"**Orders:** {len(st.session_state.orders)}")
 
+        # Reuse the previous schedule (or a dispatching-rule schedule on the
+        # first run) as solution hints
+        warm_start_enabled = st.checkbox("Warm start from previous schedule", value=True)
+
         if st.button("Run Scheduler", type="primary", width="stretch"):
             if not st.session_state.machines:
                 st.error("Please add at least one machine")
@@ -206,18 +361,67 @@ with tab5:
                 st.error("Please add at least one order")
             else:
                 with st.spinner("Solving schedule..."):
+                    previous = st.session_state.get('result') if warm_start_enabled else None
                     start_solve_time = get_time()
-                    result = solve_schedule(
-                        st.session_state.machines,
-                        st.session_state.products,
-                        st.session_state.setup_times,
-                        st.session_state.orders,
-                        start_datetime_combined.isoformat()
-                    )
+
+                    # Identical problems (any start time) are answered from the cache
+                    solve_cache = get_default_cache()
+                    cache_key = session_inputs_key(start_datetime_combined)  # Start time only keyed with calendars
+                    result = solve_cache.get(cache_key, start_datetime_combined)
+
+                    if result is None:
+                        stream = SolveStream(
+                            st.session_state.machines,
+                            st.session_state.products,
+                            st.session_state.setup_times,
+                            st.session_state.orders,
+                            start_datetime_combined.isoformat(),
+                            diff=False,  # Schedules per solution cost an extraction each; the result has one
+                            solver_config=st.session_state.solver_config,
+                            warm_start=previous if previous and previous.get('schedule')
+                            else ('dispatch' if warm_start_enabled else None)
+                        )
+
+                        # Show the progress of improving solutions as they arrive
+                        # (redrawn at most once per second); the Gantt chart
+                        # follows with the result
+                        last_drawn = 0
+                        for kind, payload in stream:
+                            if kind == 'result':
+                                result = payload
+                                break
+                            if get_time() - last_drawn < 1:
+                                continue
+                            with live_view.container():
+                                st.subheader("Solving...")
+                                live_a, live_b, live_c, live_d = st.columns(4)
+                                live_a.metric("Best Objective", f"{payload['objective']:.0f}")
+                                live_b.metric("Gap to Bound", f"{payload['gap'] * 100:.1f}%")
+                                live_c.metric("Solutions", payload['solutions'])
+                                live_d.metric("Elapsed", f"{payload['elapsed']:.1f} s")
+                            last_drawn = get_time()
+                        live_view.empty()
+                        solve_cache.put(cache_key, result)
+
                     end_solve_time = get_time()
                     solve_duration = end_solve_time - start_solve_time
                     result['solve_time'] = solve_duration
-                    st.session_state.result = result
+                    store_result(result)
+
+        # Greedy dispatching rules: an instant (non-optimal) preview
+        if st.button("Instant Preview", width="stretch"):
+            if st.session_state.machines and st.session_state.products and st.session_state.orders:
+                inputs_key = session_inputs_key(start_datetime_combined)
+                store_result(dispatch_preview(
+                    inputs_key,
+                    start_datetime_combined.isoformat(),
+                    st.session_state.machines,
+                    st.session_state.products,
+                    st.session_state.setup_times,
+                    st.session_state.orders
+                ))
+            else:
+                st.error("Please add machines, products and orders first")
 
     with col2:
         if 'result' in st.session_state:
@@ -225,6 +429,9 @@ with tab5:
 
             if result['status'] in ['OPTIMAL', 'FEASIBLE', 'FEASIBLE_WITH_VIOLATIONS']:
                 col_a, col_b, col_c = st.columns(3)
+                if result.get('engine') == 'dispatch':
+                    st.info(f"Preview from the {result['rule']} dispatching rule - run the scheduler to optimize")
+
                 with col_a:
                     if result['status'] == 'FEASIBLE_WITH_VIOLATIONS':
                         st.warning(f"Status: {result['status']}")
@@ -236,6 +443,19 @@ with tab5:
                     solve_time = result.get('solve_time', 0)
                     st.metric("Solve Time", f"{solve_time:.2f} seconds")
 
+                if result.get('cache') in ('hit', 'rebased'):
+                    st.caption("Served from the solve cache (identical problem solved before)")
+                if result.get('warm_start'):
+                    warm = result['warm_start']
+                    st.caption(f"Warm start: {warm['hinted_tasks']} tasks hinted, "
+                               f"{warm['unmatched_tasks']} new")
+
+                # Input problems found before solving (skipped orders or steps)
+                validation = result.get('validation')
+                if validation and validation['errors']:
+                    st.error("Input problems - this work is not in the schedule:\n\n"
+                             + '\n'.join(f"- {issue['message']}" for issue in validation['errors'][:10]))
+
                 # Display deadline violations if any
                 if result.get('deadline_violations'):
                     st.error(f"⚠️ Deadline Violations Detected: {result.get('total_violation_hours', 0)} total hours late")
@@ -246,103 +466,7 @@ with tab5:
 
                     st.info("💡 The schedule shown below exceeds some deadlines. Consider: reducing order quantities, extending deadlines, or adding more machines.")
 
-                # Display schedule table
-                st.subheader("Schedule Details")
-                df = pd.DataFrame(result['schedule'])
-                st.dataframe(df, width="stretch")
-
-                # Gantt Chart Visualization - Button to generate
-                st.write("---")
-                if st.button("Generate Gantt Chart Visualization", type="secondary", use_container_width=True):
-                    if result['schedule']:
-                        with st.spinner("Generating Gantt chart..."):
-                            # Create Gantt chart using shapes
-                            fig = go.Figure()
-
-                            # Color map for products
-                            products_list = list(set([task['order'] for task in result['schedule']]))
-                            colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
-                                      '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-                            color_map = {product: colors[i % len(colors)] for i, product in enumerate(products_list)}
-
-                            # Get unique machines for Y-axis
-                            machines_list = sorted(list(set([task['machine'] for task in result['schedule']])))
-                            machine_to_y = {machine: i for i, machine in enumerate(machines_list)}
-
-                            # Add each task as a rectangle
-                            for task in result['schedule']:
-                                start_dt = datetime.strptime(task['start_datetime'], '%Y-%m-%d %H:%M')
-                                end_dt = datetime.strptime(task['end_datetime'], '%Y-%m-%d %H:%M')
-                                machine_y = machine_to_y[task['machine']]
-
-                                # Add rectangle for task
-                                fig.add_shape(
-                                    type="rect",
-                                    x0=start_dt,
-                                    x1=end_dt,
-                                    y0=machine_y - 0.4,
-                                    y1=machine_y + 0.4,
-                                    fillcolor=color_map[task['order']],
-                                    line=dict(color="black", width=1),
-                                )
-
-                                # Add text annotation
-                                fig.add_annotation(
-                                    x=start_dt + (end_dt - start_dt) / 2,
-                                    y=machine_y,
-                                    text=f"{task['order']}<br>{task['operation']}",
-                                    showarrow=False,
-                                    font=dict(color="white", size=10),
-                                    xanchor="center",
-                                    yanchor="middle"
-                                )
-
-                            # Add invisible scatter trace for hover info
-                            for task in result['schedule']:
-                                start_dt = datetime.strptime(task['start_datetime'], '%Y-%m-%d %H:%M')
-                                end_dt = datetime.strptime(task['end_datetime'], '%Y-%m-%d %H:%M')
-                                machine_y = machine_to_y[task['machine']]
-                                mid_time = start_dt + (end_dt - start_dt) / 2
-
-                                fig.add_trace(go.Scatter(
-                                    x=[mid_time],
-                                    y=[machine_y],
-                                    mode='markers',
-                                    marker=dict(size=0.1, opacity=0),
-                                    hovertemplate=(
-                                        f"<b>{task['order']}</b><br>"
-                                        f"Machine: {task['machine']}<br>"
-                                        f"Operation: {task['operation']}<br>"
-                                        f"Start: {task['start_datetime']}<br>"
-                                        f"End: {task['end_datetime']}<br>"
-                                        f"Duration: {task['duration']}h<br>"
-                                        f"Setup Time: {task.get('setup_time', 0)}h<br>"
-                                        "<extra></extra>"
-                                    ),
-                                    showlegend=False
-                                ))
-
-                            fig.update_layout(
-                                title="Production Schedule - Gantt Chart",
-                                xaxis_title="Time",
-                                yaxis_title="Machines",
-                                height=max(400, len(machines_list) * 80),
-                                showlegend=False,
-                                xaxis=dict(
-                                    showgrid=True,
-                                    type='date',
-                                    tickformat='%Y-%m-%d %H:%M'
-                                ),
-                                yaxis=dict(
-                                    showgrid=True,
-                                    tickmode='array',
-                                    tickvals=list(range(len(machines_list))),
-                                    ticktext=machines_list,
-                                    range=[-0.5, len(machines_list) - 0.5]
-                                )
-                            )
-
-                            st.plotly_chart(fig, use_container_width=True)
+                result_view()
 
             else:
                 st.error(f"Status: {result['status']}")
@@ -360,12 +484,62 @@ with st.sidebar:
 
     st.write("---")
 
+    # Solver settings (defaults come from the host's core count)
+    with st.expander("Solver Settings"):
+        config = st.session_state.solver_config
+        config['num_workers'] = st.number_input("Search Workers", min_value=1, max_value=256,
+                                                value=int(config['num_workers']))
+        config['time_limit'] = st.number_input("Time Limit (seconds)", min_value=1, max_value=3600,
+                                               value=int(config['time_limit']))
+        relative_gap = st.number_input("Relative Gap (%)", min_value=0.0, max_value=100.0,
+                                       value=float(config['relative_gap'] or 0) * 100, step=0.5)
+        config['relative_gap'] = relative_gap / 100 if relative_gap > 0 else None
+        absolute_gap = st.number_input("Absolute Gap (objective units, 0 = none)", min_value=0.0,
+                                       value=float(config['absolute_gap'] or 0), step=1.0)
+        config['absolute_gap'] = absolute_gap or None
+        branching_options = [None, *SEARCH_BRANCHINGS]
+        config['search_branching'] = st.selectbox(
+            "Search Branching", branching_options, index=branching_options.index(config['search_branching']),
+            format_func=lambda name: "Default" if name is None else name.replace('_', ' ').title())
+        random_seed = st.number_input("Random Seed (0 = none)", min_value=0,
+                                      value=int(config['random_seed'] or 0))
+        config['random_seed'] = random_seed or None
+        config['use_hints'] = st.checkbox("Use Solution Hints", value=config['use_hints'])
+        config['log_search_progress'] = st.checkbox("Log Search Progress", value=config['log_search_progress'])
+
+    # Bulk import / export (CSV, Parquet, JSON Lines; see data_io.py)
+    with st.expander("Import / Export"):
+        data_kind = st.selectbox("Data", DATA_KINDS, format_func=lambda kind: kind.replace('_', ' ').title())
+        upload_formats = [fmt for fmt in DATA_FORMATS if fmt != 'parquet' or parquet_available()]
+        upload = st.file_uploader("File", type=upload_formats, key=f"upload_{data_kind}")
+        if upload is not None and st.button("Import", width="stretch"):
+            try:
+                imported = import_data(data_kind, upload, format=upload.name.rsplit('.', 1)[-1].lower(),
+                                       products=st.session_state.products
+                                       if data_kind in ('orders', 'setup_times') else None)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                if data_kind == 'orders':
+                    replace_orders(imported)
+                else:
+                    st.session_state[data_kind] = imported
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                st.rerun()
+        if st.session_state[data_kind]:
+            st.download_button("Export CSV", width="stretch", file_name=f"{data_kind}.csv", mime="text/csv",
+                               data=lambda data=st.session_state[data_kind], products=st.session_state.products:
+                               export_data(data_kind, data, products=products))
+
+    st.write("---")
+
     if st.button("Load Demo Data", type="primary", width="stretch"):
         demo_data = get_demo_data()
         st.session_state.machines = demo_data['machines']
         st.session_state.products = demo_data['products']
         st.session_state.setup_times = demo_data['setup_times']
-        st.session_state.orders = demo_data['orders']
+        replace_orders(demo_data['orders'])
         if 'result' in st.session_state:
             del st.session_state.result
         st.success("Demo data loaded successfully!")
@@ -377,7 +551,7 @@ with st.sidebar:
             st.session_state.machines = large_data['machines']
             st.session_state.products = large_data['products']
             st.session_state.setup_times = large_data['setup_times']
-            st.session_state.orders = large_data['orders']
+            replace_orders(large_data['orders'])
             if 'result' in st.session_state:
                 del st.session_state.result
         st.success("Large demo data loaded! Check terminal for details.")
@@ -389,7 +563,7 @@ with st.sidebar:
             st.session_state.machines = extreme_data['machines']
             st.session_state.products = extreme_data['products']
             st.session_state.setup_times = extreme_data['setup_times']
-            st.session_state.orders = extreme_data['orders']
+            replace_orders(extreme_data['orders'])
             if 'result' in st.session_state:
                 del st.session_state.result
         st.warning("EXTREME data loaded! Solving may take 10+ seconds or timeout.")
@@ -401,7 +575,7 @@ with st.sidebar:
         st.session_state.machines = []
         st.session_state.products = []
         st.session_state.setup_times = {}
-        st.session_state.orders = []
+        replace_orders([])
         if 'result' in st.session_state:
             del st.session_state.result
         st.rerun()
\ No newline at end of file
@@ -0,0 +1,358 @@
+"""
+Benchmark Harness
+=================
+Reproducible performance runs for the scheduling engines. Every instance is
+generated from a seed (large_demodata.generate_instance), so two runs of the
+same family/seed solve exactly the same problem and their numbers can be
+compared before and after a change to or_tools.py.
+
+Recorded per (family, seed, engine):
+    build_time   seconds spent building the CP-SAT model (CP-SAT engines)
+    solve_time   seconds in the solver / dispatcher / all windows
+    total_time   wall time of the whole engine call
+    objective    makespan + 1000 * violation hours (the CP-SAT objective)
+    bound        best proven lower bound (CP-SAT engines)
+    gap          relative gap between objective and bound
+    status       result status, plus the raw CP-SAT status
+    peak_rss_mb  peak resident memory of the run (each run gets a fresh
+                 process, so runs do not inherit each other's peak)
+
+Usage:
+    python benchmark.py --families small medium --seeds 1 2 3
+    python benchmark.py --engines cp_sat dispatch --time-limit 30 --output results.json --csv results.csv
+    python benchmark.py --save-baseline baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.10   # exit code 1 on regressions
+
+CP-SAT runs use one search worker and a fixed random seed by default, which
+makes the search itself repeatable (up to the time limit).
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import sys
+from datetime import datetime
+from time import perf_counter
+
+from large_demodata import generate_instance
+
+# Instance families: generate_instance arguments (without the seed)
+FAMILIES = {
+    'small': dict(num_machines=5, num_products=8, num_orders=10, setup_density=0.4, max_quantity=2),
+    'medium': dict(num_machines=10, num_products=20, num_orders=30, setup_density=0.4, max_quantity=3),
+    'large': dict(num_machines=15, num_products=25, num_orders=40, setup_density=0.4, max_quantity=3),
+    'extreme': dict(num_machines=25, num_products=50, num_orders=80, setup_density=0.3, max_quantity=3,
+                    num_operations=28, ops_per_machine=(2, 5), tasks_per_product=(3, 10), max_duration=8,
+                    max_setup_time=5, tight_deadline=(2.0, 3.5), relaxed_deadline=(4.0, 7.0),
+                    min_deadline=40, machine_letters=False),
+}
+
+ENGINES = ('cp_sat', 'circuit', 'dispatch', 'rolling')
+
+# Columns of the CSV output (and of every result record)
+RESULT_COLUMNS = ('family', 'seed', 'engine', 'machines', 'products', 'orders', 'tasks',
+                  'status', 'solver_status', 'objective', 'bound', 'gap', 'makespan',
+                  'violation_hours', 'build_time', 'solve_time', 'total_time', 'peak_rss_mb', 'error')
+
+# Metrics compared against the baseline (all: lower is better)
+COMPARED_METRICS = ('total_time', 'objective', 'peak_rss_mb')
+
+# Time differences below this many seconds are noise, never regressions
+MIN_TIME_DELTA = 0.5
+
+START_TIME = '2025-01-01T08:00:00'
+
+
+def make_instance(family, seed, **overrides):
+    """
+    Generates the instance of a family for one seed.
+
+    Args:
+        family: Key of FAMILIES
+        seed: Random seed
+        **overrides: generate_instance arguments replacing the family's values
+            (e.g. num_orders=200, setup_density=0.8, max_quantity=5)
+    """
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown family '{family}', expected one of {tuple(FAMILIES)}")
+    return generate_instance(seed=seed, **dict(FAMILIES[family], **overrides))
+
+
+def run_engine(instance, engine, time_limit=10, num_workers=1, random_seed=0):
+    """
+    Runs one engine on an instance and returns its metrics (without memory).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    args = (instance['machines'], instance['products'], instance['setup_times'],
+            instance['orders'], START_TIME)
+    solver_config = {'time_limit': time_limit, 'num_workers': num_workers, 'random_seed': random_seed}
+
+    started = perf_counter()
+    if engine in ('cp_sat', 'circuit'):
+        from or_tools import solve_schedule
+        result = solve_schedule(*args, solver_config=solver_config,
+                                sequencing='circuit' if engine == 'circuit' else 'pairwise')
+    elif engine == 'dispatch':
+        from dispatching import solve_dispatch_best
+        result = solve_dispatch_best(*args)
+    else:
+        from decomposition import solve_rolling_horizon
+        result = solve_rolling_horizon(*args, time_limit=time_limit,
+                                       solver_config={'num_workers': num_workers, 'random_seed': random_seed})
+    total_time = perf_counter() - started
+
+    record = {
+        'status': result['status'],
+        'solver_status': result.get('solver_status'),
+        'makespan': result.get('makespan'),
+        'violation_hours': result.get('total_violation_hours'),
+        'tasks': len(result.get('schedule', [])),
+        'total_time': total_time,
+        'build_time': None,
+        'solve_time': result.get('solve_time', total_time),
+        'objective': None,
+        'bound': None,
+        'gap': None,
+    }
+    if 'makespan' in result:
+        record['objective'] = result['makespan'] + 1000 * result['total_violation_hours']
+
+    solver_stats = result.get('stats', {}).get('solver')
+    if solver_stats is not None:
+        record['solver_status'] = solver_stats['status']
+        record['build_time'] = solver_stats['build_time']
+        record['solve_time'] = solver_stats['solve_time']
+        record['bound'] = solver_stats['bound']
+        record['gap'] = solver_stats['gap']
+    elif engine == 'rolling':
+        record['solve_time'] = sum(window['solve_time'] for window in result.get('windows', []))
+    return record
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process in MB (None where unsupported).
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_isolated(family, seed, engine, overrides, time_limit, num_workers):
+    """
+    Process entry point: generate, solve and measure one run.
+    """
+    instance = make_instance(family, seed, **overrides)
+    record = run_engine(instance, engine, time_limit=time_limit, num_workers=num_workers)
+    record['peak_rss_mb'] = _peak_rss_mb()
+    return record
+
+
+def run_suite(families=('small', 'medium'), seeds=(1, 2, 3), engines=('cp_sat', 'dispatch'),
+              time_limit=10, num_workers=1, overrides=None, isolate=True):
+    """
+    Runs every engine on every (family, seed) instance.
+
+    Args:
+        families: Keys of FAMILIES
+        seeds: Seeds per family
+        engines: Engines from ENGINES
+        time_limit: Solver seconds per run (CP-SAT and rolling horizon)
+        num_workers: CP-SAT search workers
+        overrides: generate_instance arguments applied to every family
+        isolate: Run each measurement in a fresh process (needed for
+            meaningful peak memory; False runs in this process)
+
+    Returns:
+        List of result records with RESULT_COLUMNS
+    """
+    overrides = overrides or {}
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+    records = []
+    context = multiprocessing.get_context('spawn')
+    for family in families:
+        for seed in seeds:
+            instance = make_instance(family, seed, **overrides)
+            for engine in engines:
+                print(f"[BENCHMARK] {family} seed={seed} {engine} ...", flush=True)
+                record = {
+                    'family': family,
+                    'seed': seed,
+                    'engine': engine,
+                    'machines': len(instance['machines']),
+                    'products': len(instance['products']),
+                    'orders': len(instance['orders']),
+                    'error': None,
+                }
+                try:
+                    if isolate:
+                        with context.Pool(1) as pool:
+                            measured = pool.apply(_run_isolated, (family, seed, engine, overrides,
+                                                                  time_limit, num_workers))
+                    else:
+                        measured = run_engine(instance, engine, time_limit=time_limit,
+                                              num_workers=num_workers)
+                        measured['peak_rss_mb'] = _peak_rss_mb()
+                    record.update(measured)
+                except Exception as e:
+                    record['status'] = 'ERROR'
+                    record['error'] = str(e)
+                record = {column: record.get(column) for column in RESULT_COLUMNS}
+                records.append(record)
+                print(f"[BENCHMARK]   {record['status']}: objective {record['objective']}, "
+                      f"{_format_seconds(record['total_time'])}", flush=True)
+    return records
+
+
+def run_metadata(time_limit, num_workers):
+    """
+    Environment of a run, stored next to the results.
+    """
+    try:
+        from ortools import __version__ as ortools_version
+    except ImportError:
+        ortools_version = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'ortools': ortools_version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'time_limit': time_limit,
+        'num_workers': num_workers,
+    }
+
+
+def write_results(records, json_path=None, csv_path=None, metadata=None):
+    """
+    Writes results as JSON ({'metadata', 'results'}) and/or CSV.
+    """
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump({'metadata': metadata or {}, 'results': records}, f, indent=2)
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(records)
+
+
+def load_results(path):
+    """
+    Reads the records of a JSON results file (e.g. a stored baseline).
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return data['results'] if isinstance(data, dict) else data
+
+
+def compare_to_baseline(records, baseline, threshold=0.10, min_time_delta=MIN_TIME_DELTA):
+    """
+    Finds regressions against a baseline.
+
+    A metric regresses when it is more than `threshold` (relative) worse than
+    the baseline value of the same (family, seed, engine). Time metrics must
+    also be at least min_time_delta seconds worse. A run that had a solution
+    in the baseline but has none now is always a regression.
+
+    Returns:
+        List of dicts with 'family', 'seed', 'engine', 'metric', 'baseline',
+        'current' and 'change' (relative, None for status changes)
+    """
+    baseline_by_key = {(r['family'], r['seed'], r['engine']): r for r in baseline}
+    regressions = []
+    for record in records:
+        key = (record['family'], record['seed'], record['engine'])
+        old = baseline_by_key.get(key)
+        if old is None:
+            continue
+        entry = {'family': key[0], 'seed': key[1], 'engine': key[2]}
+
+        if old.get('objective') is not None and record.get('objective') is None:
+            regressions.append(dict(entry, metric='status', baseline=old['status'],
+                                    current=record['status'], change=None))
+            continue
+
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), record.get(metric)
+            if before is None or after is None:
+                continue
+            if after <= before * (1 + threshold):
+                continue
+            if metric.endswith('_time') and after - before < min_time_delta:
+                continue
+            regressions.append(dict(entry, metric=metric, baseline=before, current=after,
+                                    change=(after - before) / before if before else None))
+    return regressions
+
+
+def _format_seconds(value):
+    return f"{value:.2f}s" if value is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seeded benchmark of the scheduling engines")
+    parser.add_argument('--families', nargs='+', default=['small', 'medium'], choices=list(FAMILIES))
+    parser.add_argument('--seeds', nargs='+', type=int, default=[1, 2, 3])
+    parser.add_argument('--engines', nargs='+', default=['cp_sat', 'dispatch'], choices=list(ENGINES))
+    parser.add_argument('--time-limit', type=float, default=10, help="Solver seconds per run")
+    parser.add_argument('--workers', type=int, default=1, help="CP-SAT search workers")
+    parser.add_argument('--machines', type=int, help="Override the machine count of every family")
+    parser.add_argument('--products', type=int, help="Override the product count of every family")
+    parser.add_argument('--orders', type=int, help="Override the order count of every family")
+    parser.add_argument('--setup-density', type=float, help="Share of product pairs with a setup time")
+    parser.add_argument('--max-quantity', type=int, help="Largest order quantity")
+    parser.add_argument('--no-isolate', action='store_true', help="Run in this process (no memory isolation)")
+    parser.add_argument('--output', help="JSON results file")
+    parser.add_argument('--csv', help="CSV results file")
+    parser.add_argument('--baseline', help="JSON results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative regression threshold")
+    parser.add_argument('--save-baseline', help="Also write the results as a new baseline file")
+    args = parser.parse_args(argv)
+
+    overrides = {name: value for name, value in (
+        ('num_machines', args.machines), ('num_products', args.products), ('num_orders', args.orders),
+        ('setup_density', args.setup_density), ('max_quantity', args.max_quantity)) if value is not None}
+
+    records = run_suite(args.families, args.seeds, args.engines, time_limit=args.time_limit,
+                        num_workers=args.workers, overrides=overrides, isolate=not args.no_isolate)
+    metadata = dict(run_metadata(args.time_limit, args.workers), overrides=overrides)
+    write_results(records, args.output, args.csv, metadata)
+    if args.save_baseline:
+        write_results(records, args.save_baseline, metadata=metadata)
+
+    print(f"\n{'family':<8} {'seed':>4} {'engine':<9} {'status':<25} {'objective':>10} "
+          f"{'gap':>7} {'build':>7} {'solve':>7} {'peak MB':>8}")
+    for r in records:
+        objective = f"{r['objective']:.0f}" if r['objective'] is not None else '-'
+        gap = f"{r['gap']:.1%}" if r['gap'] is not None else '-'
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else '-'
+        print(f"{r['family']:<8} {r['seed']:>4} {r['engine']:<9} {r['status']:<25} {objective:>10} "
+              f"{gap:>7} {_format_seconds(r['build_time']):>7} {_format_seconds(r['solve_time']):>7} {peak:>8}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(records, load_results(args.baseline), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for r in regressions:
+                change = f" ({r['change']:+.1%})" if r['change'] is not None else ""
+                print(f"  {r['family']} seed={r['seed']} {r['engine']}: {r['metric']} "
+                      f"{r['baseline']} -> {r['current']}{change}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Solve Result Cache
+==================
+Streamlit reruns, page reloads and repeated MES calls often send exactly the
+same scheduling problem again. SolveCache stores solve_schedule results under
+a content hash of the normalized inputs, so an identical request is answered
+without building or solving a model.
+
+Key: SHA-256 over canonical JSON of machines, products, setup_times, orders
+and every option that changes the model or the search (sequencing, batching,
+sublots, flexible, machine_available, tighten_domains, objective, stages and
+the resolved solver config). The start time is NOT part of the key: all model
+times are hours relative to the start, so a cached result is re-based onto the new
+start by rewriting its datetime strings. Except with machine calendars: the
+shifts depend on the weekday and time of day, so there the start is part of
+the key.
+
+Eviction: least-recently-used first, once the stored (compressed) results
+exceed max_bytes, and entries older than ttl seconds are treated as misses.
+
+Backends:
+- memory (default) - an OrderedDict in this process
+- sqlite - SolveCache(path='cache.sqlite3'); survives restarts and can be
+  shared by several processes on one host
+
+Environment variables for the default cache used by the API and the UI:
+    SCHEDULER_CACHE_PATH   SQLite file (unset = in-memory)
+    SCHEDULER_CACHE_TTL    Seconds (default 86400)
+    SCHEDULER_CACHE_BYTES  Size cap in bytes (default 256 MB)
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from time import time as get_time
+
+from calendars import uses_calendars
+from or_tools import solve_schedule, resolve_solver_config, _format_hours
+from setup_matrix import SetupMatrix
+
+# solve_schedule options that change the model or the search
+_KEY_OPTIONS = ('sequencing', 'batching', 'sublots', 'flexible', 'machine_available', 'tighten_domains',
+                'machine_unavailable', 'fixed_tasks', 'release_time', 'reference_schedule', 'deviation_weight',
+                'result_format', 'calendars', 'objective', 'stages')
+
+# Their solve_schedule defaults: an option set to its default does not change the key
+_OPTION_DEFAULTS = {name: parameter.default
+                    for name, parameter in inspect.signature(solve_schedule).parameters.items()
+                    if name in _KEY_OPTIONS}
+
+# Solver settings that do not affect the result
+_IGNORED_SOLVER_KEYS = ('log_search_progress',)
+
+_default_cache = None
+
+
+class SolveCache:
+    """
+    Content-addressed LRU + TTL cache for solve_schedule results.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=24 * 3600, path=None):
+        """
+        Args:
+            max_bytes: Size cap over all stored (zlib-compressed JSON) results
+            ttl: Seconds after which an entry is no longer used (None = never)
+            path: SQLite file for a persistent cache; None keeps it in memory
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.stats = {'hits': 0, 'rebased_hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (created, start_datetime, blob)
+        self._bytes = 0
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS solve_cache (
+                    key TEXT PRIMARY KEY,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    start_datetime TEXT,
+                    size INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )""")
+            self._db.commit()
+
+    def solve(self, machines, products, setup_times, orders, start_time, **kwargs):
+        """
+        solve_schedule with caching; takes the same arguments.
+
+        The result gets a 'cache' entry: 'hit', 'rebased' (hit from a
+        different start time) or 'miss'.
+        """
+        start_datetime = _start_datetime(start_time)
+        key = make_cache_key(machines, products, setup_times, orders, start_time=start_datetime, **kwargs)
+
+        cached = self.get(key, start_datetime)
+        if cached is not None:
+            return cached
+
+        result = solve_schedule(machines, products, setup_times, orders,
+                                start_datetime.isoformat(), **kwargs)
+        self.put(key, result)
+        result['cache'] = 'miss'
+        return result
+
+    def get(self, key, start_datetime):
+        """
+        Looks up a result and re-bases it onto start_datetime. Returns None on a miss.
+        """
+        with self._lock:
+            entry = self._load(key)
+            if entry is None or (self.ttl is not None and get_time() - entry[0] > self.ttl):
+                self.stats['misses'] += 1
+                return None
+            _, cached_start, blob = entry
+
+            result = json.loads(zlib.decompress(blob))
+            if cached_start is not None and cached_start != start_datetime.strftime('%Y-%m-%d %H:%M'):
+                _rebase(result, start_datetime)
+                result['cache'] = 'rebased'
+                self.stats['rebased_hits'] += 1
+            else:
+                result['cache'] = 'hit'
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, key, result):
+        """
+        Stores a result. Time-outs without a solution are not cached, since a
+        retry may succeed.
+        """
+        if 'schedule' not in result and 'schedule_columns' not in result \
+                and result.get('solver_status') != 'INFEASIBLE':
+            return
+        blob = zlib.compress(json.dumps(result).encode())
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            self._store(key, (get_time(), result.get('start_datetime'), blob))
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM solve_cache")
+                self._db.commit()
+
+    def info(self):
+        """
+        Hit/miss counters plus the current entry count and size.
+        """
+        with self._lock:
+            if self._db is not None:
+                entries, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solve_cache").fetchone()
+            else:
+                entries, size = len(self._entries), self._bytes
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, entries=entries, bytes=size, max_bytes=self.max_bytes,
+                        backend='sqlite' if self._db is not None else 'memory',
+                        hit_rate=self.stats['hits'] / lookups if lookups else 0.0)
+
+    # ------------------------------------------------------------------------
+    # Backend access (called with self._lock held)
+    # ------------------------------------------------------------------------
+
+    def _load(self, key):
+        if self._db is None:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+        row = self._db.execute(
+            "SELECT created, start_datetime, data FROM solve_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("UPDATE solve_cache SET last_used = ? WHERE key = ?", (get_time(), key))
+            self._db.commit()
+        return row
+
+    def _store(self, key, entry):
+        if self._db is None:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[2])
+            self._entries[key] = entry
+            self._bytes += len(entry[2])
+            return
+        created, start_datetime, blob = entry
+        self._db.execute(
+            "INSERT OR REPLACE INTO solve_cache VALUES (?, ?, ?, ?, ?, ?)",
+            (key, created, created, start_datetime, len(blob), blob))
+        self._db.commit()
+
+    def _evict(self):
+        now = get_time()
+        if self._db is None:
+            expired = [k for k, e in self._entries.items()
+                       if self.ttl is not None and now - e[0] > self.ttl]
+            for key in expired:
+                self._bytes -= len(self._entries.pop(key)[2])
+            while self._bytes > self.max_bytes:
+                _, entry = self._entries.popitem(last=False)
+                self._bytes -= len(entry[2])
+                self.stats['evictions'] += 1
+            return
+
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM solve_cache WHERE created < ?", (now - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM solve_cache").fetchone()[0]
+        if total > self.max_bytes:
+            for key, size in self._db.execute(
+                    "SELECT key, size FROM solve_cache ORDER BY last_used").fetchall():
+                self._db.execute("DELETE FROM solve_cache WHERE key = ?", (key,))
+                self.stats['evictions'] += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._db.commit()
+
+
+def make_cache_key(machines, products, setup_times, orders, solver_config=None, start_time=None, **kwargs):
+    """
+    Canonical hash of a solve_schedule call (without its start time, unless
+    machine calendars make the start time matter).
+
+    Options that only affect how the search starts or is observed
+    (warm_start, progress callbacks) are ignored.
+    """
+    config = resolve_solver_config(solver_config)
+    for name in _IGNORED_SOLVER_KEYS:
+        config.pop(name, None)
+
+    options = {name: kwargs[name] for name in _KEY_OPTIONS if name in kwargs and not _is_default(name, kwargs[name])}
+    if 'fixed_tasks' in options:  # Tuple keys are not JSON
+        options['fixed_tasks'] = sorted([list(key), value] for key, value in options['fixed_tasks'].items())
+    if uses_calendars(machines, kwargs.get('calendars')):
+        options['start_time'] = start_time
+
+    payload = {
+        'machines': machines,
+        'products': products,
+        'setup_times': setup_times.to_json() if isinstance(setup_times, SetupMatrix) else setup_times or {},
+        'orders': orders,
+        'options': options,
+        'solver_config': config,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _is_default(name, value):
+    # Empty containers count as the None default (no fixed tasks, no calendars, ...)
+    default = _OPTION_DEFAULTS[name]
+    if default is None:
+        return value is None or (isinstance(value, (dict, list, tuple)) and not value)
+    return value == default
+
+
+def get_default_cache():
+    """
+    Process-wide cache configured from the SCHEDULER_CACHE_* environment variables.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SolveCache(
+            max_bytes=int(os.environ.get('SCHEDULER_CACHE_BYTES', 256 * 1024 * 1024)),
+            ttl=float(os.environ.get('SCHEDULER_CACHE_TTL', 24 * 3600)),
+            path=os.environ.get('SCHEDULER_CACHE_PATH'),
+        )
+    return _default_cache
+
+
+def _start_datetime(start_time):
+    # Same rule as solve_schedule: ISO string, otherwise "now"
+    if isinstance(start_time, str):
+        return datetime.fromisoformat(start_time)
+    return datetime.now()
+
+
+def _rebase(result, start_datetime):
+    """
+    Rewrites a cached result's datetime strings for a new start time.
+    """
+    result['start_datetime'] = start_datetime.strftime('%Y-%m-%d %H:%M')
+    schedule = result.get('schedule', [])
+    if schedule:
+        start_datetimes = _format_hours([row['start'] for row in schedule], start_datetime).tolist()
+        end_datetimes = _format_hours([row['end'] for row in schedule], start_datetime).tolist()
+        for row, start_text, end_text in zip(schedule, start_datetimes, end_datetimes):
+            row['start_datetime'] = start_text
+            row['end_datetime'] = end_text
@@ -0,0 +1,287 @@
+"""
+Machine Calendars
+=================
+Working time of machines: shifts, recurring breaks (e.g. weekly maintenance)
+and one-off blocked periods (holidays, planned maintenance). The solvers see
+a calendar as blocked windows in model hours: CP-SAT adds them as fixed
+intervals to the machine's AddNoOverlap, the dispatching rules move a task
+behind them. Tasks are not interrupted: a task must fit completely into the
+working time between two blocked windows.
+
+Calendar spec (JSON-friendly dict, every key optional):
+    {
+        "shifts":  [{"days": "mon-fri", "start": "06:00", "end": "22:00"}],
+        "breaks":  [{"days": "sat", "start": "06:00", "end": "10:00"}],
+        "blocked": [{"start": "2025-12-24T00:00", "end": "2025-12-27T00:00"}, [300, 312]]
+    }
+
+    shifts   Weekly working windows; without shifts the machine works 24/7
+    breaks   Weekly windows without capacity, on top of the shifts
+    blocked  One-off windows, as ISO datetimes or hours from the start time
+
+    days     "mon-fri", "sat,sun", "daily", a day name, or a list of day names
+             or numbers (0 = Monday); default every day
+    start/end  "HH:MM" or hours; an end at or before the start runs past
+             midnight ("22:00" - "06:00" is a night shift)
+
+A machine gets its calendar from machine['calendar'] - a spec, or the name of
+a spec in the `calendars` argument of solve_schedule. calendars['default']
+applies to machines without one.
+
+Compilation: a spec is turned into a merged weekly pattern once; the model
+windows are that pattern tiled over the horizon, so a two-shift week costs
+five blocked windows per week (four nights plus the weekend) no matter how
+many machines share it. Windows are rounded outwards to whole hours.
+"""
+
+import bisect
+import json
+import math
+from datetime import datetime
+
+WEEK_HOURS = 7 * 24
+
+DAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+class MachineCalendar:
+    """
+    Blocked windows of one machine, in hours relative to a start datetime.
+    """
+
+    def __init__(self, spec=None, start_datetime=None, extra_blocked=()):
+        """
+        Args:
+            spec: Calendar spec (see module docstring); None = always working
+            start_datetime: Model time 0 (weekday and time of day matter)
+            extra_blocked: Further one-off (start, end) windows in hours
+
+        Raises:
+            ValueError: On malformed specs
+        """
+        spec = spec or {}
+        unknown = set(spec) - {'shifts', 'breaks', 'blocked'}
+        if unknown:
+            raise ValueError(f"Unknown calendar keys: {sorted(unknown)}")
+        self.spec = spec
+        self.start_datetime = start_datetime or datetime.now()
+
+        # Weekly pattern: blocked (start, end) hours of the week, 0 = Monday 00:00
+        weekly = []
+        if spec.get('shifts'):
+            weekly = _complement(_merge(_weekly_windows(spec['shifts'])), WEEK_HOURS)
+        self.weekly_blocked = _merge(weekly + _weekly_windows(spec.get('breaks', [])))
+
+        one_off = [_window_hours(window, self.start_datetime) for window in spec.get('blocked', [])]
+        one_off += [(math.floor(start), math.ceil(end)) for start, end in extra_blocked]
+        self.one_off_blocked = _merge([w for w in one_off if w[1] > w[0]])
+
+        # Offset of model time 0 within the week
+        midnight = self.start_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._offset = self.start_datetime.weekday() * 24 + (self.start_datetime - midnight).total_seconds() / 3600
+        self._compiled = []
+        self._compiled_until = 0
+
+    @property
+    def availability(self):
+        """
+        Share of the week the machine works (one-off windows not counted).
+        """
+        return 1 - sum(end - start for start, end in self.weekly_blocked) / WEEK_HOURS
+
+    @property
+    def longest_shift(self):
+        """
+        Longest stretch of working hours in the weekly pattern (inf without one).
+        """
+        if not self.weekly_blocked:
+            return math.inf
+        if self.availability <= 0:
+            return 0
+        open_windows = _complement(self.weekly_blocked, WEEK_HOURS)
+        # A stretch over the week boundary (e.g. Sunday night into Monday) counts as one
+        lengths = [end - start for start, end in open_windows]
+        if len(open_windows) > 1 and open_windows[0][0] == 0 and open_windows[-1][1] == WEEK_HOURS:
+            lengths.append(lengths[0] + lengths[-1])
+        return max(lengths)
+
+    def blocked(self, until):
+        """
+        Sorted, merged (start, end) integer windows in [0, until].
+        """
+        if until > self._compiled_until:
+            self._compile(until)
+        end_index = bisect.bisect_left(self._compiled, (until,))
+        windows = self._compiled[:end_index]
+        return [(start, min(end, until)) for start, end in windows]
+
+    def next_start(self, start, length):
+        """
+        Earliest time >= start at which a task of `length` hours fits.
+
+        Raises:
+            ValueError: If the task is longer than every working stretch
+        """
+        if length > self.longest_shift:
+            raise ValueError(f"A task of {length}h does not fit into any shift "
+                             f"(longest: {self.longest_shift:g}h)")
+        while True:
+            if start + length > self._compiled_until:
+                self._compile(max(2 * self._compiled_until, start + length + WEEK_HOURS))
+            # Last window starting before the task would end
+            index = bisect.bisect_left(self._compiled, (start + length,)) - 1
+            if index < 0 or self._compiled[index][1] <= start:
+                return start
+            start = self._compiled[index][1]
+
+    def _compile(self, until):
+        windows = list(self.one_off_blocked)
+        weeks = math.ceil((until + self._offset) / WEEK_HOURS) + 1
+        for week in range(weeks):
+            shift = week * WEEK_HOURS - self._offset
+            windows.extend((math.floor(start + shift), math.ceil(end + shift))
+                           for start, end in self.weekly_blocked)
+        self._compiled = [(max(0, start), end) for start, end in _merge(windows) if end > 0]
+        self._compiled_until = until
+
+
+def machine_calendars(machines, calendars, start_datetime, machine_unavailable=None):
+    """
+    MachineCalendar per machine name, for machines that have a calendar or
+    explicit unavailable windows. Machines with the same spec (and no own
+    windows) share one MachineCalendar, so it is compiled once.
+
+    Raises:
+        ValueError: On unknown calendar names or malformed specs
+    """
+    calendars = calendars or {}
+    machine_unavailable = machine_unavailable or {}
+    shared = {}
+    result = {}
+    for machine in machines:
+        name = machine['name']
+        spec = machine.get('calendar', calendars.get('default'))
+        if isinstance(spec, str):
+            if spec not in calendars:
+                raise ValueError(f"Machine '{name}': unknown calendar '{spec}'")
+            spec = calendars[spec]
+        windows = machine_unavailable.get(name)
+        if not spec and not windows:
+            continue
+        if windows:
+            result[name] = MachineCalendar(spec, start_datetime, extra_blocked=windows)
+            continue
+        key = json.dumps(spec, sort_keys=True, default=str)
+        if key not in shared:
+            shared[key] = MachineCalendar(spec, start_datetime)
+        result[name] = shared[key]
+    return result
+
+
+def uses_calendars(machines, calendars=None):
+    """
+    True if any machine works to a calendar, i.e. the start time matters.
+    """
+    return bool((calendars or {}).get('default')) or any(machine.get('calendar') for machine in machines)
+
+
+def _weekly_windows(entries):
+    """
+    (start, end) hours of the week for shift/break entries.
+    """
+    windows = []
+    for entry in entries:
+        start = _clock_hours(entry.get('start', 0))
+        end = _clock_hours(entry.get('end', 24))
+        if end <= start:
+            end += 24  # Past midnight
+        for day in _parse_days(entry.get('days', 'daily')):
+            day_start = day * 24 + start
+            day_end = day * 24 + end
+            if day_end > WEEK_HOURS:  # Sunday night: wraps to Monday
+                windows.append((0, day_end - WEEK_HOURS))
+                day_end = WEEK_HOURS
+            windows.append((day_start, day_end))
+    return windows
+
+
+def _parse_days(days):
+    if isinstance(days, str):
+        days = days.lower().strip()
+        if days in ('daily', 'all', '*'):
+            return list(range(7))
+        result = []
+        for part in days.split(','):
+            first, _, last = part.strip().partition('-')
+            first_day = _day_number(first)
+            last_day = _day_number(last) if last else first_day
+            result.extend((first_day + i) % 7 for i in range((last_day - first_day) % 7 + 1))
+        return result
+    return [_day_number(day) for day in days]
+
+
+def _day_number(day):
+    if isinstance(day, int) and 0 <= day < 7:
+        return day
+    name = str(day).strip().lower()[:3]
+    if name not in DAY_NAMES:
+        raise ValueError(f"Unknown calendar day '{day}'")
+    return DAY_NAMES.index(name)
+
+
+def _clock_hours(value):
+    if isinstance(value, (int, float)):
+        hours = value
+    else:
+        hour, _, minute = str(value).partition(':')
+        hours = int(hour) + int(minute or 0) / 60
+    if not 0 <= hours <= 24:
+        raise ValueError(f"Calendar time out of range: {value!r}")
+    return hours
+
+
+def _window_hours(window, start_datetime):
+    """
+    One-off window ({'start', 'end'} or [start, end], datetimes or hours)
+    as whole model hours, rounded outwards.
+    """
+    if isinstance(window, dict):
+        start, end = window['start'], window['end']
+    else:
+        start, end = window
+    return math.floor(_model_hours(start, start_datetime)), math.ceil(_model_hours(end, start_datetime))
+
+
+def _model_hours(value, start_datetime):
+    if isinstance(value, (int, float)):
+        return value
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return (moment - start_datetime).total_seconds() / 3600
+
+
+def _merge(windows):
+    """
+    Sorted windows with overlapping and touching ones combined.
+    """
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _complement(windows, length):
+    """
+    Gaps of sorted, merged windows within [0, length).
+    """
+    gaps = []
+    position = 0
+    for start, end in windows:
+        if start > position:
+            gaps.append((position, start))
+        position = max(position, end)
+    if position < length:
+        gaps.append((position, length))
+    return gaps
@@ -0,0 +1,398 @@
+"""
+Bulk Import / Export
+====================
+Master data and orders as flat files, read into (and written from) the
+exact structures solve_schedule consumes. Files are CSV, Parquet or JSON
+Lines, one row per record:
+
+    machines      name, operations[, speed, calendar]
+                  operations: list (Parquet/JSON Lines) or "op1;op2" (CSV)
+    products      product, operation, duration[, step]
+                  one row per task; tasks run in `step` order, else file order
+    setup_times   from, to, hours              -> {"from-to": hours}
+    orders        product, quantity, deadline[, any further columns]
+                  further columns are kept as order keys
+    schedule      export only: one row per task (Parquet keeps the machine,
+                  order and operation names dictionary-encoded)
+
+Orders are read in chunks of ORDER_CHUNK_ROWS rows (iter_orders), and each
+chunk is validated with column operations, so order books of tens of
+thousands of lines load in a second or two. Every read validates its file
+against the schema and raises SchemaError listing the offending rows.
+
+Parquet needs the optional pyarrow package; CSV and JSON Lines only pandas.
+"""
+
+import io
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional dependency
+    pyarrow = None
+
+from setup_matrix import as_setup_matrix
+
+FORMATS = ('csv', 'parquet', 'jsonl')
+
+# HTTP media type of each file format
+MEDIA_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet', 'jsonl': 'application/x-ndjson'}
+
+KINDS = ('machines', 'products', 'setup_times', 'orders')
+
+# Orders per chunk when streaming an order file
+ORDER_CHUNK_ROWS = 50_000
+
+# Problems listed in a SchemaError before the rest are summarised
+MAX_REPORTED_PROBLEMS = 20
+
+_SUFFIXES = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# Required columns and their type: 'text', 'count' (integer >= 1), 'hours' (integer >= 0)
+_SCHEMAS = {
+    'machines': {'name': 'text', 'operations': 'operations'},
+    'products': {'product': 'text', 'operation': 'text', 'duration': 'count'},
+    'setup_times': {'from': 'text', 'to': 'text', 'hours': 'hours'},
+    'orders': {'product': 'text', 'quantity': 'count', 'deadline': 'count'},
+}
+
+# Separator of the operations of a machine in CSV files
+OPERATION_SEPARATOR = ';'
+
+
+class SchemaError(ValueError):
+    """
+    A file does not match the schema of its kind; `problems` lists
+    "row N: ..." messages (rows counted from 1, excluding the header).
+    """
+
+    def __init__(self, kind, problems):
+        self.kind = kind
+        self.problems = problems
+        shown = problems[:MAX_REPORTED_PROBLEMS]
+        more = len(problems) - len(shown)
+        message = f"Invalid {kind} file: " + '; '.join(shown)
+        if more:
+            message += f" (and {more} more)"
+        super().__init__(message)
+
+
+def import_data(kind, source, format=None, products=None):
+    """
+    Reads one kind of master data (or orders) from a file.
+
+    Args:
+        kind: 'machines', 'products', 'setup_times' or 'orders'
+        source: Path or binary file object (e.g. an upload)
+        format: 'csv', 'parquet' or 'jsonl'; default from the file suffix
+        products: Optional product list (dicts or names); orders and setup
+            times must then only reference these products
+
+    Returns:
+        machines/products/orders as lists of dicts, setup times as the
+        {"from-to": hours} dict
+
+    Raises:
+        SchemaError: If the file does not match the schema
+        ValueError: On unknown kinds or formats
+    """
+    if kind == 'orders':
+        orders = []
+        for chunk in iter_orders(source, format=format, products=products):
+            orders.extend(chunk)
+        return orders
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+
+    frame = _validate(kind, _read_frame(source, _resolve_format(source, format)), 0, products)
+    if kind == 'machines':
+        return _machines_from_frame(frame)
+    if kind == 'products':
+        return _products_from_frame(frame)
+    return {f"{row.source}-{row.target}": row.hours
+            for row in frame.rename(columns={'from': 'source', 'to': 'target'}).itertuples()}
+
+
+def iter_orders(source, format=None, products=None, chunksize=ORDER_CHUNK_ROWS):
+    """
+    Streams an order file: yields lists of order dicts of at most
+    `chunksize` orders, each chunk validated before it is yielded.
+
+    Raises:
+        SchemaError: On the first chunk that does not match the schema
+    """
+    offset = 0
+    for frame in _read_chunks(source, _resolve_format(source, format), chunksize):
+        frame = _validate('orders', frame, offset, products)
+        offset += len(frame)
+        yield _records(frame)
+
+
+def export_data(kind, data, destination=None, format='csv', products=None):
+    """
+    Writes master data or orders in the layout import_data reads.
+
+    Args:
+        kind: One of KINDS
+        data: machines/products/orders list, or any setup-time input
+        destination: Path or binary file object; None returns the bytes
+        format: 'csv', 'parquet' or 'jsonl' (ignored for paths with a known suffix)
+        products: Product list, needed to split legacy setup-time keys
+    """
+    if kind == 'machines':
+        frame = pd.DataFrame([dict(machine) for machine in data])
+        frame = frame.reindex(columns=['name', 'operations'] + [c for c in frame.columns
+                                                                 if c not in ('name', 'operations')])
+    elif kind == 'products':
+        frame = pd.DataFrame(
+            [{'product': product['name'], 'step': step, **task}
+             for product in data for step, task in enumerate(product['tasks'], start=1)],
+            columns=['product', 'step', 'operation', 'duration'])
+    elif kind == 'setup_times':
+        frame = pd.DataFrame(list(as_setup_matrix(data, products).items()), columns=['from', 'to', 'hours'])
+    elif kind == 'orders':
+        frame = pd.DataFrame(data)
+        frame = frame.reindex(columns=list(_SCHEMAS['orders']) + [c for c in frame.columns
+                                                                   if c not in _SCHEMAS['orders']])
+    else:
+        raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+
+    format = _resolve_format(destination, format)
+    if kind == 'machines' and format == 'csv':
+        frame['operations'] = frame['operations'].map(OPERATION_SEPARATOR.join)
+    return _write_frame(frame, destination, format)
+
+
+def parquet_available():
+    """
+    True if the optional pyarrow package (Parquet files) is installed.
+    """
+    return pyarrow is not None
+
+
+def schedule_table(result):
+    """
+    pyarrow Table of a result's schedule: one row per task, the machine,
+    order and operation columns dictionary-encoded, start/end as hours and
+    timestamps; the schedule start is kept in the schema metadata.
+
+    Args:
+        result: solve_schedule / dispatch result (any result format), or
+            schedule rows
+    """
+    _require_pyarrow()
+    if isinstance(result, list):
+        result = {'schedule': result}
+    if 'schedule_columns' in result:
+        compact = result['schedule_columns']
+        columns = {name: pyarrow.array(values, type=pyarrow.int64())
+                   for name, values in compact['columns'].items()}
+        for name, names in compact['categories'].items():
+            columns[name] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(compact['columns'][name], type=pyarrow.int32()), pyarrow.array(names))
+    else:
+        frame = pd.DataFrame(result.get('schedule', [])).drop(columns=['start_datetime', 'end_datetime'],
+                                                               errors='ignore')
+        for name in ('order', 'operation', 'machine'):
+            if name in frame:
+                frame[name] = frame[name].astype('category')
+        columns = {name: pyarrow.Array.from_pandas(frame[name]) for name in frame.columns}
+
+    metadata = {}
+    start_datetime = result.get('start_datetime')
+    if start_datetime and 'start' in columns:
+        base = np.datetime64(datetime.fromisoformat(start_datetime).replace(tzinfo=None), 'm')
+        for name in ('start', 'end'):
+            hours = columns[name].to_numpy(zero_copy_only=False).astype('timedelta64[h]')
+            columns[f'{name}_datetime'] = pyarrow.array((base + hours).astype('datetime64[s]'))
+        metadata[b'start_datetime'] = start_datetime.encode()
+    return pyarrow.table(columns, metadata=metadata or None)
+
+
+def schedule_frame(result):
+    """
+    DataFrame with the columns of schedule_table (categoricals instead of
+    dictionary arrays); needs no pyarrow.
+    """
+    if isinstance(result, list):
+        result = {'schedule': result}
+    if 'schedule_columns' in result:
+        compact = result['schedule_columns']
+        frame = pd.DataFrame(compact['columns'])
+        for name, names in compact['categories'].items():
+            frame[name] = pd.Categorical.from_codes(compact['columns'][name], names)
+    else:
+        frame = pd.DataFrame(result.get('schedule', [])).drop(columns=['start_datetime', 'end_datetime'],
+                                                               errors='ignore')
+        for name in ('order', 'operation', 'machine'):
+            if name in frame:
+                frame[name] = frame[name].astype('category')
+
+    start_datetime = result.get('start_datetime')
+    if start_datetime and 'start' in frame:
+        base = np.datetime64(datetime.fromisoformat(start_datetime).replace(tzinfo=None), 'm')
+        for name in ('start', 'end'):
+            hours = frame[name].to_numpy(dtype=np.int64).astype('timedelta64[h]')
+            frame[f'{name}_datetime'] = (base + hours).astype('datetime64[s]')
+    return frame
+
+
+def export_schedule(result, destination=None, format='parquet'):
+    """
+    Writes a result's schedule (see schedule_table); CSV and JSON Lines get
+    the same columns with plain names and datetimes, and work without
+    pyarrow (see schedule_frame). None returns the bytes.
+    """
+    format = _resolve_format(destination, format)
+    if format == 'parquet':
+        target = io.BytesIO() if destination is None else destination
+        pyarrow.parquet.write_table(schedule_table(result), target)
+        return target.getvalue() if destination is None else None
+    return _write_frame(schedule_frame(result), destination, format)
+
+
+# ----------------------------------------------------------------------------
+# Internals
+# ----------------------------------------------------------------------------
+
+def _resolve_format(target, format):
+    if isinstance(target, (str, os.PathLike)):
+        suffix = os.path.splitext(os.fspath(target))[1].lower()
+        if suffix in _SUFFIXES:
+            format = _SUFFIXES[suffix]
+    if format is None:
+        raise ValueError(f"Cannot tell the file format of {target!r}, pass one of {FORMATS}")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown file format '{format}', expected one of {FORMATS}")
+    if format == 'parquet':
+        _require_pyarrow()
+    return format
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ValueError("Parquet files need the pyarrow package")
+
+
+def _read_frame(source, format):
+    if format == 'csv':
+        return pd.read_csv(source, skipinitialspace=True)
+    if format == 'parquet':
+        return pd.read_parquet(source)
+    return pd.read_json(source, lines=True, dtype=False)
+
+
+def _read_chunks(source, format, chunksize):
+    if format == 'csv':
+        yield from pd.read_csv(source, skipinitialspace=True, chunksize=chunksize)
+    elif format == 'parquet':
+        for batch in pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_json(source, lines=True, dtype=False, chunksize=chunksize)
+
+
+def _write_frame(frame, destination, format):
+    target = io.BytesIO() if destination is None else destination
+    if format == 'csv':
+        frame.to_csv(target, index=False)
+    elif format == 'parquet':
+        frame.to_parquet(target, index=False)
+    else:
+        frame.to_json(target, orient='records', lines=True, date_format='iso')
+    return target.getvalue() if destination is None else None
+
+
+def _validate(kind, frame, offset, products):
+    """
+    Checks required columns, missing values, types and product references;
+    returns the frame with the typed columns converted.
+    """
+    schema = _SCHEMAS[kind]
+    frame = frame.rename(columns=lambda column: str(column).strip())
+    missing = [column for column in schema if column not in frame.columns]
+    if missing:
+        raise SchemaError(kind, [f"missing columns {missing} (found {list(frame.columns)})"])
+
+    problems = []
+    rows = np.arange(offset + 1, offset + len(frame) + 1)
+
+    def report(mask, message):
+        problems.extend(f"row {row}: {message}" for row in rows[np.asarray(mask)][:MAX_REPORTED_PROBLEMS])
+
+    for column, kind_of_value in schema.items():
+        values = frame[column]
+        missing_values = values.isna().to_numpy()
+        report(missing_values, f"'{column}' is missing")
+        if kind_of_value == 'text':
+            frame[column] = values.where(missing_values, values.astype(str).str.strip())
+        elif kind_of_value == 'operations':
+            frame[column] = values.map(_operation_list)
+            report(~missing_values & (frame[column].map(len) == 0).to_numpy(), f"'{column}' is empty")
+        else:
+            numbers = pd.to_numeric(values, errors='coerce')
+            bad = ~missing_values & (numbers.isna() | (numbers % 1 != 0)).to_numpy()
+            report(bad, f"'{column}' must be a whole number")
+            minimum = 1 if kind_of_value == 'count' else 0
+            report(~bad & ~missing_values & (numbers < minimum).to_numpy(), f"'{column}' must be >= {minimum}")
+            frame[column] = numbers.fillna(0).astype('int64')
+
+    if products is not None and kind in ('orders', 'setup_times'):
+        known = {p['name'] if isinstance(p, dict) else p for p in products}
+        for column in (('product',) if kind == 'orders' else ('from', 'to')):
+            unknown = ~frame[column].isin(known) & frame[column].notna()
+            report(unknown.to_numpy(), f"unknown product in '{column}'")
+    if kind == 'products' and 'step' in frame.columns:
+        report(pd.to_numeric(frame['step'], errors='coerce').isna().to_numpy(), "'step' must be a number")
+
+    if problems:
+        raise SchemaError(kind, problems)
+    return frame
+
+
+def _operation_list(value):
+    if isinstance(value, str):
+        return [op.strip() for op in value.split(OPERATION_SEPARATOR) if op.strip()]
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(op).strip() for op in value if str(op).strip()]
+    return []
+
+
+def _records(frame):
+    """
+    Row dicts with native Python values; missing optional values are left out.
+    Optional integer columns (e.g. 'weight', 'priority') come back as int,
+    although the blanks made them float columns.
+    """
+    optional = [column for column in frame.columns if frame[column].isna().any()]
+    integral = {column for column in optional if frame[column].dtype.kind == 'f'
+                and (frame[column].dropna() % 1 == 0).all()}
+    records = frame.to_dict('records')
+    if optional:
+        for record in records:
+            for column in optional:
+                if pd.isna(record[column]):
+                    del record[column]
+                elif column in integral:
+                    record[column] = int(record[column])
+    return records
+
+
+def _machines_from_frame(frame):
+    return _records(frame)
+
+
+def _products_from_frame(frame):
+    if 'step' in frame.columns:
+        # Products keep the order of their first row, tasks follow `step`
+        first_row = pd.factorize(frame['product'])[0]
+        frame = frame.assign(_first_row=first_row).sort_values(['_first_row', 'step'], kind='stable')
+    products = {}
+    for row in frame.itertuples(index=False):
+        products.setdefault(row.product, []).append({'operation': row.operation, 'duration': row.duration})
+    return [{'name': name, 'tasks': tasks} for name, tasks in products.items()]
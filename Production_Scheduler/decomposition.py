@@ -0,0 +1,266 @@
+"""
+Rolling-Horizon Decomposition for the Production Scheduler
+==========================================================
+The monolithic CP-SAT model in or_tools.solve_schedule stops returning useful
+solutions within its time limit once the task count reaches the low
+thousands. This module splits the order book into smaller sub-problems and
+solves them one after another with the same model builder:
+
+1. MACHINE CLUSTERS - orders whose recipes never share a machine are
+   independent, so each connected group of machines is solved on its own
+2. DEADLINE WINDOWS - inside a cluster, orders are sorted by deadline and cut
+   into windows of at most `max_tasks_per_window` tasks
+3. FREEZE AND CARRY - each solved window is committed as-is; the time at which
+   every machine becomes free is passed to the next window, which can only
+   use the machine after that point (padded by the largest changeover out of
+   the machine's last product, so cross-window setups always fit)
+
+The merged result has the same format as solve_schedule, plus per-window
+timing stats in 'windows'.
+"""
+
+import logging
+from datetime import datetime
+from time import time as get_time
+
+from or_tools import solve_schedule, get_master_data_index
+from setup_matrix import as_setup_matrix
+from validation import validate_problem
+
+SPLIT_MODES = ('deadline', 'machine_cluster')
+
+logger = logging.getLogger(__name__)
+
+
+def solve_rolling_horizon(machines, products, setup_times, orders, start_time,
+                          split='machine_cluster', max_tasks_per_window=300, time_limit=None,
+                          **solve_kwargs):
+    """
+    Solves a large order book window by window.
+
+    Args:
+        machines, products, setup_times, orders, start_time: As for solve_schedule
+        split: 'deadline' - deadline windows over the whole plant
+               'machine_cluster' - independent machine clusters first, then
+               deadline windows inside each cluster
+        max_tasks_per_window: Upper bound on the (estimated) task count of
+            one window; an order larger than this gets a window of its own
+        time_limit: Total solver budget in seconds, shared between windows in
+            proportion to their task counts (at least 1 second per window).
+            Default: solver_config['time_limit'], else 120. Setting both to
+            different values is an error
+        **solve_kwargs: Passed through to solve_schedule (sequencing,
+            batching, sublots, flexible, solver_config)
+
+    Returns:
+        Dict in the solve_schedule result format with extra 'windows' and
+        'decomposition' entries
+    """
+    if split not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode '{split}', expected one of {SPLIT_MODES}")
+    if max_tasks_per_window < 1:
+        raise ValueError(f"max_tasks_per_window must be at least 1, got {max_tasks_per_window}")
+    config_limit = (solve_kwargs.get('solver_config') or {}).get('time_limit')
+    if time_limit is not None and config_limit is not None and time_limit != config_limit:
+        raise ValueError(f"time_limit ({time_limit}) and solver_config['time_limit'] ({config_limit}) disagree; "
+                         f"set only one of them")
+    time_limit = next((limit for limit in (time_limit, config_limit) if limit is not None), 120)
+
+    logger.info("Rolling horizon: %d orders, split=%s, max %d tasks per window",
+                len(orders), split, max_tasks_per_window)
+    total_start = get_time()
+
+    # Every window must use the same time origin
+    if not isinstance(start_time, str):
+        start_time = datetime.now().isoformat()
+
+    # The whole order book is checked once; the windows skip the check
+    validation = validate_problem(machines, products, setup_times, orders, start_time,
+                                  batching=solve_kwargs.get('batching', False), sublots=solve_kwargs.get('sublots', 1),
+                                  flexible=solve_kwargs.get('flexible', False),
+                                  calendars=solve_kwargs.get('calendars'),
+                                  machine_unavailable=solve_kwargs.get('machine_unavailable'))
+
+    index = get_master_data_index(machines, products)
+    setup_times = as_setup_matrix(setup_times, products)  # Parsed once, shared by all windows
+    flexible = solve_kwargs.get('flexible', False)
+
+    # ========================================================================
+    # Build Windows
+    # ========================================================================
+    if split == 'machine_cluster':
+        clusters = _machine_clusters(machines, orders, index, flexible)
+    else:
+        clusters = [list(range(len(orders)))]
+
+    windows = []  # (cluster number, [order indices])
+    for cluster_id, order_indices in enumerate(clusters):
+        for window in _deadline_windows(order_indices, orders, index, max_tasks_per_window,
+                                        solve_kwargs.get('batching', False),
+                                        solve_kwargs.get('sublots', 1)):
+            windows.append((cluster_id, window))
+
+    task_counts = [sum(_estimate_tasks(orders[i], index, solve_kwargs.get('batching', False),
+                                       solve_kwargs.get('sublots', 1)) for i in window)
+                   for _, window in windows]
+    total_tasks = max(1, sum(task_counts))
+    logger.info("Windows: %d across %d cluster(s), ~%d tasks", len(windows), len(clusters), sum(task_counts))
+
+    # ========================================================================
+    # Solve Windows in Order, Carrying Machine Availability Forward
+    # ========================================================================
+    machine_available = {}
+    last_row_on_machine = {}
+    schedule = []
+    deadline_violations = []
+    window_stats = []
+
+    for window_number, ((cluster_id, window), num_tasks) in enumerate(zip(windows, task_counts)):
+        window_orders = [orders[i] for i in window]
+
+        window_kwargs = dict(solve_kwargs)
+        solver_config = dict(window_kwargs.get('solver_config') or {})
+        solver_config['time_limit'] = max(1, time_limit * num_tasks / total_tasks)
+        window_kwargs['solver_config'] = solver_config
+
+        window_start = get_time()
+        result = solve_schedule(machines, products, setup_times, window_orders, start_time,
+                                machine_available=dict(machine_available), validate=False, **window_kwargs)
+        elapsed = get_time() - window_start
+
+        window_stats.append({
+            'window': window_number,
+            'cluster': cluster_id,
+            'orders': len(window),
+            'tasks': num_tasks,
+            'status': result['status'],
+            'time_limit': solver_config['time_limit'],
+            'solve_time': elapsed,
+            'makespan': result.get('makespan'),
+        })
+
+        if 'schedule' not in result:
+            return {
+                'status': 'INFEASIBLE',
+                'message': f"Window {window_number} (cluster {cluster_id}, {len(window)} orders) failed: "
+                           f"{result.get('message', result['status'])}",
+                'windows': window_stats,
+                'validation': validation,
+            }
+
+        # Freeze the window: map local order indices back and record when
+        # each machine becomes free for the next window
+        for row in result['schedule']:
+            row['order_index'] = window[row['order_index']]
+            last = last_row_on_machine.get(row['machine'])
+            if last is None or row['end'] > last['end']:
+                last_row_on_machine[row['machine']] = row
+            schedule.append(row)
+        for machine_name, last in last_row_on_machine.items():
+            # Padded by the largest changeover out of the last product
+            machine_available[machine_name] = last['end'] + setup_times.max_from(last['order'])
+        deadline_violations.extend(result['deadline_violations'])
+
+    # ========================================================================
+    # Merge Windows Into One Result
+    # ========================================================================
+    schedule.sort(key=lambda x: x['start'])
+    for new_id, row in enumerate(schedule):
+        row['task_id'] = new_id
+    _assign_setup_times(schedule, setup_times)
+
+    total_violations = sum(v['violation_hours'] for v in deadline_violations)
+    total_time = get_time() - total_start
+    logger.info("Rolling horizon done in %.2fs", total_time)
+
+    return {
+        'status': 'FEASIBLE_WITH_VIOLATIONS' if total_violations > 0 else 'FEASIBLE',
+        'makespan': max((row['end'] for row in schedule), default=0),
+        'schedule': schedule,
+        'start_datetime': datetime.fromisoformat(start_time).strftime('%Y-%m-%d %H:%M'),
+        'deadline_violations': deadline_violations,
+        'total_violation_hours': total_violations,
+        'windows': window_stats,
+        'validation': validation,
+        'decomposition': {
+            'split': split,
+            'num_clusters': len(clusters),
+            'num_windows': len(windows),
+            'total_time': total_time,
+        },
+    }
+
+
+def _estimate_tasks(order, index, batching, sublots):
+    """
+    Number of model tasks an order will create (0 for unknown products).
+    """
+    product = index['product_by_name'].get(order['product'])
+    if not product:
+        return 0
+    units = min(sublots, order['quantity']) if batching else order['quantity']
+    return len(product['tasks']) * units
+
+
+def _machine_clusters(machines, orders, index, flexible):
+    """
+    Groups orders into clusters that share no machines (union-find).
+
+    Two machines are joined whenever one order's recipe can use both. With
+    flexible assignment every capable machine counts, otherwise only the
+    first capable machine per operation does.
+    """
+    parent = {m['name']: m['name'] for m in machines}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    order_machines = []
+    for order in orders:
+        names = []
+        for options in index['recipe_options'].get(order['product'], []):
+            names.extend(machine['name'] for machine, _ in (options if flexible else options[:1]))
+        for name in names[1:]:
+            parent[find(name)] = find(names[0])
+        order_machines.append(names)
+
+    clusters = {}
+    for order_index, names in enumerate(order_machines):
+        root = find(names[0]) if names else None  # Unschedulable orders share one cluster
+        clusters.setdefault(root, []).append(order_index)
+    return list(clusters.values())
+
+
+def _deadline_windows(order_indices, orders, index, max_tasks_per_window, batching, sublots):
+    """
+    Cuts deadline-sorted orders into windows of at most max_tasks_per_window tasks.
+    """
+    windows = []
+    current, current_tasks = [], 0
+    for i in sorted(order_indices, key=lambda i: orders[i]['deadline']):
+        num_tasks = _estimate_tasks(orders[i], index, batching, sublots)
+        if current and current_tasks + num_tasks > max_tasks_per_window:
+            windows.append(current)
+            current, current_tasks = [], 0
+        current.append(i)
+        current_tasks += num_tasks
+    if current:
+        windows.append(current)
+    return windows
+
+
+def _assign_setup_times(schedule, setup_times):
+    """
+    Recomputes each row's setup_time from its predecessor on the same machine.
+
+    Needed after merging windows, because the first task of a window on a
+    machine may follow a task of a different product from the previous window.
+    """
+    last_on_machine = {}
+    for row in schedule:  # Already sorted by start
+        prev = last_on_machine.get(row['machine'])
+        row['setup_time'] = setup_times.between(prev['order'], row['order']) if prev else 0
+        last_on_machine[row['machine']] = row
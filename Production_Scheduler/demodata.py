@@ -3,13 +3,18 @@ Demo data for Production Scheduler
 Contains sample machines, products, setup times, and orders
 """
 
+from setup_matrix import SetupMatrix
+
 # Toggle to alternate between possible and impossible deadlines
 _deadline_toggle = {'impossible': False}
 
-def get_demo_data():
+def get_demo_data(setup_matrix=False):
     """
     Returns a dictionary with demo data for the production scheduler
     Alternates between possible and impossible deadlines on each call
+
+    With setup_matrix=True, 'setup_times' is a dense SetupMatrix instead of
+    the "from-to" string-key dict
     """
 
     # Toggle deadline mode
@@ -72,6 +77,9 @@ def get_demo_data():
         'Product Y-Product Z': 1,
         'Product Z-Product Y': 1
     }
+    if setup_matrix:
+        names = [p['name'] for p in products]
+        setup_times = SetupMatrix(names, matrix=SetupMatrix.from_dict(setup_times, names).dense())
 
     # Demo Orders with alternating deadlines
     if impossible_mode:
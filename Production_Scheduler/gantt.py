@@ -0,0 +1,187 @@
+"""
+Gantt Chart
+===========
+Plotly Gantt chart of a schedule, built from a handful of batched traces
+instead of one shape, annotation and scatter trace per task:
+- one horizontal go.Bar per product, with arrays of bases and widths
+- one invisible go.Scattergl carrying the hover text of every block
+
+Level of detail: above DETAIL_LIMIT blocks, back-to-back tasks of the same
+product on the same machine are merged into one block ("4 tasks"). If that
+is not enough, blocks separated by short gaps are merged too - first of the
+same product, then of any product (grey MIXED blocks) - doubling the
+tolerated gap until the limit is met. Bar labels are only drawn up to
+LABEL_LIMIT blocks. A window (from hour, to hour) restricts the chart to
+part of the horizon, so a large schedule can be inspected at full detail
+piece by piece.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from or_tools import _format_hours
+
+# Blocks drawn one per task; above this, adjacent same-product tasks are merged
+DETAIL_LIMIT = 2000
+
+# Blocks up to which bars carry a product/operation label
+LABEL_LIMIT = 300
+
+# Product name of blocks merged from several products
+MIXED = 'Mixed'
+
+COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+          '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf')
+
+_FRAME_COLUMNS = ('order', 'machine', 'operation', 'start', 'end', 'setup_time')
+
+
+def gantt_figure(schedule, start_datetime, window=None, detail_limit=DETAIL_LIMIT, label_limit=LABEL_LIMIT):
+    """
+    Builds the Gantt chart of a schedule.
+
+    Args:
+        schedule: Schedule rows (result['schedule']) or a DataFrame of them
+        start_datetime: Schedule start (datetime or 'YYYY-MM-DD HH:MM' /
+            ISO string, e.g. result['start_datetime'])
+        window: Optional (from hour, to hour); only tasks overlapping it are
+            drawn and the time axis is zoomed to it
+        detail_limit: Merge adjacent same-product tasks above this many blocks
+        label_limit: Draw bar labels up to this many blocks
+
+    Returns:
+        (figure, info) with info = {'tasks', 'blocks', 'merged'}
+    """
+    if isinstance(start_datetime, str):
+        start_datetime = datetime.fromisoformat(start_datetime)
+    frame = schedule if isinstance(schedule, pd.DataFrame) else pd.DataFrame(schedule, columns=_FRAME_COLUMNS)
+    frame = frame.reindex(columns=list(_FRAME_COLUMNS))  # setup_time may be missing (e.g. live diffs)
+    if window is not None:
+        frame = frame[(frame['end'] > window[0]) & (frame['start'] < window[1])]
+    if len(frame) == 0:
+        figure = go.Figure()
+        figure.update_layout(title="Production Schedule - Gantt Chart", xaxis_title="Time",
+                             yaxis_title="Machines")
+        return figure, {'tasks': 0, 'blocks': 0, 'merged': False}
+
+    blocks = frame.assign(tasks=1, operation=frame['operation'].astype(str))
+    merged = len(blocks) > detail_limit
+    if merged:
+        blocks = merge_adjacent(blocks)
+        span = int(blocks['end'].max() - blocks['start'].min())
+        for same_product in (True, False):
+            max_gap = 1
+            while len(blocks) > detail_limit and max_gap < span:
+                blocks = merge_adjacent(blocks, max_gap, same_product=same_product)
+                max_gap *= 2
+
+    machines = sorted(blocks['machine'].unique().tolist())
+    products = sorted(set(blocks['order'].unique().tolist()) - {MIXED})
+    starts = blocks['start'].to_numpy(dtype=np.int64)
+    ends = blocks['end'].to_numpy(dtype=np.int64)
+    base = np.datetime64(start_datetime.replace(tzinfo=None), 'm')
+    start_stamps = base + starts.astype('timedelta64[h]')
+    widths_ms = (ends - starts) * 3_600_000  # Bar widths on a date axis are milliseconds
+
+    labels = (blocks['order'] + '<br>' + np.where(blocks['tasks'] > 1, blocks['tasks'].astype(str) + ' tasks',
+                                                   blocks['operation'])).to_numpy()
+    show_labels = len(blocks) <= label_limit
+
+    figure = go.Figure()
+    product_codes = blocks['order'].to_numpy()
+    for i, product in enumerate(products):
+        selected = product_codes == product
+        figure.add_trace(go.Bar(
+            name=product,
+            orientation='h',
+            y=blocks['machine'].to_numpy()[selected],
+            base=start_stamps[selected],
+            x=widths_ms[selected],
+            marker=dict(color=COLORS[i % len(COLORS)], line=dict(color='black', width=1)),
+            text=labels[selected] if show_labels else None,
+            textposition='inside',
+            insidetextanchor='middle',
+            textfont=dict(color='white', size=10),
+            hoverinfo='skip',
+        ))
+    mixed = product_codes == MIXED
+    if mixed.any():
+        figure.add_trace(go.Bar(
+            name=MIXED, orientation='h', y=blocks['machine'].to_numpy()[mixed], base=start_stamps[mixed],
+            x=widths_ms[mixed], marker=dict(color='#c7c7c7', line=dict(color='black', width=1)),
+            hoverinfo='skip',
+        ))
+
+    # One hover trace for all blocks, at the block midpoints
+    hover_text = (
+        '<b>' + blocks['order'] + '</b><br>'
+        + 'Machine: ' + blocks['machine'] + '<br>'
+        + 'Operation: ' + np.where(blocks['tasks'] > 1, blocks['tasks'].astype(str) + ' tasks (merged)',
+                                   blocks['operation']) + '<br>'
+        + 'Start: ' + _format_hours(starts, start_datetime) + '<br>'
+        + 'End: ' + _format_hours(ends, start_datetime) + '<br>'
+        + 'Duration: ' + (ends - starts).astype(str) + 'h<br>'
+        + 'Setup Time: ' + blocks['setup_time'].fillna(0).astype(int).astype(str) + 'h'
+    ).to_numpy()
+    figure.add_trace(go.Scattergl(
+        x=start_stamps + ((ends - starts) * 30).astype('timedelta64[m]'),
+        y=blocks['machine'].to_numpy(),
+        mode='markers',
+        marker=dict(size=8, opacity=0),
+        text=hover_text,
+        hovertemplate='%{text}<extra></extra>',
+        showlegend=False,
+    ))
+
+    xaxis = dict(showgrid=True, type='date', tickformat='%Y-%m-%d %H:%M')
+    if window is not None:
+        xaxis['range'] = [base + np.timedelta64(int(window[0]), 'h'), base + np.timedelta64(int(window[1]), 'h')]
+    figure.update_layout(
+        title="Production Schedule - Gantt Chart",
+        xaxis_title="Time",
+        yaxis_title="Machines",
+        barmode='overlay',
+        bargap=0.2,
+        height=max(400, len(machines) * 80 if len(machines) <= 20 else len(machines) * 30),
+        showlegend=len(products) <= len(COLORS) * 2,
+        xaxis=xaxis,
+        yaxis=dict(showgrid=True, categoryorder='array', categoryarray=machines[::-1]),
+    )
+    return figure, {'tasks': len(frame), 'blocks': len(blocks), 'merged': merged}
+
+
+def merge_adjacent(frame, max_gap=0, same_product=True):
+    """
+    Merges back-to-back tasks on the same machine (one starting at most
+    max_gap hours after the previous one ends) into blocks; with
+    same_product, only tasks of the same product.
+
+    Returns:
+        DataFrame with the columns of `frame` plus 'tasks' (tasks per block);
+        merged blocks keep the first task's operation and setup time, and
+        blocks of several products get the product MIXED
+    """
+    frame = frame.sort_values(['machine', 'start'], kind='stable')
+    if len(frame) == 0:
+        return frame.assign(tasks=frame.get('tasks', 1))
+    machine = frame['machine'].to_numpy()
+    order = frame['order'].to_numpy()
+    starts = frame['start'].to_numpy()
+    ends = frame['end'].to_numpy()
+    tasks = frame['tasks'].to_numpy() if 'tasks' in frame else np.ones(len(frame), dtype=np.int64)
+
+    continues = np.zeros(len(frame), dtype=bool)
+    continues[1:] = (machine[1:] == machine[:-1]) & (starts[1:] - ends[:-1] <= max_gap)
+    if same_product:
+        continues[1:] &= order[1:] == order[:-1]
+    first = np.flatnonzero(~continues)
+
+    # Per-block reductions over the sorted rows
+    product_codes = pd.factorize(order)[0]
+    mixed = np.maximum.reduceat(product_codes, first) != np.minimum.reduceat(product_codes, first)
+    blocks = frame.iloc[first].assign(end=np.maximum.reduceat(ends, first), tasks=np.add.reduceat(tasks, first))
+    blocks.loc[mixed, 'order'] = MIXED
+    return blocks.reset_index(drop=True)
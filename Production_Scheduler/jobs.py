@@ -0,0 +1,244 @@
+"""
+Asynchronous Solve Jobs
+=======================
+Large CP-SAT solves can run for minutes, which is longer than an HTTP request
+should stay open. The JobManager runs each solve in its own worker process
+and lets the Flask service return immediately with a job id:
+
+- submit()  - queue a solve, returns the job id
+- get()     - status, best-so-far objective/gap and, for jobs submitted with
+              progress_schedule=True, the latest partial schedule
+- cancel()  - stop the search; the best solution found so far becomes the result
+
+Concurrency is bounded: at most `max_workers` solves run at once, each with
+`cpu_count // max_workers` CP-SAT workers unless the request sets num_workers.
+Further jobs wait in the queue.
+
+Worker processes report back over one shared multiprocessing queue, which a
+listener thread in the Flask process drains into the job table. Cancellation
+sets the job's stop event (CP-SAT then returns its incumbent); a worker that
+does not finish within CANCEL_GRACE seconds is terminated. A worker that dies
+without reporting (killed, out of memory) fails its job and frees its slot.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict, deque
+from time import time as get_time
+
+JOB_STATUSES = ('queued', 'running', 'done', 'cancelled', 'failed')
+
+# Seconds a cancelled worker gets to return its incumbent before termination
+CANCEL_GRACE = 10
+
+# Finished jobs kept for polling; older ones are dropped first
+MAX_FINISHED_JOBS = 100
+
+# Seconds the listener waits for a message before checking for dead workers
+WORKER_POLL = 1
+
+# Multiprocessing context: 'spawn' so workers never inherit Flask's threads
+_mp = multiprocessing.get_context('spawn')
+
+
+def _run_job(job_id, kwargs, messages, stop_event):
+    """
+    Worker process entry point: runs solve_schedule and streams progress.
+    """
+    from or_tools import solve_schedule
+
+    def on_progress(progress):
+        messages.put((job_id, 'progress', progress))
+
+    try:
+        result = solve_schedule(progress_callback=on_progress, stop_event=stop_event, **kwargs)
+        messages.put((job_id, 'done', result))
+    except Exception as e:
+        messages.put((job_id, 'failed', f"{type(e).__name__}: {e}"))
+
+
+class JobManager:
+    """
+    Runs solve_schedule calls in a bounded pool of worker processes.
+    """
+
+    def __init__(self, max_workers=None):
+        cpu_count = os.cpu_count() or 1
+        self.max_workers = max_workers or max(1, cpu_count // 8)
+        self.workers_per_job = max(1, cpu_count // self.max_workers)
+
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._processes = {}
+        self._messages = None
+        self._listener = None
+
+    def submit(self, progress_schedule=False, **kwargs):
+        """
+        Queues a solve. Keyword arguments are passed to solve_schedule.
+
+        Args:
+            progress_schedule: If True, every improving solution is extracted
+                and sent back as the job's partial schedule; otherwise only
+                its objective, bound and gap are reported
+
+        Returns:
+            The new job id
+        """
+        solver_config = dict(kwargs.get('solver_config') or {})
+        solver_config.setdefault('num_workers', self.workers_per_job)
+        kwargs['solver_config'] = solver_config
+        kwargs['progress_schedule'] = progress_schedule
+
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._ensure_listener()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'submitted': get_time(),
+                'started': None,
+                'finished': None,
+                'progress': None,
+                'partial_schedule': None,
+                'result': None,
+                'error': None,
+                'stop_event': _mp.Event(),
+                'kwargs': kwargs,
+            }
+            self._pending.append(job_id)
+            self._start_pending()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns a JSON-serialisable snapshot of a job, or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {
+                'id': job_id,
+                'status': job['status'],
+                'submitted': job['submitted'],
+                'started': job['started'],
+                'finished': job['finished'],
+                'progress': job['progress'],
+            }
+            if job['result'] is not None:
+                snapshot['result'] = job['result']
+            elif job['partial_schedule'] is not None:
+                snapshot['partial_schedule'] = job['partial_schedule']
+            if job['error'] is not None:
+                snapshot['error'] = job['error']
+            return snapshot
+
+    def cancel(self, job_id):
+        """
+        Stops a job. A queued job is dropped; a running job keeps the best
+        solution found so far as its result.
+
+        Returns:
+            The job status after cancelling, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job['status'] == 'queued':
+                self._pending.remove(job_id)
+                self._finish(job, 'cancelled')
+            elif job['status'] == 'running':
+                job['cancel_requested'] = True
+                job['stop_event'].set()
+                timer = threading.Timer(CANCEL_GRACE, self._terminate, args=(job_id,))
+                timer.daemon = True
+                timer.start()
+            return job['status']
+
+    # ------------------------------------------------------------------------
+    # Internals (called with self._lock held unless noted)
+    # ------------------------------------------------------------------------
+
+    def _ensure_listener(self):
+        if self._listener is None:
+            self._messages = _mp.Queue()
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _start_pending(self):
+        while self._pending and len(self._processes) < self.max_workers:
+            job_id = self._pending.popleft()
+            job = self._jobs[job_id]
+            process = _mp.Process(target=_run_job, daemon=True,
+                                  args=(job_id, job.pop('kwargs'), self._messages, job['stop_event']))
+            process.start()
+            self._processes[job_id] = process
+            job['status'] = 'running'
+            job['started'] = get_time()
+
+    def _finish(self, job, status):
+        job['status'] = status
+        job['finished'] = get_time()
+        job.pop('kwargs', None)
+        process = self._processes.pop(job['id'], None)
+        if process is not None:
+            process.join(timeout=1)
+
+        # Forget the oldest finished jobs beyond MAX_FINISHED_JOBS
+        finished = [i for i, j in self._jobs.items() if j['finished'] is not None]
+        for old_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[old_id]
+
+        self._start_pending()
+
+    def _terminate(self, job_id):
+        # Timer thread: the worker ignored the stop event for CANCEL_GRACE seconds
+        with self._lock:
+            job = self._jobs.get(job_id)
+            process = self._processes.get(job_id)
+            if job is None or process is None or job['status'] != 'running':
+                return
+            process.terminate()
+            self._finish(job, 'cancelled')
+
+    def _reap_dead_workers(self):
+        # A dead worker's last messages are in the queue once it has exited, so
+        # a job only fails when its worker was already dead one poll earlier
+        for job_id, process in list(self._processes.items()):
+            job = self._jobs[job_id]
+            if process.is_alive() or job['status'] != 'running':
+                continue
+            if not job.get('exited'):
+                job['exited'] = True
+                continue
+            job['error'] = f"Worker exited with code {process.exitcode} without a result"
+            self._finish(job, 'cancelled' if job.get('cancel_requested') else 'failed')
+
+    def _listen(self):
+        # Listener thread: applies worker messages to the job table
+        while True:
+            try:
+                job_id, kind, payload = self._messages.get(timeout=WORKER_POLL)
+            except queue.Empty:
+                with self._lock:
+                    self._reap_dead_workers()
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] != 'running':
+                    continue
+                if kind == 'progress':
+                    job['partial_schedule'] = payload.pop('schedule', None)
+                    job['progress'] = payload
+                elif kind == 'done':
+                    job['result'] = payload
+                    self._finish(job, 'cancelled' if job.get('cancel_requested') else 'done')
+                else:
+                    job['error'] = payload
+                    self._finish(job, 'failed')
@@ -1,38 +1,61 @@
 """
 Large Demo Data Generator for Production Scheduler
 Generates random large-scale production data for stress testing
-Data changes each time it's called - with varied but achievable deadlines
+Data changes each time it's called - with varied but achievable deadlines,
+unless a seed is given: the same seed always gives the same instance
+(used by benchmark.py)
 """
 
+import logging
 import random
-from datetime import datetime
 
-def get_large_demo_data():
+from setup_matrix import SetupMatrix
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS_POOL = [
+    'cutting', 'drilling', 'milling', 'turning', 'grinding',
+    'welding', 'assembly', 'painting', 'coating', 'polishing',
+    'inspection', 'testing', 'packaging', 'heat_treatment',
+    'surface_finishing', 'deburring', 'threading', 'boring',
+    'stamping', 'forging', 'casting', 'molding', 'extrusion',
+    'rolling', 'drawing', 'sintering', 'brazing', 'soldering'
+]
+
+
+def generate_instance(num_machines, num_products, num_orders, seed=None, setup_density=0.4,
+                      max_quantity=3, num_operations=18, ops_per_machine=(2, 4), tasks_per_product=(3, 8),
+                      max_duration=6, max_setup_time=4, tight_deadline=(2.0, 3.0),
+                      relaxed_deadline=(3.5, 6.0), min_deadline=30, machine_letters=True,
+                      setup_matrix=False):
     """
-    Generates large random demo data for stress testing
-    Returns a dictionary with machines, products, setup times, and orders
-    Each call generates different random data
+    Generates one random instance of a given size
+
+    All randomness comes from random.Random(seed), so a seed fully determines
+    the instance (seed=None gives a different instance on every call)
+
+    Args:
+        num_machines, num_products, num_orders: Instance size
+        seed: Random seed (None = unseeded)
+        setup_density: Share of the product pairs that get a setup time
+        max_quantity: Order quantities are drawn from 1..max_quantity
+        num_operations: Number of distinct operations (taken from OPERATIONS_POOL)
+        ops_per_machine: (min, max) operations per machine
+        tasks_per_product: (min, max) recipe length
+        max_duration: Task durations are drawn from 1..max_duration hours
+        max_setup_time: Setup times are drawn from 1..max_setup_time hours
+        tight_deadline, relaxed_deadline: Deadline ranges as multiples of the
+            order's sequential work (half of the orders each)
+        min_deadline: Lower bound for every deadline (hours)
+        machine_letters: Name machines Machine_A, Machine_B, ... (first 26)
+            instead of Machine_1, Machine_2, ...
+        setup_matrix: Return 'setup_times' as a sparse SetupMatrix
+
+    Returns:
+        Dict with machines, products, setup_times and orders
     """
-
-    # Configuration for large data
-    NUM_MACHINES = random.randint(8, 15)  # 8-15 machines
-    NUM_PRODUCTS = random.randint(15, 25)  # 15-25 products
-    NUM_ORDERS = random.randint(20, 40)  # 20-40 orders
-    MIN_TASKS_PER_PRODUCT = 3
-    MAX_TASKS_PER_PRODUCT = 8
-
-    print(f"\n[LARGE DEMO DATA GENERATOR]")
-    print(f"Generating: {NUM_MACHINES} machines, {NUM_PRODUCTS} products, {NUM_ORDERS} orders")
-    print(f"Deadlines: Varied (2-6x minimum time, all achievable)")
-    print(f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-
-    # Define available operations
-    operations_pool = [
-        'cutting', 'drilling', 'milling', 'turning', 'grinding',
-        'welding', 'assembly', 'painting', 'coating', 'polishing',
-        'inspection', 'testing', 'packaging', 'heat_treatment',
-        'surface_finishing', 'deburring', 'threading', 'boring'
-    ]
+    rng = random.Random(seed)
+    operations_pool = OPERATIONS_POOL[:num_operations]
 
     # Generate Machines with random operations
     # Strategy: distribute operations across machines to ensure coverage
@@ -40,45 +63,43 @@ def get_large_demo_data():
     operations_per_machine = []
 
     # First, ensure all key operations are covered
-    num_ops_per_machine = max(2, len(operations_pool) // NUM_MACHINES + 1)
+    num_ops_per_machine = max(2, len(operations_pool) // num_machines + 1)
 
-    for i in range(NUM_MACHINES):
-        # Each machine can do 2-4 operations
-        num_ops = random.randint(2, 4)
+    for i in range(num_machines):
+        num_ops = rng.randint(*ops_per_machine)
         machine_ops = operations_pool[i * num_ops_per_machine:(i + 1) * num_ops_per_machine][:num_ops]
 
         # If not enough ops, sample from pool
         if len(machine_ops) < num_ops:
-            additional = random.sample(operations_pool, num_ops - len(machine_ops))
+            additional = rng.sample(operations_pool, num_ops - len(machine_ops))
             machine_ops.extend(additional)
 
         operations_per_machine.extend(machine_ops)
 
         machines.append({
-            'name': f'Machine_{chr(65 + i)}' if i < 26 else f'Machine_{i+1}',
+            'name': f'Machine_{chr(65 + i)}' if machine_letters and i < 26 else f'Machine_{i+1}',
             'operations': machine_ops
         })
 
-    # Collect all available operations
-    operations_used = list(set(operations_per_machine))
+    # Collect all available operations (first-seen order, so the seed alone
+    # decides the result - set order changes between interpreter runs)
+    operations_used = list(dict.fromkeys(operations_per_machine))
 
     # Generate Products with random task sequences
     # IMPORTANT: Only use operations that machines can perform
     products = []
-    for i in range(NUM_PRODUCTS):
-        num_tasks = random.randint(MIN_TASKS_PER_PRODUCT, MAX_TASKS_PER_PRODUCT)
+    for i in range(num_products):
+        num_tasks = rng.randint(*tasks_per_product)
 
         # Select random operations ONLY from available operations
         num_to_select = min(num_tasks, len(operations_used))
-        product_operations = random.sample(operations_used, num_to_select)
+        product_operations = rng.sample(operations_used, num_to_select)
 
         tasks = []
         for op in product_operations:
-            # Random duration between 1-6 hours
-            duration = random.randint(1, 6)
             tasks.append({
                 'operation': op,
-                'duration': duration
+                'duration': rng.randint(1, max_duration)
             })
 
         products.append({
@@ -86,57 +107,42 @@ def get_large_demo_data():
             'tasks': tasks
         })
 
-    # Generate Setup Times (product changeovers)
+    # Generate Setup Times (product changeovers) for random product pairs
     setup_times = {}
-
-    # Generate setup times for random product pairs (about 40% of all possible pairs)
-    num_setup_times = int((NUM_PRODUCTS * (NUM_PRODUCTS - 1)) * 0.4)
+    num_setup_times = int((num_products * (num_products - 1)) * setup_density)
 
     for _ in range(num_setup_times):
-        from_product = random.choice(products)['name']
-        to_product = random.choice(products)['name']
+        from_product = rng.choice(products)['name']
+        to_product = rng.choice(products)['name']
 
         if from_product != to_product:
             setup_key = f"{from_product}-{to_product}"
-            # Setup time between 1-4 hours
-            setup_times[setup_key] = random.randint(1, 4)
+            setup_times[setup_key] = rng.randint(1, max_setup_time)
 
     # Generate Orders with VALID, varied deadlines
     orders = []
 
-    for i in range(NUM_ORDERS):
-        product = random.choice(products)
-        quantity = random.randint(1, 3)  # 1-3 units per order (reduced for feasibility)
+    for i in range(num_orders):
+        product = rng.choice(products)
+        quantity = rng.randint(1, max_quantity)
 
         # Calculate minimum time needed for this order (sequential processing)
         total_task_time = sum(task['duration'] for task in product['tasks']) * quantity
 
-        # Set deadlines between 2x and 6x the minimum time (all achievable)
-        # Vary deadlines: some tight (2-3x), some relaxed (4-6x)
-        if random.random() < 0.5:
-            # 50% tight but achievable deadlines (2-3x minimum)
-            deadline = int(total_task_time * random.uniform(2.0, 3.0))
+        # Vary deadlines: 50% tight but achievable, 50% relaxed
+        if rng.random() < 0.5:
+            deadline = int(total_task_time * rng.uniform(*tight_deadline))
         else:
-            # 50% relaxed deadlines (3.5-6x minimum)
-            deadline = int(total_task_time * random.uniform(3.5, 6.0))
-
-        # Ensure minimum deadline of 30 hours
-        deadline = max(deadline, 30)
+            deadline = int(total_task_time * rng.uniform(*relaxed_deadline))
 
         orders.append({
             'product': product['name'],
             'quantity': quantity,
-            'deadline': deadline
+            'deadline': max(deadline, min_deadline)
         })
 
-    # Print statistics
-    total_tasks = sum(len(p['tasks']) * sum(o['quantity'] for o in orders if o['product'] == p['name'])
-                     for p in products)
-    print(f"Total tasks to schedule: ~{total_tasks}")
-    print(f"Setup times defined: {len(setup_times)}")
-    print(f"Average tasks per product: {sum(len(p['tasks']) for p in products) / len(products):.1f}")
-    print(f"Total units to produce: {sum(o['quantity'] for o in orders)}")
-    print("-" * 60)
+    if setup_matrix:
+        setup_times = SetupMatrix.from_dict(setup_times, [p['name'] for p in products])
 
     return {
         'machines': machines,
@@ -146,119 +152,69 @@ def get_large_demo_data():
     }
 
 
-def get_extreme_large_demo_data():
-    """
-    Generates extremely large data for maximum stress testing
-    WARNING: May take significant time to solve (30+ seconds or may timeout)
+def get_large_demo_data(setup_matrix=False, seed=None):
     """
+    Generates large random demo data for stress testing
+    Returns a dictionary with machines, products, setup times, and orders
+    Each call generates different random data (unless seeded)
 
-    NUM_MACHINES = random.randint(20, 30)  # 20-30 machines
-    NUM_PRODUCTS = random.randint(40, 60)  # 40-60 products
-    NUM_ORDERS = random.randint(60, 100)  # 60-100 orders
-
-    print(f"\n[EXTREME LARGE DEMO DATA GENERATOR]")
-    print(f"⚠️  WARNING: This will generate EXTREME data!")
-    print(f"Generating: {NUM_MACHINES} machines, {NUM_PRODUCTS} products, {NUM_ORDERS} orders")
-    print(f"Deadlines: Varied (2-7x minimum time, all achievable)")
-    print(f"Generated at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"⚠️  Solving may take time due to problem size!\n")
-
-    operations_pool = [
-        'cutting', 'drilling', 'milling', 'turning', 'grinding',
-        'welding', 'assembly', 'painting', 'coating', 'polishing',
-        'inspection', 'testing', 'packaging', 'heat_treatment',
-        'surface_finishing', 'deburring', 'threading', 'boring',
-        'stamping', 'forging', 'casting', 'molding', 'extrusion',
-        'rolling', 'drawing', 'sintering', 'brazing', 'soldering'
-    ]
-
-    # Generate machines ensuring operation coverage
-    machines = []
-    operations_per_machine = []
-
-    num_ops_per_machine = max(2, len(operations_pool) // NUM_MACHINES + 1)
-
-    for i in range(NUM_MACHINES):
-        num_ops = random.randint(2, 5)
-        machine_ops = operations_pool[i * num_ops_per_machine:(i + 1) * num_ops_per_machine][:num_ops]
-
-        if len(machine_ops) < num_ops:
-            additional = random.sample(operations_pool, num_ops - len(machine_ops))
-            machine_ops.extend(additional)
-
-        operations_per_machine.extend(machine_ops)
-
-        machines.append({
-            'name': f'Machine_{i+1}',
-            'operations': machine_ops
-        })
-
-    operations_used = list(set(operations_per_machine))
+    With setup_matrix=True, 'setup_times' is a sparse SetupMatrix instead of
+    the "from-to" string-key dict
+    """
+    rng = random.Random(seed)
 
-    # Generate products using ONLY available operations
-    products = []
-    for i in range(NUM_PRODUCTS):
-        num_tasks = random.randint(3, 10)
-        num_to_select = min(num_tasks, len(operations_used))
-        product_operations = random.sample(operations_used, num_to_select)
+    # Configuration for large data
+    NUM_MACHINES = rng.randint(8, 15)  # 8-15 machines
+    NUM_PRODUCTS = rng.randint(15, 25)  # 15-25 products
+    NUM_ORDERS = rng.randint(20, 40)  # 20-40 orders
 
-        tasks = []
-        for op in product_operations:
-            duration = random.randint(1, 8)
-            tasks.append({
-                'operation': op,
-                'duration': duration
-            })
+    logger.info("Large demo data: %d machines, %d products, %d orders (deadlines 2-6x the minimum time)",
+                NUM_MACHINES, NUM_PRODUCTS, NUM_ORDERS)
 
-        products.append({
-            'name': f'Product_{i+1}',
-            'tasks': tasks
-        })
+    data = generate_instance(
+        NUM_MACHINES, NUM_PRODUCTS, NUM_ORDERS, seed=rng.getrandbits(32),
+        setup_density=0.4, max_quantity=3, num_operations=18, ops_per_machine=(2, 4),
+        tasks_per_product=(3, 8), max_duration=6, max_setup_time=4,
+        tight_deadline=(2.0, 3.0), relaxed_deadline=(3.5, 6.0), min_deadline=30,
+        setup_matrix=setup_matrix)
 
-    setup_times = {}
-    num_setup_times = int((NUM_PRODUCTS * (NUM_PRODUCTS - 1)) * 0.3)
+    products, orders = data['products'], data['orders']
+    total_tasks = sum(len(p['tasks']) * sum(o['quantity'] for o in orders if o['product'] == p['name'])
+                     for p in products)
+    logger.info("Large demo data: ~%d tasks, %d units, %d setup times, %.1f tasks per product",
+                total_tasks, sum(o['quantity'] for o in orders), len(data['setup_times']),
+                sum(len(p['tasks']) for p in products) / len(products))
 
-    for _ in range(num_setup_times):
-        from_product = random.choice(products)['name']
-        to_product = random.choice(products)['name']
+    return data
 
-        if from_product != to_product:
-            setup_key = f"{from_product}-{to_product}"
-            setup_times[setup_key] = random.randint(1, 5)
 
-    # Generate Orders with VALID, varied deadlines
-    orders = []
-    for i in range(NUM_ORDERS):
-        product = random.choice(products)
-        quantity = random.randint(1, 3)  # 1-3 units per order (reduced for feasibility)
+def get_extreme_large_demo_data(setup_matrix=False, seed=None):
+    """
+    Generates extremely large data for maximum stress testing
+    WARNING: May take significant time to solve (30+ seconds or may timeout)
 
-        total_task_time = sum(task['duration'] for task in product['tasks']) * quantity
+    With setup_matrix=True, 'setup_times' is a sparse SetupMatrix instead of
+    the "from-to" string-key dict
+    """
+    rng = random.Random(seed)
 
-        # Set deadlines between 2x and 6x the minimum time (all achievable)
-        if random.random() < 0.5:
-            # 50% tight but achievable deadlines (2-3.5x minimum)
-            deadline = int(total_task_time * random.uniform(2.0, 3.5))
-        else:
-            # 50% relaxed deadlines (4-7x minimum)
-            deadline = int(total_task_time * random.uniform(4.0, 7.0))
+    NUM_MACHINES = rng.randint(20, 30)  # 20-30 machines
+    NUM_PRODUCTS = rng.randint(40, 60)  # 40-60 products
+    NUM_ORDERS = rng.randint(60, 100)  # 60-100 orders
 
-        deadline = max(deadline, 40)  # Minimum 40 hours for extreme data
+    logger.warning("Extreme demo data: %d machines, %d products, %d orders (deadlines 2-7x the minimum time); "
+                   "solving may take a while", NUM_MACHINES, NUM_PRODUCTS, NUM_ORDERS)
 
-        orders.append({
-            'product': product['name'],
-            'quantity': quantity,
-            'deadline': deadline
-        })
+    data = generate_instance(
+        NUM_MACHINES, NUM_PRODUCTS, NUM_ORDERS, seed=rng.getrandbits(32),
+        setup_density=0.3, max_quantity=3, num_operations=28, ops_per_machine=(2, 5),
+        tasks_per_product=(3, 10), max_duration=8, max_setup_time=5,
+        tight_deadline=(2.0, 3.5), relaxed_deadline=(4.0, 7.0), min_deadline=40, machine_letters=False,
+        setup_matrix=setup_matrix)
 
+    products, orders = data['products'], data['orders']
     total_tasks = sum(len(p['tasks']) * sum(o['quantity'] for o in orders if o['product'] == p['name'])
                      for p in products)
-    print(f"Total tasks to schedule: ~{total_tasks}")
-    print(f"Setup times defined: {len(setup_times)}")
-    print("-" * 60)
+    logger.info("Extreme demo data: ~%d tasks, %d setup times", total_tasks, len(data['setup_times']))
 
-    return {
-        'machines': machines,
-        'products': products,
-        'setup_times': setup_times,
-        'orders': orders
-    }
\ No newline at end of file
+    return data
@@ -1,7 +1,29 @@
-from flask import Flask, render_template, request, jsonify
-from or_tools import solve_schedule
+import io
+import json
+import logging
+import os
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+from or_tools import (solve_schedule, build_model, resolve_solver_config, resolve_objective, compact_schedule,
+                      RESULT_FORMATS)
+from decomposition import solve_rolling_horizon
+from dispatching import solve_dispatch, solve_dispatch_best
+from jobs import JobManager
+from cache import get_default_cache
+from streaming import SolveStream
+from rescheduling import reschedule
+from scenarios import solve_many
+from metrics import metrics_enabled, record_solve, render_metrics
+from model_store import get_default_store
+from data_io import import_data, export_data, export_schedule, FORMATS, KINDS, MEDIA_TYPES
+from validation import validate_problem, summarize
+
+# Solver modules log through the standard logging module (CP-SAT search log:
+# 'or_tools.search', only with solver_config log_search_progress)
+logging.basicConfig(level=os.environ.get('SCHEDULER_LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s: %(message)s')
 
 app = Flask(__name__)
+job_manager = JobManager()  # Bounded pool of background solve processes
 
 @app.route('/')
 def index():
@@ -14,14 +36,343 @@ def solve():
     # Extract data
     machines = data.get('machines', [])  # List of machines with operations
     products = data.get('products', [])  # List of products with tasks
-    setup_times = data.get('setup_times', {})  # Setup time matrix
+    setup_times = data.get('setup_times', {})  # "A-B" dict or {"products", "matrix"/"pairs", "families", ...}
     orders = data.get('orders', [])  # List of orders with quantities and deadlines
     start_time = data.get('start_time', 0)  # Production start time
+    sequencing = data.get('sequencing', 'pairwise')  # 'pairwise' or 'circuit' setup model
+    batching = data.get('batching', False)  # Schedule each order as lots instead of per unit
+    sublots = data.get('sublots', 1)  # Number of lots per order when batching
+    flexible = data.get('flexible', False)  # Let tasks use any capable machine
+    solver_config = data.get('solver_config')  # Workers, time limit, gaps, seed, logging
+    warm_start = data.get('warm_start')  # Previous result or schedule to hint from
+    decomposition = data.get('decomposition')  # e.g. {"split": "deadline", "max_tasks_per_window": 300}
+    engine = data.get('engine', 'cp_sat')  # 'cp_sat' or 'dispatch' (greedy, milliseconds)
+    rule = data.get('rule')  # Dispatching rule for engine='dispatch' (default: best of all)
+    use_cache = data.get('cache', True)  # Reuse the result of an identical earlier request
+    result_format = data.get('format', 'rows')  # 'columnar': one list per field instead of per-task dicts
+    calendars = data.get('calendars')  # Named shift calendars, referenced by machine 'calendar' fields
+    validate = data.get('validate', True)  # Input check in the result; 'strict' rejects inputs with errors
+    objective = data.get('objective', 'weighted')  # 'lexicographic': tardiness first, then makespan, ...
+    stages = data.get('stages')  # Lexicographic stages, e.g. ["max_tardiness", {"objective": "makespan", "time_limit": 30}]
     
     # Call OR-Tools solver
-    result = solve_schedule(machines, products, setup_times, orders, start_time)
+    try:
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown format '{result_format}', expected one of {RESULT_FORMATS}")
+        validation = None
+        if validate:
+            validation = validate_problem(machines, products, setup_times, orders, start_time,
+                                          batching=batching, sublots=sublots, flexible=flexible,
+                                          calendars=calendars)
+            if validate == 'strict' and not validation['valid']:
+                return jsonify({'status': 'ERROR', 'message': summarize(validation),
+                                'validation': validation}), 400
+        if engine == 'dispatch':
+            if rule:
+                result = solve_dispatch(machines, products, setup_times, orders, start_time, rule=rule,
+                                        batching=batching, sublots=sublots, flexible=flexible,
+                                        calendars=calendars)
+            else:
+                result = solve_dispatch_best(machines, products, setup_times, orders, start_time,
+                                             batching=batching, sublots=sublots, flexible=flexible,
+                                             calendars=calendars)
+        elif decomposition:
+            # Large order books: rolling-horizon windows instead of one monolithic model
+            result = solve_rolling_horizon(machines, products, setup_times, orders, start_time,
+                                           sequencing=sequencing, batching=batching, sublots=sublots,
+                                           flexible=flexible, solver_config=solver_config,
+                                           calendars=calendars, objective=objective, stages=stages,
+                                           **decomposition)
+        else:
+            solve = get_default_cache().solve if use_cache else solve_schedule
+            result = solve(machines, products, setup_times, orders, start_time,
+                           sequencing=sequencing, batching=batching, sublots=sublots,
+                           flexible=flexible, solver_config=solver_config,
+                           warm_start=warm_start, result_format=result_format, calendars=calendars,
+                           objective=objective, stages=stages, validate=False)  # Checked above
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+    record_solve(result, engine='dispatch' if engine == 'dispatch' else 'rolling' if decomposition else 'cp_sat')
+
+    # CP-SAT found nothing in time: fall back to the dispatching-rule schedule
+    if result.get('solver_status') == 'UNKNOWN':
+        fallback = solve_dispatch_best(machines, products, setup_times, orders, start_time,
+                                       batching=batching, sublots=sublots, flexible=flexible,
+                                       calendars=calendars)
+        fallback['fallback_reason'] = result['message']
+        result = fallback
+        record_solve(result, engine='dispatch')
+
+    if validation is not None:
+        result['validation'] = validation  # Also for dispatch and fallback results
+        if result['status'] == 'INFEASIBLE':
+            result['message'] = f"{result.get('message', 'No solution found')} {summarize(validation)}"
+
+    # Dispatch, rolling-horizon and fallback results are converted afterwards
+    if result_format == 'columnar' and 'schedule' in result:
+        result['schedule_columns'] = compact_schedule(result.pop('schedule'))
     
     return jsonify(result)  # Send result back as JSON
 
+@app.route('/validate', methods=['POST'])
+def validate_route():
+    data = request.json  # Same fields as /solve; nothing is solved
+    report = validate_problem(data.get('machines', []), data.get('products', []), data.get('setup_times', {}),
+                              data.get('orders', []), data.get('start_time', 0),
+                              batching=data.get('batching', False), sublots=data.get('sublots', 1),
+                              flexible=data.get('flexible', False), calendars=data.get('calendars'))
+    report['message'] = summarize(report)
+    return jsonify(report)  # Unknown products, uncovered operations, machine load, lower bounds
+
+@app.route('/solve/batch', methods=['POST'])
+def solve_batch():
+    data = request.json  # Base problem (same fields as /solve, CP-SAT engine only), plus:
+    scenarios = data.get('scenarios', [])  # Patches: add_machines, deadline_shift, add_orders, ...
+    include_base = data.get('include_base', True)  # Also solve the unpatched problem as the reference
+    include_schedules = data.get('include_schedules', False)  # Full schedules, not just the comparison
+    max_processes = data.get('max_processes')  # Cap on scenarios solved in parallel
+
+    try:
+        resolve_solver_config(data.get('solver_config'))  # Fail before starting the pool
+        resolve_objective(data.get('objective', 'weighted'), data.get('stages'), data.get('solver_config'),
+                          data.get('sequencing', 'pairwise'))
+        result = solve_many(data.get('machines', []), data.get('products', []),
+                            data.get('setup_times', {}), data.get('orders', []),
+                            data.get('start_time', 0), scenarios,
+                            include_base=include_base, include_schedules=include_schedules,
+                            max_processes=max_processes,
+                            sequencing=data.get('sequencing', 'pairwise'),
+                            batching=data.get('batching', False), sublots=data.get('sublots', 1),
+                            flexible=data.get('flexible', False),
+                            solver_config=data.get('solver_config'),
+                            calendars=data.get('calendars'),
+                            objective=data.get('objective', 'weighted'), stages=data.get('stages'))
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+    for scenario_result in result['results']:
+        record_solve(scenario_result, engine='batch')
+
+    return jsonify(result)
+
+@app.route('/reschedule', methods=['POST'])
+def reschedule_route():
+    data = request.json  # Master data and orders of the current plan, plus:
+    current = data.get('current', {})  # Current plan (result or schedule rows)
+    now = data.get('now', 0)  # Hours from the plan start or ISO datetime
+    events = data.get('events', [])  # machine_down / new_order / cancel_order / task_completed
+    frozen_hours = data.get('frozen_hours', 0)  # Tasks starting before now + frozen_hours stay pinned
+    deviation_weight = data.get('deviation_weight', 1)  # Cost per hour a task moves
+
+    try:
+        result = reschedule(data.get('machines', []), data.get('products', []),
+                            data.get('setup_times', {}), data.get('orders', []),
+                            data.get('start_time', 0), current, now, events,
+                            frozen_hours=frozen_hours, deviation_weight=deviation_weight,
+                            sequencing=data.get('sequencing', 'pairwise'),
+                            batching=data.get('batching', False), sublots=data.get('sublots', 1),
+                            flexible=data.get('flexible', False),
+                            solver_config=data.get('solver_config'),
+                            calendars=data.get('calendars'),
+                            objective=data.get('objective', 'weighted'), stages=data.get('stages'))
+    except (ValueError, KeyError) as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+    record_solve(result, engine='reschedule')
+
+    return jsonify(result)
+
+@app.route('/cache', methods=['GET'])
+def cache_info():
+    return jsonify(get_default_cache().info())  # Hits, misses, evictions, entries, bytes
+
+@app.route('/cache', methods=['DELETE'])
+def clear_cache():
+    get_default_cache().clear()
+    return jsonify(get_default_cache().info())
+
+@app.route('/solve/stream', methods=['POST'])
+def solve_stream():
+    data = request.json  # Same fields as /solve (CP-SAT engine only), plus:
+    diff = data.get('diff', False)  # Include a compact schedule diff per solution
+    stop_at_gap = data.get('stop_at_gap')  # e.g. 0.05: stop once within 5% of the bound
+
+    try:
+        resolve_solver_config(data.get('solver_config'))  # Fail before the stream starts
+        resolve_objective(data.get('objective', 'weighted'), data.get('stages'), data.get('solver_config'),
+                          data.get('sequencing', 'pairwise'))
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+
+    stream = SolveStream(
+        data.get('machines', []),
+        data.get('products', []),
+        data.get('setup_times', {}),
+        data.get('orders', []),
+        data.get('start_time', 0),
+        diff=diff,
+        stop_at_gap=stop_at_gap,
+        sequencing=data.get('sequencing', 'pairwise'),
+        batching=data.get('batching', False),
+        sublots=data.get('sublots', 1),
+        flexible=data.get('flexible', False),
+        solver_config=data.get('solver_config'),
+        warm_start=data.get('warm_start'),
+        calendars=data.get('calendars'),
+        objective=data.get('objective', 'weighted'),
+        stages=data.get('stages'),
+    )
+
+    # Server-Sent Events: one 'progress' event per improving solution, then
+    # a final 'result' event. Closing the connection stops the solver.
+    def events():
+        try:
+            for kind, payload in stream:
+                if kind == 'result':
+                    record_solve(payload)
+                yield f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+        except ValueError as e:
+            yield f"event: error\ndata: {json.dumps({'status': 'ERROR', 'message': str(e)})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    data = request.json  # Same fields as /solve (CP-SAT engine only)
+
+    try:
+        resolve_solver_config(data.get('solver_config'))  # Reject bad configs before queueing
+        resolve_objective(data.get('objective', 'weighted'), data.get('stages'), data.get('solver_config'),
+                          data.get('sequencing', 'pairwise'))
+        job_id = job_manager.submit(
+            machines=data.get('machines', []),
+            products=data.get('products', []),
+            setup_times=data.get('setup_times', {}),
+            orders=data.get('orders', []),
+            start_time=data.get('start_time', 0),
+            sequencing=data.get('sequencing', 'pairwise'),
+            batching=data.get('batching', False),
+            sublots=data.get('sublots', 1),
+            flexible=data.get('flexible', False),
+            solver_config=data.get('solver_config'),
+            warm_start=data.get('warm_start'),
+            calendars=data.get('calendars'),
+            objective=data.get('objective', 'weighted'),
+            stages=data.get('stages'),
+            progress_schedule=data.get('progress_schedule', False),  # Partial schedules while running
+        )
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)  # Status, best-so-far objective, partial schedule
+    if job is None:
+        return jsonify({'status': 'ERROR', 'message': f"Unknown job '{job_id}'"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    status = job_manager.cancel(job_id)  # Running jobs keep their best solution so far
+    if status is None:
+        return jsonify({'status': 'ERROR', 'message': f"Unknown job '{job_id}'"}), 404
+    return jsonify({'job_id': job_id, 'status': status})
+
+@app.route('/models', methods=['POST'])
+def store_model():
+    # A saved model (application/zip, see CompiledModel.save) or the model
+    # fields of /solve (CP-SAT engine, without solver settings) to build one
+    try:
+        if request.mimetype == 'application/zip':
+            model_id = get_default_store().put_bytes(request.get_data())
+        else:
+            data = request.json
+            model_id = get_default_store().put(build_model(
+                data.get('machines', []), data.get('products', []), data.get('setup_times', {}),
+                data.get('orders', []), data.get('start_time', 0),
+                sequencing=data.get('sequencing', 'pairwise'), batching=data.get('batching', False),
+                sublots=data.get('sublots', 1), flexible=data.get('flexible', False),
+                warm_start=data.get('warm_start'), calendars=data.get('calendars'),
+                objective=data.get('objective', 'weighted'), stages=data.get('stages')))
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+
+    compiled = get_default_store().get(model_id)
+    return jsonify({'model_id': model_id, 'model': compiled.stats['model']}), 201
+
+@app.route('/models/<model_id>', methods=['GET'])
+def download_model(model_id):
+    compiled = get_default_store().get(model_id)  # Load it again with POST /models or load_model()
+    if compiled is None:
+        return jsonify({'status': 'ERROR', 'message': f"Unknown model '{model_id}'"}), 404
+    return Response(compiled.to_bytes(), content_type='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={model_id}.model'})
+
+@app.route('/models/<model_id>', methods=['DELETE'])
+def delete_model(model_id):
+    if not get_default_store().delete(model_id):
+        return jsonify({'status': 'ERROR', 'message': f"Unknown model '{model_id}'"}), 404
+    return jsonify({'model_id': model_id, 'status': 'deleted'})
+
+@app.route('/models/<model_id>/solve', methods=['POST'])
+def solve_model(model_id):
+    data = request.json or {}  # Only solver settings: the model is already built
+    compiled = get_default_store().get(model_id)
+    if compiled is None:
+        return jsonify({'status': 'ERROR', 'message': f"Unknown model '{model_id}'"}), 404
+
+    try:
+        result = compiled.solve(data.get('solver_config'), result_format=data.get('format', 'rows'),
+                                stages=data.get('stages'))
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+    record_solve(result, engine='cp_sat')
+
+    return jsonify(result)
+
+@app.route('/import/<kind>', methods=['POST'])
+def import_file(kind):
+    # A CSV / Parquet / JSON Lines file of machines, products, setup_times or
+    # orders, as a multipart 'file' upload or the raw request body
+    upload = request.files.get('file')
+    source = upload.stream if upload else io.BytesIO(request.get_data())
+    file_format = request.args.get('format')  # Default: suffix of the uploaded file name
+    if file_format is None and upload and upload.filename:
+        file_format = os.path.splitext(upload.filename)[1].lstrip('.').lower() or None
+    try:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}', expected one of {KINDS}")
+        data = import_data(kind, source, format=file_format)
+    except ValueError as e:  # Including SchemaError: the offending rows
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+
+    return jsonify({kind: data, 'rows': len(data)})  # Ready to post to /solve
+
+@app.route('/export/<kind>', methods=['POST'])
+def export_file(kind):
+    data = request.json  # {"data": [...], "format": "csv"}; kind 'schedule': a /solve result
+    file_format = request.args.get('format', data.get('format', 'parquet' if kind == 'schedule' else 'csv'))
+    if file_format not in FORMATS:
+        return jsonify({'status': 'ERROR', 'message': f"Unknown file format '{file_format}', "
+                                                      f"expected one of {FORMATS}"}), 400
+    try:
+        if kind == 'schedule':
+            body = export_schedule(data.get('result', data), format=file_format)
+        else:
+            body = export_data(kind, data.get('data', []), format=file_format, products=data.get('products'))
+    except ValueError as e:
+        return jsonify({'status': 'ERROR', 'message': str(e)}), 400
+
+    return Response(body, content_type=MEDIA_TYPES[file_format],
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{file_format}'})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    if not metrics_enabled():  # Needs prometheus_client; SCHEDULER_METRICS=0 turns it off
+        return jsonify({'status': 'ERROR', 'message': 'Metrics are disabled'}), 404
+    body, content_type = render_metrics()  # Prometheus text format
+    return Response(body, content_type=content_type)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)  # Run Flask server on port 5000
\ No newline at end of file
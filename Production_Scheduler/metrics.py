@@ -0,0 +1,100 @@
+"""
+Prometheus Metrics
+==================
+Turns the statistics of every solve made through the Flask app (see
+result['stats'] of solve_schedule) into Prometheus metrics, served on
+GET /metrics.
+
+Needs the optional prometheus_client package. Without it, or with the
+environment variable SCHEDULER_METRICS=0, record_solve does nothing and
+/metrics answers 404.
+
+Metrics:
+    scheduler_solves_total{engine, status}     Solves by engine and result status
+    scheduler_solve_seconds{engine}            Wall time of the whole solve
+    scheduler_phase_seconds{phase}             CP-SAT solves: time per SOLVE_PHASES phase
+    scheduler_model_size{kind}                 CP-SAT solves: variables, literals,
+                                               constraints, intervals, tasks
+    scheduler_solver_gap                       CP-SAT solves: relative gap at the end
+    scheduler_cache_lookups_total{outcome}     Result cache: hit, rebased, miss
+"""
+
+import os
+
+try:
+    import prometheus_client
+except ImportError:  # Optional dependency
+    prometheus_client = None
+
+_MODEL_SIZE_KINDS = ('variables', 'literals', 'constraints', 'intervals', 'tasks')
+
+_metrics = None
+
+
+def metrics_enabled():
+    return prometheus_client is not None and os.environ.get('SCHEDULER_METRICS', '1') != '0'
+
+
+def record_solve(result, engine='cp_sat'):
+    """
+    Records one solve result (any engine); a no-op when metrics are disabled.
+    """
+    if not metrics_enabled():
+        return
+    metrics = _get_metrics()
+    stats = result.get('stats', {})
+
+    metrics['solves'].labels(engine=engine, status=result.get('status', 'UNKNOWN')).inc()
+    if 'cache' in result:
+        metrics['cache_lookups'].labels(outcome=result['cache']).inc()
+        if result['cache'] != 'miss':
+            return  # Nothing was solved: the stats belong to the original solve
+
+    total_time = stats.get('total_time', result.get('solve_time'))
+    if total_time is None and 'decomposition' in result:
+        total_time = result['decomposition']['total_time']
+    if total_time is not None:
+        metrics['solve_seconds'].labels(engine=engine).observe(total_time)
+
+    for phase, seconds in stats.get('phases', {}).items():
+        metrics['phase_seconds'].labels(phase=phase).observe(seconds)
+    model_stats = stats.get('model', {})
+    for kind in _MODEL_SIZE_KINDS:
+        if kind in model_stats:
+            metrics['model_size'].labels(kind=kind).observe(model_stats[kind])
+    gap = stats.get('solver', {}).get('gap')
+    if gap is not None:
+        metrics['gap'].observe(gap)
+
+
+def render_metrics():
+    """
+    Current metrics in the Prometheus text format, as (body, content type).
+    """
+    _get_metrics()
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def _get_metrics():
+    # Created on first use, so importing this module registers nothing
+    global _metrics
+    if _metrics is None:
+        _metrics = {
+            'solves': prometheus_client.Counter(
+                'scheduler_solves', 'Solves by engine and result status', ['engine', 'status']),
+            'solve_seconds': prometheus_client.Histogram(
+                'scheduler_solve_seconds', 'Wall time of a solve', ['engine'],
+                buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)),
+            'phase_seconds': prometheus_client.Histogram(
+                'scheduler_phase_seconds', 'CP-SAT solve time per phase', ['phase'],
+                buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)),
+            'model_size': prometheus_client.Histogram(
+                'scheduler_model_size', 'CP-SAT model size', ['kind'],
+                buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)),
+            'gap': prometheus_client.Histogram(
+                'scheduler_solver_gap', 'Relative gap of CP-SAT solves',
+                buckets=(0, 0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1)),
+            'cache_lookups': prometheus_client.Counter(
+                'scheduler_cache_lookups', 'Result cache lookups by outcome', ['outcome']),
+        }
+    return _metrics
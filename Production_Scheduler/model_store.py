@@ -0,0 +1,128 @@
+"""
+Compiled Model Store
+====================
+Keeps built CP-SAT models (see or_tools.build_model) so a problem can be
+re-solved with other solver settings - a longer time limit, more workers, a
+different seed - without building it again:
+
+    store = get_default_store()
+    model_id = store.put(build_model(machines, products, setup_times, orders, start_time))
+    store.get(model_id).solve({'time_limit': 300})
+
+Models are kept as CompiledModel objects, least-recently-used first out once
+more than max_models are stored. With a directory path, every model is also
+saved there as <model_id>.model (CompiledModel.save), so models survive
+restarts and can be copied to another machine, e.g. for parameter tuning.
+
+Environment variables for the default store used by the API:
+    SCHEDULER_MODEL_STORE_PATH   Directory for saved models (unset = memory only)
+    SCHEDULER_MODEL_STORE_SIZE   Models kept in memory (default 16)
+"""
+
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from or_tools import CompiledModel, load_model
+
+_MODEL_ID = re.compile(r'^[0-9a-f]{32}$')
+
+_default_store = None
+
+
+class ModelStore:
+    """
+    LRU store of CompiledModel objects, optionally backed by a directory.
+    """
+
+    def __init__(self, max_models=16, path=None):
+        """
+        Args:
+            max_models: Models kept in memory
+            path: Directory to save models in; None keeps them in memory only
+        """
+        self.max_models = max_models
+        self.path = path
+        self._lock = threading.Lock()
+        self._models = OrderedDict()  # model_id -> CompiledModel
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def put(self, compiled):
+        """
+        Stores a CompiledModel and returns its new id.
+        """
+        model_id = uuid.uuid4().hex
+        if self.path is not None:
+            compiled.save(self._file(model_id))
+        with self._lock:
+            self._models[model_id] = compiled
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model_id
+
+    def put_bytes(self, data):
+        """
+        Stores a model from CompiledModel.to_bytes() output (e.g. an upload).
+
+        Raises:
+            ValueError: If the data is not a saved model of this version
+        """
+        return self.put(CompiledModel.from_bytes(data))
+
+    def get(self, model_id):
+        """
+        The CompiledModel stored under model_id, or None.
+        """
+        if not _MODEL_ID.match(model_id):
+            return None
+        with self._lock:
+            compiled = self._models.get(model_id)
+            if compiled is not None:
+                self._models.move_to_end(model_id)
+                return compiled
+        if self.path is None or not os.path.exists(self._file(model_id)):
+            return None
+
+        compiled = load_model(self._file(model_id))
+        with self._lock:
+            self._models[model_id] = compiled
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return compiled
+
+    def delete(self, model_id):
+        """
+        Removes a model; returns False if it was not stored.
+        """
+        if not _MODEL_ID.match(model_id):
+            return False
+        with self._lock:
+            found = self._models.pop(model_id, None) is not None
+        if self.path is not None and os.path.exists(self._file(model_id)):
+            os.remove(self._file(model_id))
+            found = True
+        return found
+
+    def info(self):
+        with self._lock:
+            return {'models': list(self._models), 'max_models': self.max_models,
+                    'backend': 'directory' if self.path is not None else 'memory'}
+
+    def _file(self, model_id):
+        return os.path.join(self.path, f'{model_id}.model')
+
+
+def get_default_store():
+    """
+    Process-wide store configured from the SCHEDULER_MODEL_STORE_* environment variables.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = ModelStore(
+            max_models=int(os.environ.get('SCHEDULER_MODEL_STORE_SIZE', 16)),
+            path=os.environ.get('SCHEDULER_MODEL_STORE_PATH'),
+        )
+    return _default_store
@@ -9,37 +9,276 @@ This module solves a production scheduling problem with the following constraint
 - Tasks within a product must be completed sequentially (precedence constraint)
 - Soft deadline constraints with penalty (allows violations if necessary)
 
-The solver minimizes: makespan + 1000 * deadline_violations
+The solver minimizes: makespan + 1000 * deadline_violations, or with
+objective='lexicographic' one objective after the other (see OBJECTIVE_STAGES)
 
 
-    # CONSTRAINTS ADDED IN THIS MODULE:
-    # 1. PRECEDENCE CONSTRAINT (line ~159) - Sequential task execution within product
-    # 2. NO-OVERLAP CONSTRAINT (line ~215) - No simultaneous tasks on same machine
-    # 3. SETUP TIME CONSTRAINTS (line ~243, ~249) - Transition time between products
-    # 4. SOFT DEADLINE CONSTRAINT (line ~193) - Order deadline with penalty for violation
+    # CONSTRAINTS ADDED IN THIS MODULE (all in build_model, marked "CONSTRAINT n"):
+    # 1. PRECEDENCE CONSTRAINT - Sequential task execution within product
+    # 2. NO-OVERLAP CONSTRAINT - No simultaneous tasks on same machine
+    # 3. SETUP TIME CONSTRAINTS - Transition time between products
+    #    (or, with sequencing='circuit', AddCircuit arcs in _add_circuit_setup_constraints)
+    # 4. SOFT DEADLINE CONSTRAINT - Order deadline with penalty for violation
 """
 
 from ortools.sat.python import cp_model
-from datetime import datetime
-
-
-def solve_schedule(machines, products, setup_times, orders, start_time):
+from collections import defaultdict
+import io
+import json
+import logging
+import math
+import os
+import threading
+import zipfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from calendars import WEEK_HOURS, machine_calendars
+from setup_matrix import as_setup_matrix
+
+logger = logging.getLogger(__name__)
+
+# The CP-SAT search log (solver_config log_search_progress) goes here
+search_logger = logging.getLogger(__name__ + '.search')
+
+
+SEQUENCING_MODES = ('pairwise', 'circuit')
+
+# 'weighted': one solve of makespan + 1000 * violations (+ deviation penalty)
+# 'lexicographic': one solve per stage, each stage's optimum fixed for the next
+OBJECTIVES = ('weighted', 'lexicographic')
+
+# Objectives of lexicographic stages:
+#   total_tardiness     Sum of the hours orders are late
+#   weighted_tardiness  Same, weighted by the orders' optional 'weight' (default 1)
+#   max_tardiness       Hours the latest order is late
+#   makespan            Completion of the last task (plus the deviation
+#                       penalty when rescheduling with deviation_weight)
+#   setup_time          Total changeover hours (sequencing='circuit' only)
+OBJECTIVE_STAGES = ('total_tardiness', 'weighted_tardiness', 'max_tardiness', 'makespan', 'setup_time')
+
+# Stages solved for objective='lexicographic' without explicit stages
+DEFAULT_STAGES = ('total_tardiness', 'makespan')
+
+# Keys of a stage given as a dict instead of a name
+STAGE_KEYS = ('objective', 'time_limit', 'relative_gap', 'tolerance')
+
+# Phases timed in result['stats']['phases'] (seconds), in execution order.
+# Build phases count only in the first solve of a model; model_load is the
+# time load_model took instead
+SOLVE_PHASES = ('model_load', 'input_parsing', 'domain_tightening', 'task_creation', 'no_overlap',
+                'setup_constraints', 'objective', 'hints', 'model_stats', 'presolve', 'search', 'extraction',
+                'post_processing')
+
+# Version of the CompiledModel.save() archive layout
+MODEL_FORMAT_VERSION = 2
+
+# NumPy columns of _task_columns (saved as lists)
+_TASK_ARRAY_COLUMNS = ('machine', 'duration', 'units', 'first_unit', 'step', 'order_index', 'product',
+                       'operation', 'alternative_task', 'alternative_machine', 'alternative_duration',
+                       'fixed_tasks', 'setup_matrix')
+
+# Schedule layouts of a result (solve_schedule result_format)
+RESULT_FORMATS = ('rows', 'columnar')
+
+# Fields of a compact (columnar) schedule, see compact_schedule()
+COMPACT_COLUMNS = ('task_id', 'order', 'order_index', 'step', 'unit', 'operation', 'machine',
+                   'start', 'end', 'duration', 'setup_time')
+
+# Solver settings accepted through solve_schedule(solver_config=...),
+# the /solve route and the Streamlit sidebar (see default_solver_config)
+SOLVER_CONFIG_KEYS = (
+    'num_workers',          # Parallel CP-SAT search workers
+    'time_limit',           # Seconds
+    'relative_gap',         # Stop when (objective - bound) / objective <= gap
+    'absolute_gap',         # Stop when objective - bound <= gap
+    'random_seed',          # Seed for reproducible runs (with num_workers=1)
+    'use_hints',            # Keep solution hints added to the model
+    'log_search_progress',  # CP-SAT search log, to the 'or_tools.search' logger
+    'search_branching',     # e.g. 'AUTOMATIC_SEARCH', 'FIXED_SEARCH', 'PORTFOLIO_SEARCH'
+)
+
+# CP-SAT search strategies accepted as solver_config['search_branching']
+SEARCH_BRANCHINGS = tuple(name for name in dir(cp_model) if name.endswith('_SEARCH'))
+
+# Master-data indexes reused across calls, keyed by a signature of the
+# machines and products they were built from (see get_master_data_index)
+_index_cache = {}
+_INDEX_CACHE_SIZE = 8
+_index_cache_lock = threading.Lock()  # Flask serves requests from several threads
+
+
+def solve_schedule(machines, products, setup_times, orders, start_time, sequencing='pairwise',
+                   batching=False, sublots=1, flexible=False, solver_config=None,
+                   warm_start=None, machine_available=None, tighten_domains=True,
+                   progress_callback=None, progress_schedule=False, stop_event=None,
+                   machine_unavailable=None, fixed_tasks=None, release_time=0,
+                   reference_schedule=None, deviation_weight=0, result_format='rows', calendars=None,
+                   validate=True, objective='weighted', stages=None):
     """
     Solves the production scheduling problem using CP-SAT solver.
 
     Args:
-        machines: List of dicts with 'name' and 'operations' (list of operation names)
-        products: List of dicts with 'name' and 'tasks' (list of operations with durations)
-        setup_times: Dict mapping "product1-product2" to setup time in hours
+        machines: List of dicts with 'name' and 'operations' (list of operation names),
+            optionally 'speed' (duration on this machine = ceil(duration / speed))
+        products: List of dicts with 'name' and 'tasks' (list of operations with durations);
+            a task may carry 'machine_durations' ({machine name: hours}) to
+            override its duration on specific machines
+        setup_times: Setup (changeover) hours between products: a SetupMatrix
+            (see setup_matrix.py), its JSON form, or a legacy dict mapping
+            "product1-product2" to hours
         orders: List of dicts with 'product', 'quantity', and 'deadline' (in hours)
         start_time: Production start datetime (ISO string or datetime object)
+        sequencing: How setup times are modelled on each machine:
+            'pairwise' - two reified booleans per task pair with a setup time
+            'circuit'  - one successor graph per machine (AddCircuit with a
+                         dummy depot), setup times placed on the arcs, so
+                         only consecutive tasks need a setup. Arcs that
+                         cannot occur (recipe order within a unit,
+                         interchangeable units of one order, time windows)
+                         are left out, and the circuit is only built on
+                         machines where it is then no larger than the
+                         pairwise constraints (see _circuit_arcs); the
+                         other machines use those. With a setup_time stage
+                         in `stages` every machine with setups gets a
+                         circuit (the stage sums its arcs).
+        batching: If True, each order is scheduled as lots instead of one task
+            chain per unit. A lot of k units occupies its machine for
+            k * duration and is expanded back into per-unit rows in the result.
+        sublots: Number of lots each order is split into when batching
+            (capped at the order quantity). 1 = the whole order is one lot.
+        flexible: If True, a task may run on any machine that supports its
+            operation (flexible job shop). Each capable machine gets an
+            optional interval and exactly one of them is selected. If False,
+            the task is bound to the first capable machine.
+        solver_config: Optional dict overriding default_solver_config()
+            (workers, time limit, gaps, seed, hints, logging, search branching)
+        warm_start: Optional previous result (or its 'schedule' list). Its task
+            times and machines are added as solution hints, matched to the new
+            model by order index, product, recipe step, operation and unit.
+            Pass 'dispatch' to hint from the best dispatching-rule schedule
+            (see dispatching.py) instead. Without a warm start, that schedule
+            is hinted whenever it also cut the horizon (tighten_domains).
+        machine_available: Optional dict mapping machine name to the hour
+            (relative to start_time) from which it is free. Used by the
+            rolling-horizon solver to carry machine state between windows.
+        tighten_domains: If True, the horizon comes from a dispatching-rule
+            schedule (see dispatching.py) instead of 3x the total work, and
+            every start/end variable gets its own [earliest start, latest end]
+            window from the recipe. Before/after sizes are in result['stats'].
+            The greedy bound is makespan + 1000 * violation hours, so the
+            horizon only shrinks when that schedule (nearly) meets every
+            deadline; otherwise only the recipe windows help.
+        progress_callback: Optional callable invoked with a dict ('objective',
+            'bound', 'gap', 'elapsed', 'solutions') for every improving solution
+        progress_schedule: If True, progress dicts also carry the solution's
+            'schedule' rows (costs an extraction per solution)
+        stop_event: Optional threading/multiprocessing Event; once set, the
+            search stops and the best solution found so far is returned
+        machine_unavailable: Optional dict mapping machine name to a list of
+            (start, end) hour windows in which the machine cannot work
+        fixed_tasks: Optional dict (order_index, step, first unit) ->
+            {'start', 'end', 'machine'} of tasks pinned to those values
+            (e.g. tasks already running when rescheduling)
+        release_time: Hour before which no unpinned task may start
+        reference_schedule: Optional previous schedule; with deviation_weight
+            > 0 every hour an unpinned task starts away from its reference
+            start adds deviation_weight to the objective
+        deviation_weight: Objective weight of the deviation from reference_schedule
+        calendars: Optional dict of named calendar specs (shifts, breaks,
+            blocked periods, see calendars.py), referenced by a machine's
+            'calendar' field (which may also hold a spec itself);
+            calendars['default'] applies to machines without one. Off-shift
+            time becomes fixed intervals in the machine's no-overlap
+            constraint, so tasks only run within shifts (never across a gap)
+        result_format: 'rows' - 'schedule' is a list of per-task dicts
+                       'columnar' - 'schedule_columns' holds one list per field
+                       instead (see compact_schedule), for callers that do not
+                       need per-task dicts
+        objective: 'weighted' - minimize makespan + 1000 * total violation
+                       hours (+ the deviation penalty) in one solve
+                   'lexicographic' - solve `stages` one after the other:
+                       each stage minimizes its objective with the optimum of
+                       the previous stages fixed as a constraint, starting
+                       from the previous stage's solution as hints. No weight
+                       has to outweigh the horizon, and the objectives keep
+                       small coefficients
+        stages: Lexicographic stages (default DEFAULT_STAGES): names from
+            OBJECTIVE_STAGES or dicts with 'objective' and optionally
+            'time_limit' (seconds; default: an equal share of the solver
+            time limit), 'relative_gap' and 'tolerance' (units this stage's
+            optimum may be exceeded by in later stages). Weighted tardiness
+            uses the orders' optional integer 'weight'. Per-stage values,
+            bounds, statuses and times are returned in result['stages']
+        validate: If True, the input is checked first (see validation.py)
+            and the report is returned in result['validation']; orders and
+            recipe steps the model has to skip show up there as errors
 
     Returns:
-        Dict with 'status', 'makespan', 'schedule', and violation information
+        Dict with 'status', 'makespan', 'schedule', and violation information.
+        'stats' holds the domain sizes ('domains'), seconds per phase
+        ('phases', see SOLVE_PHASES), the model size ('model') and the
+        CP-SAT response statistics ('solver')
+    """
+
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result_format '{result_format}', expected one of {RESULT_FORMATS}")
+    resolve_solver_config(solver_config)  # Fail before building the model
+    resolve_objective(objective, stages, solver_config, sequencing)
+    validation = None
+    if validate:
+        from validation import validate_problem, summarize  # Imported here: validation imports this module
+        validation = validate_problem(machines, products, setup_times, orders, start_time, batching=batching,
+                                      sublots=sublots, flexible=flexible, calendars=calendars,
+                                      machine_unavailable=machine_unavailable)
+        for issue in validation['errors']:
+            logger.warning("Input error: %s", issue['message'])
+
+    compiled = build_model(machines, products, setup_times, orders, start_time, sequencing=sequencing,
+                           batching=batching, sublots=sublots, flexible=flexible, warm_start=warm_start,
+                           machine_available=machine_available, tighten_domains=tighten_domains,
+                           machine_unavailable=machine_unavailable, fixed_tasks=fixed_tasks,
+                           release_time=release_time, reference_schedule=reference_schedule,
+                           deviation_weight=deviation_weight, calendars=calendars, objective=objective,
+                           stages=stages)
+    result = compiled.solve(solver_config, progress_callback=progress_callback,
+                            progress_schedule=progress_schedule, stop_event=stop_event,
+                            result_format=result_format, stages=stages)
+    if validation is not None:
+        result['validation'] = validation
+        if result['status'] == 'INFEASIBLE':
+            result['message'] += ' ' + summarize(validation)
+    return result
+
+
+def build_model(machines, products, setup_times, orders, start_time, sequencing='pairwise',
+                batching=False, sublots=1, flexible=False, warm_start=None, machine_available=None,
+                tighten_domains=True, machine_unavailable=None, fixed_tasks=None, release_time=0,
+                reference_schedule=None, deviation_weight=0, calendars=None, objective='weighted',
+                stages=None):
     """
+    Builds the CP-SAT model of a scheduling problem without solving it.
+
+    Takes the model arguments of solve_schedule (see there); `stages` only
+    matters for a setup_time stage, which needs a circuit on every machine. The returned
+    CompiledModel can be solved any number of times with different solver
+    settings, and saved and reloaded (CompiledModel.save / load_model) to
+    skip the build on later runs.
+    """
+    logger.info("Building model: %d machines, %d products, %d orders",
+                len(machines), len(products), len(orders))
+
+    if sequencing not in SEQUENCING_MODES:
+        raise ValueError(f"Unknown sequencing mode '{sequencing}', expected one of {SEQUENCING_MODES}")
+    if sublots < 1:
+        raise ValueError(f"sublots must be at least 1, got {sublots}")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
 
-    print("\n[API CALL] solve_schedule function called")
-    print(f"Inputs: {len(machines)} machines, {len(products)} products, {len(orders)} orders")
+    timer = _PhaseTimer()
 
     # ========================================================================
     # STEP 1: Initialize CP-SAT Model
@@ -60,6 +299,20 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
     # ========================================================================
     # STEP 3: Initialize Data Structures
     # ========================================================================
+    # Product / operation -> machine lookups, built once per master data set
+    index = get_master_data_index(machines, products)
+    product_by_name = index['product_by_name']
+    recipe_options = index['recipe_options']
+
+    # Setup times as a dense matrix over the ordered products: tasks carry a
+    # product id and every changeover lookup is a list index
+    setup_times = as_setup_matrix(setup_times, products)
+    order_products = list(dict.fromkeys(order['product'] for order in orders))
+    product_id = {name: i for i, name in enumerate(order_products)}
+    setup_rows = setup_times.dense(order_products).tolist()
+    has_setups = any(any(row) for row in setup_rows)
+    setup_matrix = np.array(setup_rows, dtype=np.int64).reshape(len(order_products), len(order_products))
+
     all_tasks = []  # Master list of all tasks with their CP variables
     task_vars = {}  # Quick lookup: task_id -> task info
     machine_tasks = {m['name']: [] for m in machines}  # Tasks grouped by machine for no-overlap constraints
@@ -73,13 +326,80 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
     # - Parallel execution on multiple machines
     # - Setup times between product changes
     # - Buffer for optimization flexibility
+    quantity_by_product = defaultdict(int)
+    for order in orders:
+        quantity_by_product[order['product']] += order['quantity']
+
     total_work = sum(
-        sum(task['duration'] for task in product['tasks']) *
-        sum(order['quantity'] for order in orders if order['product'] == product['name'])
-        for product in products
+        index['product_work'][i] * quantity_by_product.get(product['name'], 0)
+        for i, product in enumerate(products)
     )
     horizon = max(1000, int(total_work * 3))
-    print(f"Total work: {total_work}h, Horizon set to: {horizon}h")
+
+    # Machines working to a calendar have less capacity per hour: stretch the
+    # horizon by the least available machine, plus a week for the alignment
+    machine_calendar = machine_calendars(machines, calendars, start_datetime, machine_unavailable)
+    availability = min([calendar.availability for calendar in machine_calendar.values()], default=1)
+    if availability <= 0:
+        raise ValueError("A machine calendar has no working time")
+    if availability < 1:
+        horizon = math.ceil(horizon / availability) + WEEK_HOURS
+
+    machine_available = machine_available or {}
+    horizon += max(machine_available.values(), default=0)  # Machines busy until then
+    machine_unavailable = machine_unavailable or {}
+    fixed_tasks = fixed_tasks or {}
+    horizon += max([release_time] + [calendar.one_off_blocked[-1][1] for calendar in machine_calendar.values()
+                                     if calendar.one_off_blocked]
+                   + [fixed['end'] for fixed in fixed_tasks.values()])
+    crude_horizon = horizon
+    timer.lap('input_parsing')
+
+    # The setup_time stage sums the circuit arcs, so it needs a circuit on
+    # every machine with setups (see _circuit_arcs for the other machines)
+    full_circuit = objective == 'lexicographic' and any(
+        (stage if isinstance(stage, str) else stage.get('objective')) == 'setup_time' for stage in stages or ())
+
+    # Tighter horizon from a greedy schedule: the optimum satisfies
+    #   makespan + 1000 * violations <= greedy makespan + 1000 * greedy violations
+    # so no optimal solution ends after that value. Only valid when the greedy
+    # schedule is feasible for this model (the pairwise setup model enforces
+    # setups between all task pairs, not just consecutive ones; which machines
+    # get a circuit is only decided once their tasks exist, so every machine
+    # is checked), and only for the weighted objective: a lexicographic
+    # optimum may end later. Each greedy violation hour adds 1000 hours to the
+    # bound, so it only beats the crude horizon when the greedy schedule (nearly)
+    # meets every deadline. The best rule gives the lowest bound: a rule
+    # without violations only ever scores worse.
+    greedy = None
+    horizon_cut = False
+    # Greedy ignores these, and the deviation penalty is not in its bound
+    rescheduling = bool(fixed_tasks or release_time or (reference_schedule and deviation_weight))
+    if tighten_domains and orders and not rescheduling:
+        from dispatching import solve_dispatch_best  # Imported here: dispatching imports this module
+        greedy = solve_dispatch_best(machines, products, setup_times, orders, start_datetime.isoformat(),
+                                     batching=batching, sublots=sublots, flexible=flexible,
+                                     machine_available=machine_available,
+                                     machine_unavailable=machine_unavailable, calendars=calendars)
+        if objective == 'weighted' and _respects_pairwise_setups(greedy['schedule'], setup_times):
+            greedy_bound = greedy['makespan'] + 1000 * greedy['total_violation_hours']
+            horizon = max(1, min(horizon, greedy_bound))
+            horizon_cut = True
+            logger.debug("Greedy horizon bound: %sh (crude horizon %sh)", greedy_bound, crude_horizon)
+    logger.debug("Total work: %sh, horizon: %sh", total_work, horizon)
+    timer.lap('domain_tightening')
+
+    # Domain sizes of all integer variables, to report the effect of tightening
+    domain_stats = {'horizon_before': crude_horizon, 'horizon': horizon, 'size_before': 0, 'size_after': 0}
+    if greedy is not None:
+        domain_stats['greedy_makespan'] = greedy['makespan']
+        domain_stats['greedy_violation_hours'] = greedy['total_violation_hours']
+
+    def new_int_var(lower, upper, name):
+        upper = max(lower, upper)
+        domain_stats['size_before'] += crude_horizon + 1
+        domain_stats['size_after'] += upper - lower + 1
+        return model.NewIntVar(lower, upper, name)
 
     # ========================================================================
     # STEP 5: Initialize Task Tracking
@@ -97,14 +417,27 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
     #
 
 
+    makespan_lower = 0  # Longest recipe chain (lower bound on the makespan)
+    fixed_machine_load = defaultdict(int)  # Work of tasks bound to a single machine
+
+    # Reference start per (order_index, step, first unit) for the deviation penalty
+    reference_start = {}
+    if reference_schedule and deviation_weight:
+        for row in reference_schedule:
+            reference_start.setdefault((row['order_index'], row['step'], row['unit']), row['start'])
+    deviation_vars = []
+    pinned_orders = {key[0] for key in fixed_tasks} | {key[0] for key in reference_start}
+
     order_id = 0
-    for order in orders:
+    for order_index, order in enumerate(orders):
         product_name = order['product']
         quantity = order['quantity']
         deadline = order['deadline']
+        if not isinstance(order.get('weight', 1), int) or order.get('weight', 1) < 0:
+            raise ValueError(f"Order {order_index}: weight must be a non-negative integer, got {order['weight']!r}")
 
         # Find the product definition (recipe) for this order
-        product = next((p for p in products if p['name'] == product_name), None)
+        product = product_by_name.get(product_name)
         if not product:
             continue  # Skip if product doesn't exist
 
@@ -113,7 +446,7 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
         # ====================================================================
         # We allow deadline violations but heavily penalize them in the objective
         # order_violation = hours late (0 if on time)
-        order_violation = model.NewIntVar(0, horizon, f'order_violation_{order_id}')
+        order_violation = new_int_var(0, max(0, horizon - deadline), f'order_violation_{order_id}')
 
         # Track order information for later violation reporting
         order_info[order_id] = {
@@ -121,42 +454,133 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
             'deadline': deadline,
             'quantity': quantity,
             'violation_var': order_violation,
-            'last_task_end': None  # Will be set to the end time of the last task
+            'weight': order.get('weight', 1),
+            'last_task_end': None,  # Will be set to the end time of the last task
+            'lot_ends': []  # End of the final task of each lot (batching only)
         }
 
         # ====================================================================
-        # Create Tasks for Each Unit in the Order
+        # Create Tasks for Each Unit (or Lot) in the Order
         # ====================================================================
         # If quantity=3, we create 3 separate instances of all tasks for this product
-        # Note: We use _ as the loop variable since we only need to iterate quantity times
-
-        for _ in range(quantity):
+        # With batching, units are grouped into lots: each lot is one task chain
+        # whose durations are multiplied by the lot size
+        lot_sizes = _split_into_lots(quantity, sublots) if batching else [1] * quantity
+        first_unit = 0  # Index of the first unit in the current lot
+
+        # Shortest possible duration of each recipe step (per unit): gives each
+        # task's earliest start (work before it) and latest end (work after it)
+        min_durations = [
+            min(d for _, d in (opts if flexible else opts[:1])) if opts else 0
+            for opts in recipe_options[product_name]
+        ]
+        chain_length = sum(min_durations)
+
+        # Equal lots of an order that runs each step on one machine are
+        # interchangeable, so the circuit model may fix their order (see
+        # _circuit_arcs). Not when single units are pinned or have their own
+        # reference start, and without batching not the last unit: only its
+        # end carries the deadline
+        symmetric = sequencing == 'circuit' and order_index not in pinned_orders and all(
+            len(opts if flexible else opts[:1]) <= 1 for opts in recipe_options[product_name])
+
+        for lot_size in lot_sizes:
             prev_task_end = None  # Track previous task end for precedence constraints
+            work_before = 0  # Minimum work of earlier recipe steps in this lot
 
             # Iterate through each task in the product's recipe
-            for task in product['tasks']:
+            for step, (task, options) in enumerate(zip(product['tasks'], recipe_options[product_name])):
                 operation = task['operation']
                 duration = task['duration']
 
-                # Find a machine capable of performing this operation
-                machine = next((m for m in machines if operation in m['operations']), None)
-                if not machine:
+                # Find the machines capable of performing this operation
+                # (options = [(machine, duration on that machine), ...])
+                if not options:
                     continue  # Skip if no machine can perform this operation
+                if not flexible:
+                    options = options[:1]  # Bind to the first capable machine
+
+                # Pinned task: only its recorded machine is an option
+                fixed = fixed_tasks.get((order_index, step, first_unit))
+                if fixed is not None:
+                    options = [(m, d) for m, d in recipe_options[product_name][step] if m['name'] == fixed['machine']]
+                    if not options:
+                        raise ValueError(f"Fixed task {(order_index, step, first_unit)} is on machine "
+                                         f"'{fixed['machine']}', which cannot perform '{operation}'")
 
                 # ============================================================
                 # CREATE CP-SAT VARIABLES
                 # ============================================================
                 # Each task needs three variables for OR-Tools:
 
-                # 1. start_var: When the task begins [0, horizon]
-                start_var = model.NewIntVar(0, horizon, f'start_{task_id}')
-
-                # 2. end_var: When the task finishes [0, horizon]
-                end_var = model.NewIntVar(0, horizon, f'end_{task_id}')
+                # Variable domains: [earliest start, latest end] from the recipe
+                # (or [0, horizon] when tighten_domains is off)
+                min_duration = min_durations[step] * lot_size
+                if tighten_domains:
+                    earliest_start = work_before
+                    latest_end = horizon - (chain_length * lot_size - work_before - min_duration)
+                else:
+                    earliest_start, latest_end = 0, horizon
+                earliest_start = max(earliest_start, release_time)
+                work_before += min_duration
+                makespan_lower = max(makespan_lower, work_before)
+
+                if fixed is not None:
+                    # Pinned: start and end are constants (the end may differ
+                    # from start + duration, e.g. a task that finished late)
+                    start_var = new_int_var(fixed['start'], fixed['start'], f'start_{task_id}')
+                    end_var = new_int_var(fixed['end'], fixed['end'], f'end_{task_id}')
+                else:
+                    # 1. start_var: When the task begins
+                    start_var = new_int_var(earliest_start, latest_end - min_duration, f'start_{task_id}')
+
+                    # 2. end_var: When the task finishes
+                    end_var = new_int_var(earliest_start + min_duration, latest_end, f'end_{task_id}')
+
+                # Earliest start and latest end, for the circuit's time windows
+                window = (fixed['start'], fixed['end']) if fixed is not None else (earliest_start, latest_end)
 
                 # 3. interval_var: Represents the task as an interval [start, start+duration]
                 #    This is used for no-overlap constraints
-                interval_var = model.NewIntervalVar(start_var, duration, end_var, f'interval_{task_id}')
+                #    (a lot of k units runs for k * duration)
+                #    With several capable machines, each one gets an OPTIONAL
+                #    interval guarded by a presence literal instead
+                alternatives = []  # (machine name, presence literal, unit duration)
+                if len(options) == 1:
+                    machine, duration = options[0]
+                    size = fixed['end'] - fixed['start'] if fixed is not None else duration * lot_size
+                    fixed_machine_load[machine['name']] += size
+                    time_window = (window[0] + size, window[1] - size)  # (earliest end, latest start)
+                    interval_var = model.NewIntervalVar(start_var, size, end_var, f'interval_{task_id}')
+                    alternatives.append((machine['name'], None, duration))
+                else:
+                    interval_var = None
+                    for machine, machine_duration in options:
+                        presence = model.NewBoolVar(f'on_{task_id}_{machine["name"]}')
+                        optional_interval = model.NewOptionalIntervalVar(
+                            start_var, machine_duration * lot_size, end_var, presence,
+                            f'interval_{task_id}_{machine["name"]}'
+                        )
+                        alternatives.append((machine['name'], presence, machine_duration))
+                        machine_tasks[machine['name']].append({
+                            'id': task_id,
+                            'product': product_name,
+                            'product_id': product_id[product_name],
+                            'start': start_var,
+                            'end': end_var,
+                            'interval': optional_interval,
+                            'presence': presence,
+                            'order_index': order_index,
+                            'step': step,
+                            'first_unit': first_unit,
+                            'units': lot_size,
+                            'symmetric': False,
+                            'time_window': (window[0] + machine_duration * lot_size,
+                                            window[1] - machine_duration * lot_size),
+                        })
+
+                    # ASSIGNMENT CONSTRAINT: the task runs on exactly one machine
+                    model.AddExactlyOne(presence for _, presence, _ in alternatives)
 
                 # ============================================================
                 # CONSTRAINT 1: PRECEDENCE CONSTRAINT
@@ -167,6 +591,13 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
                 if prev_task_end is not None:
                     model.Add(start_var >= prev_task_end)  # ← PRECEDENCE CONSTRAINT
 
+                # Deviation from the reference plan: |start - reference start|
+                reference = reference_start.get((order_index, step, first_unit))
+                if fixed is None and reference is not None:
+                    deviation = new_int_var(0, horizon, f'deviation_{task_id}')
+                    model.AddAbsEquality(deviation, start_var - reference)
+                    deviation_vars.append(deviation)
+
                 # ============================================================
                 # Store Task Information
                 # ============================================================
@@ -174,34 +605,54 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
                     'id': task_id,
                     'order': order['product'],
                     'operation': operation,
-                    'machine': machine['name'],
+                    'machine': alternatives[0][0] if interval_var is not None else None,  # Resolved after solving
                     'start': start_var,
                     'end': end_var,
                     'interval': interval_var,
-                    'duration': duration,
+                    'presence': None,
+                    'alternatives': alternatives,
+                    'duration': duration if interval_var is not None else None,
+                    'units': lot_size,
+                    'first_unit': first_unit,
+                    'step': step,
                     'product': product_name,
-                    'order_id': order_id
+                    'product_id': product_id[product_name],
+                    'order_id': order_id,
+                    'order_index': order_index,
+                    'fixed': fixed is not None,
+                    'symmetric': symmetric and (batching or first_unit + lot_size < quantity),
+                    'time_window': time_window if interval_var is not None else None,
                 }
 
                 all_tasks.append(task_info)
                 task_vars[task_id] = task_info
-                machine_tasks[machine['name']].append(task_info)
-                machine_last_product[machine['name']].append(task_info)
+                if interval_var is not None:
+                    machine_tasks[task_info['machine']].append(task_info)
+                    machine_last_product[task_info['machine']].append(task_info)
 
                 # Update for next iteration
                 prev_task_end = end_var
                 order_info[order_id]['last_task_end'] = end_var  # Track last task
                 task_id += 1
 
+            if batching and prev_task_end is not None:
+                order_info[order_id]['lot_ends'].append(prev_task_end)
+            first_unit += lot_size
+
         # ====================================================================
         # CONSTRAINT 4: SOFT DEADLINE CONSTRAINT
         # ====================================================================
         # Constraint: last_task_end <= deadline + violation
         # If we finish late, violation will be > 0 (penalized in objective)
+        # With batching every lot must meet the deadline, not just the last one
         # *** SOFT DEADLINE CONSTRAINT ADDED HERE ***
-        model.Add(order_info[order_id]['last_task_end'] <= deadline + order_violation)  # ← SOFT DEADLINE CONSTRAINT
+        if not order_info[order_id]['lot_ends']:
+            order_info[order_id]['lot_ends'] = [order_info[order_id]['last_task_end']]
+        for lot_end in order_info[order_id]['lot_ends']:
+            model.Add(lot_end <= deadline + order_violation)  # ← SOFT DEADLINE CONSTRAINT
 
         order_id += 1
+    timer.lap('task_creation')
 
     # ========================================================================
     # STEP 7: Add No-Overlap Constraints with Setup Times
@@ -212,17 +663,38 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
     # Strategy: Use efficient conditional constraints for setup times
     # Only create constraints for task pairs with non-zero setup times
 
+    intervals_per_machine = {}
+    blocked_intervals = {}  # (start, end) -> fixed interval
+    setup_arcs = []  # (arc literal, setup hours) of the circuit model, for the setup_time stage
+    circuit_machines = []  # Machines sequenced by a circuit (sequencing='circuit')
     for machine_name, tasks in machine_tasks.items():
         if len(tasks) > 0:
             # Extract interval variables for all tasks on this machine
             intervals = [t['interval'] for t in tasks]
 
+            # Machine still busy with previously committed work: block [0, available)
+            available = machine_available.get(machine_name, 0)
+            if available > 0:
+                intervals.append(model.NewFixedSizeIntervalVar(0, available, f'busy_{machine_name}'))
+
+            # Breakdowns, maintenance, off-shift time and other windows without
+            # capacity. Machines with the same calendar share the interval
+            # variables (a fixed interval may sit in several no-overlaps).
+            if machine_name in machine_calendar:
+                for window in machine_calendar[machine_name].blocked(horizon):
+                    if window not in blocked_intervals:
+                        blocked_intervals[window] = model.NewFixedSizeIntervalVar(
+                            window[0], window[1] - window[0], f'down_{window[0]}_{window[1]}')
+                    intervals.append(blocked_intervals[window])
+
             # ================================================================
             # CONSTRAINT 2: NO-OVERLAP CONSTRAINT
             # ================================================================
             # Add the no-overlap constraint: no two intervals can overlap in time
             # *** NO-OVERLAP CONSTRAINT ADDED HERE ***
             model.AddNoOverlap(intervals)  # ← NO-OVERLAP CONSTRAINT
+            intervals_per_machine[machine_name] = len(intervals)
+            timer.lap('no_overlap')
 
             # ================================================================
             # CONSTRAINT 3: SETUP TIME CONSTRAINTS (Efficient Method)
@@ -232,32 +704,48 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
             # gap between them using conditional constraints
             # *** SETUP TIME CONSTRAINTS ADDED BELOW ***
 
-            if len(tasks) > 1 and setup_times:
+            # Circuit mode: a successor graph over the arcs that can occur,
+            # unless the pairwise constraints come out smaller on this machine
+            circuit = None
+            if len(tasks) > 1 and has_setups and sequencing == 'circuit':
+                circuit = _circuit_arcs(tasks, setup_matrix)
+                if circuit is not None and not full_circuit and \
+                        _circuit_size(tasks, *circuit) > _pairwise_size(tasks, setup_matrix):
+                    circuit = None
+
+            if circuit is not None:
+                _add_circuit_setup_constraints(model, machine_name, tasks, *circuit, setup_arcs=setup_arcs)
+                circuit_machines.append(machine_name)
+
+            elif len(tasks) > 1 and has_setups:
                 for i in range(len(tasks)):
                     for j in range(i + 1, len(tasks)):  # Only check j > i to reduce constraints
                         task_i = tasks[i]
                         task_j = tasks[j]
+                        if task_i.get('fixed') and task_j.get('fixed'):
+                            continue  # Both pinned: their order is already decided
 
-                        # Check both directions for setup times
-                        setup_key_ij = f"{task_i['product']}-{task_j['product']}"
-                        setup_key_ji = f"{task_j['product']}-{task_i['product']}"
+                        # Optional (flexible) tasks only interact when both are on this machine
+                        both_present = [t['presence'] for t in (task_i, task_j) if t['presence'] is not None]
 
-                        setup_time_ij = setup_times.get(setup_key_ij, 0)
-                        setup_time_ji = setup_times.get(setup_key_ji, 0)
+                        # Check both directions for setup times
+                        setup_time_ij = setup_rows[task_i['product_id']][task_j['product_id']]
+                        setup_time_ji = setup_rows[task_j['product_id']][task_i['product_id']]
 
                         # Only add constraints if setup time exists
                         if setup_time_ij > 0:
                             # If task_i comes before task_j: j.start >= i.end + setup_time_ij
                             # Create boolean: does task_i precede task_j?
                             i_before_j = model.NewBoolVar(f'setup_{task_i["id"]}_before_{task_j["id"]}')
-                            model.Add(task_j['start'] >= task_i['end'] + setup_time_ij).OnlyEnforceIf(i_before_j)  # ← SETUP TIME CONSTRAINT
-                            model.Add(task_j['start'] < task_i['start']).OnlyEnforceIf(i_before_j.Not())
+                            model.Add(task_j['start'] >= task_i['end'] + setup_time_ij).OnlyEnforceIf([i_before_j] + both_present)  # ← SETUP TIME CONSTRAINT
+                            model.Add(task_j['start'] < task_i['start']).OnlyEnforceIf([i_before_j.Not()] + both_present)
 
                         if setup_time_ji > 0 and task_i['product'] != task_j['product']:
                             # If task_j comes before task_i: i.start >= j.end + setup_time_ji
                             j_before_i = model.NewBoolVar(f'setup_{task_j["id"]}_before_{task_i["id"]}')
-                            model.Add(task_i['start'] >= task_j['end'] + setup_time_ji).OnlyEnforceIf(j_before_i)  # ← SETUP TIME CONSTRAINT
-                            model.Add(task_i['start'] < task_j['start']).OnlyEnforceIf(j_before_i.Not())
+                            model.Add(task_i['start'] >= task_j['end'] + setup_time_ji).OnlyEnforceIf([j_before_i] + both_present)  # ← SETUP TIME CONSTRAINT
+                            model.Add(task_i['start'] < task_j['start']).OnlyEnforceIf([j_before_i.Not()] + both_present)
+            timer.lap('setup_constraints')
 
     # ========================================================================
     # STEP 8: Define Makespan and Objective Function
@@ -267,7 +755,16 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
 
     if all_tasks:
         # Create a variable to represent the makespan
-        makespan = model.NewIntVar(0, horizon, 'makespan')
+        # Lower bound: the longest recipe chain, or the busiest machine among
+        # tasks that can only run on one machine
+        if tighten_domains:
+            makespan_lower = max([makespan_lower] + [
+                machine_available.get(name, 0) + load for name, load in fixed_machine_load.items()
+            ])
+        else:
+            makespan_lower = 0
+        makespan = new_int_var(makespan_lower, horizon, 'makespan')
+        domain_stats['makespan_lower_bound'] = makespan_lower
 
         # Collect all task end times
         all_ends = [t['end'] for t in all_tasks]
@@ -287,190 +784,1294 @@ def solve_schedule(machines, products, setup_times, orders, start_time):
         # 1. First priority: minimize deadline violations
         # 2. Second priority: minimize makespan (total completion time)
         total_violation = sum(order_info[oid]['violation_var'] for oid in order_info)
-        model.Minimize(makespan + 1000 * total_violation)
+        model.Minimize(makespan + 1000 * total_violation + int(deviation_weight) * sum(deviation_vars))
+    timer.lap('objective')
 
     # ========================================================================
     # STEP 9: Configure and Run the Solver
     # ========================================================================
-    print(f"Model created with {len(all_tasks)} tasks, {len(order_info)} orders")
-    print("Starting solver...")
+    logger.info("Model created with %d tasks, %d orders", len(all_tasks), len(order_info))
+
+    # Warm start: hint the previous schedule onto the new model. A cut
+    # horizon is hard to fill from scratch, so the greedy schedule that set
+    # it is hinted unless the caller brought a warm start
+    warm_start_stats = None
+    if warm_start == 'dispatch' or (warm_start is None and horizon_cut):
+        if greedy is None:
+            from dispatching import solve_dispatch_best  # Imported here: dispatching imports this module
+            greedy = solve_dispatch_best(machines, products, setup_times, orders, start_datetime.isoformat(),
+                                         batching=batching, sublots=sublots, flexible=flexible,
+                                         machine_available=machine_available,
+                                         machine_unavailable=machine_unavailable, calendars=calendars)
+        warm_start = greedy
+        logger.info("Dispatch hint (%s): makespan %sh, %sh late",
+                    warm_start['rule'], warm_start['makespan'], warm_start['total_violation_hours'])
+    if warm_start:
+        prior_schedule = warm_start.get('schedule', []) if isinstance(warm_start, dict) else warm_start
+        warm_start_stats = _add_warm_start_hints(model, all_tasks, prior_schedule)
+        logger.info("Warm start: %d/%d tasks hinted", warm_start_stats['hinted_tasks'], len(all_tasks))
+    timer.lap('hints')
+
+    # Model size, for the stats and the metrics endpoint
+    model_stats = _model_stats(model, intervals_per_machine)
+    model_stats['tasks'] = len(all_tasks)
+    model_stats['circuit_machines'] = len(circuit_machines)
+    timer.lap('model_stats')
+
+    # Static task arrays for the columnar solution extraction
+    task_columns = _task_columns(all_tasks, setup_rows, order_products)
+    timer.lap('extraction')
+
+    return CompiledModel(
+        model, task_columns,
+        orders=[{'product': info['product'], 'quantity': info['quantity'], 'deadline': info['deadline'],
+                 'weight': info['weight'], 'violation_var': info['violation_var'], 'lot_ends': info['lot_ends']}
+                for info in order_info.values()],
+        makespan=makespan if all_tasks else None,
+        start_datetime=start_datetime,
+        total_work=total_work,
+        stats={'domains': domain_stats, 'model': model_stats, 'warm_start': warm_start_stats},
+        build_phases=timer.phases,
+        objective=objective,
+        objective_terms={'sequencing': sequencing, 'full_circuit': full_circuit, 'setup_arcs': setup_arcs,
+                         'deviation_weight': int(deviation_weight), 'deviation_vars': deviation_vars},
+    )
 
-    # Create the CP-SAT solver instance
-    solver = cp_model.CpSolver()
 
-    # Configure solver parameters
-    solver.parameters.max_time_in_seconds = 60 
-    solver.parameters.log_search_progress = True  # Show solving progress in console
+class CompiledModel:
+    """
+    A built CP-SAT scheduling model plus the task metadata needed to turn a
+    solution back into a schedule (see build_model).
+
+    solve() can be called repeatedly, e.g. with a different time limit or
+    number of workers, without rebuilding. save() / to_bytes() store the
+    model and its metadata; load_model() / from_bytes() restore a solvable
+    copy, so an instance can be built once and re-solved elsewhere (such as
+    a parameter-tuning machine). export_proto() writes the bare CpModelProto
+    for tools that only need the model.
+    """
 
-    # Solve the model
-    # The solver will search for the optimal solution that satisfies all
-    # constraints while minimizing the objective function
-    status = solver.Solve(model)
+    def __init__(self, model, task_columns, orders, makespan, start_datetime, total_work, stats,
+                 build_phases=None, objective='weighted', objective_terms=None):
+        self.model = model
+        self.task_columns = task_columns
+        self.orders = orders
+        self.makespan = makespan
+        self.start_datetime = start_datetime
+        self.total_work = total_work
+        self.stats = stats
+        self.objective = objective
+        # Variables of the lexicographic stage objectives besides makespan and violations
+        self.objective_terms = objective_terms or {'sequencing': 'pairwise', 'full_circuit': False, 'setup_arcs': [],
+                                                   'deviation_weight': 0, 'deviation_vars': []}
+        # Build (or load) time, reported in the phases of the next solve only
+        self._pending_phases = dict(build_phases or {})
+
+    @property
+    def num_tasks(self):
+        return len(self.task_columns['start_vars'])
+
+    def solve(self, solver_config=None, progress_callback=None, progress_schedule=False, stop_event=None,
+              result_format='rows', stages=None):
+        """
+        Solves the model. Arguments and result as for solve_schedule; the
+        model itself is not changed, so it can be solved again. Models built
+        with objective='lexicographic' are solved stage by stage (`stages`,
+        default DEFAULT_STAGES).
+        """
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result_format '{result_format}', expected one of {RESULT_FORMATS}")
+        config = resolve_solver_config(solver_config)
+        if self.objective == 'lexicographic':
+            stages = resolve_stages(stages or DEFAULT_STAGES, config['time_limit'],
+                                    self.objective_terms['sequencing'])
+            if not self.objective_terms.get('full_circuit') and \
+                    any(stage['objective'] == 'setup_time' for stage in stages):
+                raise ValueError("The setup_time stage needs a model built with it in `stages` (only then "
+                                 "every machine is sequenced by a circuit)")
+        elif stages:
+            raise ValueError("Stages need a model built with objective='lexicographic'")
+        if self.makespan is None:
+            stages = None  # Nothing to schedule
+
+        timer = _PhaseTimer()
+        timer.phases.update(self._pending_phases)
+        timer.started -= sum(self._pending_phases.values())
+        self._pending_phases = {}
+
+        # ClearHints and the stage constraints must not stick
+        model = self.model if config['use_hints'] and stages is None else self.model.Clone()
+        task_columns = self.task_columns
+        start_datetime = self.start_datetime
+        domain_stats = self.stats['domains']
+        warm_start_stats = self.stats.get('warm_start')
+
+        # The CP-SAT log always goes through on_log_line instead of stdout: its
+        # "Preloading model" line marks the end of presolve, and the lines are
+        # forwarded to search_logger only when log_search_progress is set
+        presolve_finished = []
+
+        def on_log_line(line):
+            if not presolve_finished and line.startswith('Preloading model'):
+                presolve_finished.append(perf_counter())
+            if config['log_search_progress']:
+                search_logger.info(line)
+
+        active_solver = []  # Solver of the running (stage) solve, for the stop event
+
+        def new_solver(solve_config):
+            # Create the CP-SAT solver instance and configure its parameters
+            solver = cp_model.CpSolver()
+            apply_solver_config(solver, model, solve_config)
+            solver.parameters.log_search_progress = True
+            solver.parameters.log_to_stdout = False
+            solver.log_callback = on_log_line
+            active_solver[:] = [solver]
+            return solver
+
+        # Optional progress reporting for every improving solution
+        callback = None
+        if progress_callback is not None:
+            callback = _ProgressCallback(
+                progress_callback,
+                (lambda values, boolean_values: _columns_to_rows(
+                    _extract_columns(task_columns, values, boolean_values), start_datetime)) if progress_schedule else None
+            )
+
+        # Optional external stop: a watcher thread calls StopSearch() once the
+        # event is set (the solver then returns its best solution so far)
+        solve_finished = threading.Event()
+        if stop_event is not None:
+            def watch_stop_event():
+                while not solve_finished.is_set():
+                    if stop_event.wait(0.2):
+                        for solver in active_solver:
+                            solver.StopSearch()
+                        return
+            threading.Thread(target=watch_stop_event, daemon=True).start()
+
+        # Solve the model
+        # The solver will search for the optimal solution that satisfies all
+        # constraints while minimizing the objective function
+        build_time = timer.total()
+        stage_reports = None
+        try:
+            if stages is None:
+                solver = new_solver(config)
+                status = solver.Solve(model, callback)
+            else:
+                solver, status, stage_reports = self._solve_stages(model, stages, config, new_solver, callback,
+                                                                   stop_event)
+        finally:
+            solve_finished.set()
+
+        # Presolve ends at the "Preloading model" log line (missing when presolve
+        # already decides the model, in which case all of it counts as presolve)
+        solve_started = timer.last
+        timer.lap('search')
+        if presolve_finished:
+            timer.phases['presolve'] = presolve_finished[0] - solve_started
+            timer.phases['search'] -= timer.phases['presolve']
+        else:
+            timer.phases['presolve'] = timer.phases.pop('search')
+
+        # ========================================================================
+        # STEP 10: Display Solver Statistics
+        # ========================================================================
+        logger.info("Solver finished: %s in %.2fs (%d branches, %d conflicts)", solver.StatusName(status),
+                    solver.WallTime(), solver.NumBranches(), solver.NumConflicts())
+
+        # Search summary for benchmarks and monitoring (objective/bound are None
+        # without a solution)
+        response = solver.response_proto
+        solver_stats = {
+            'status': solver.StatusName(status),
+            'build_time': build_time,
+            'solve_time': solver.WallTime(),
+            'user_time': response.user_time,
+            'deterministic_time': response.deterministic_time,
+            'objective': None,
+            'bound': None,
+            'gap': None,
+            'gap_integral': response.gap_integral,
+            'branches': response.num_branches,
+            'conflicts': response.num_conflicts,
+            'restarts': response.num_restarts,
+            'booleans': response.num_booleans,
+            'binary_propagations': response.num_binary_propagations,
+            'integer_propagations': response.num_integer_propagations,
+            'lp_iterations': response.num_lp_iterations,
+        }
+        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            objective, bound = solver.ObjectiveValue(), solver.BestObjectiveBound()
+            solver_stats.update(objective=objective, bound=bound,
+                                gap=abs(objective - bound) / max(1.0, abs(objective)))
+        if stage_reports is not None:
+            solver_stats['solve_time'] = sum(stage['solve_time'] for stage in stage_reports)
+
+        # ========================================================================
+        # STEP 11: Process Results
+        # ========================================================================
+        # Extract the solution values from the solver and format for output
+
+        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            # ====================================================================
+            # Extract Schedule from Solver Solution
+            # ====================================================================
+            # The solver has assigned values to all our decision variables
+            # We now extract those values to create the final schedule
+            columns = _extract_columns(task_columns,
+                                       lambda variables: solver.Values(pd.Index(variables)).to_numpy(),
+                                       lambda variables: solver.BooleanValues(pd.Index(variables)).to_numpy())
+            timer.lap('extraction')
+
+            # ====================================================================
+            # Calculate Deadline Violations
+            # ====================================================================
+            # Check which orders exceeded their deadlines and by how much
+
+            deadline_violations = []
+            total_violations = 0
+
+            for oinfo in self.orders:
+                # Get the violation variable value (hours late)
+                violation_hours = solver.Value(oinfo['violation_var'])
+                actual_end = max(solver.Value(lot_end) for lot_end in oinfo['lot_ends'])
+
+                if violation_hours > 0:
+                    deadline_violations.append({
+                        'product': oinfo['product'],
+                        'quantity': oinfo['quantity'],
+                        'deadline': oinfo['deadline'],
+                        'actual_completion': actual_end,
+                        'violation_hours': violation_hours
+                    })
+                    total_violations += violation_hours
+
+            # ====================================================================
+            # Determine Final Status
+            # ====================================================================
+            # OPTIMAL: Found proven optimal solution with no violations
+            # FEASIBLE: Found good solution with no violations (may not be optimal)
+            # FEASIBLE_WITH_VIOLATIONS: Found solution but some deadlines missed
+
+            if total_violations > 0:
+                result_status = 'FEASIBLE_WITH_VIOLATIONS'
+            else:
+                result_status = 'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE'
+
+            # ====================================================================
+            # Return Success Result
+            # ====================================================================
+            result = {
+                'status': result_status,
+                'makespan': solver.Value(self.makespan) if self.makespan is not None else 0,
+                'start_datetime': start_datetime.strftime('%Y-%m-%d %H:%M'),
+                'deadline_violations': deadline_violations,
+                'total_violation_hours': total_violations,
+                'stats': {'domains': domain_stats, 'solver': solver_stats}
+            }
+            if result_format == 'columnar':
+                result['schedule_columns'] = compact_schedule(columns)
+            else:
+                result['schedule'] = _columns_to_rows(columns, start_datetime)
+            if warm_start_stats is not None:
+                result['warm_start'] = warm_start_stats
+        else:
+            # ====================================================================
+            # STEP 12: Handle Solver Failure
+            # ====================================================================
+            # The solver could not find a solution. Provide diagnostics to help
+            # the user understand why and how to fix the problem.
+
+            # Provide detailed diagnostics based on failure type
+            if status == cp_model.INFEASIBLE:
+                # INFEASIBLE: No solution exists that satisfies all constraints
+                # This usually means the problem is over-constrained
+                logger.warning("Problem is INFEASIBLE - constraints cannot be satisfied. Possible causes: "
+                               "total work (%sh) too large for machine capacity, setup time constraints too "
+                               "restrictive, circular precedence, deadlines too tight", self.total_work)
+
+            elif status == cp_model.MODEL_INVALID:
+                # MODEL_INVALID: The model itself has errors
+                # This is usually a programming error, not a data issue
+                logger.error("Model is INVALID - this indicates a bug in the model construction code: %s",
+                             model.Validate())
+
+            elif status == cp_model.UNKNOWN:
+                # UNKNOWN: Solver timed out or hit resource limits
+                # The problem might be solvable with more time or smaller input
+                logger.warning("Status UNKNOWN - solver may have timed out or hit resource limits. Consider "
+                               "reducing orders, increasing the time limit, or simplifying setup times")
+
+            # Return failure result
+            result = {
+                'status': 'INFEASIBLE',
+                'solver_status': solver.StatusName(status),
+                'message': f'Solver status: {solver.StatusName(status)}. Check console for details.',
+                'stats': {'domains': domain_stats, 'solver': solver_stats}
+            }
+            if warm_start_stats is not None:
+                result['warm_start'] = warm_start_stats
+
+        if stage_reports is not None:
+            result['stages'] = stage_reports
+
+        timer.lap('post_processing')
+        result['stats'].update(phases={phase: timer.phases.get(phase, 0.0) for phase in SOLVE_PHASES},
+                               total_time=timer.total(), model=self.stats['model'])
+        return result
+
+    def _solve_stages(self, model, stages, config, new_solver, callback, stop_event):
+        """
+        Lexicographic solve on `model` (a clone): minimizes each stage's
+        objective, then constrains it to the value found (plus the stage
+        tolerance) and hints the solution to the next stage.
+
+        Returns:
+            (solver, status, stage reports): the solver holding the final
+            solution - of the last stage that found one - and OPTIMAL only if
+            every stage was solved to optimality
+        """
+        terms = self.objective_terms
+        violations = [model.GetIntVarFromProtoIndex(order['violation_var'].Index()) for order in self.orders]
+        makespan = model.GetIntVarFromProtoIndex(self.makespan.Index())
+        all_variables = None
+
+        def stage_expression(name):
+            if name == 'total_tardiness':
+                return cp_model.LinearExpr.Sum(violations)
+            if name == 'weighted_tardiness':
+                return cp_model.LinearExpr.WeightedSum(violations, [order['weight'] for order in self.orders])
+            if name == 'max_tardiness':
+                latest = model.NewIntVar(0, self.stats['domains']['horizon'], 'max_tardiness')
+                model.AddMaxEquality(latest, violations)
+                return latest
+            if name == 'makespan':
+                if not terms['deviation_weight']:
+                    return makespan
+                deviations = [model.GetIntVarFromProtoIndex(var.Index()) for var in terms['deviation_vars']]
+                return makespan + terms['deviation_weight'] * cp_model.LinearExpr.Sum(deviations)
+            literals = [model.GetBoolVarFromProtoIndex(literal.Index()) for literal, _ in terms['setup_arcs']]
+            return cp_model.LinearExpr.WeightedSum(literals, [hours for _, hours in terms['setup_arcs']])
+
+        reports = []
+        best = None  # (solver, status) of the last stage with a solution
+        for number, stage in enumerate(stages):
+            if best is not None and stop_event is not None and stop_event.is_set():
+                break
+            expression = stage_expression(stage['objective'])
+            model.ClearObjective()
+            model.Minimize(expression)
+
+            # Later stages always start from the previous stage's solution
+            stage_config = dict(config, time_limit=stage['time_limit'], use_hints=config['use_hints'] or number > 0)
+            if stage['relative_gap'] is not None:
+                stage_config['relative_gap'] = stage['relative_gap']
+            solver = new_solver(stage_config)
+            status = solver.Solve(model, callback)
+
+            report = {'objective': stage['objective'], 'status': solver.StatusName(status), 'value': None,
+                      'bound': None, 'time_limit': stage['time_limit'], 'solve_time': solver.WallTime()}
+            reports.append(report)
+            logger.info("Stage %d (%s): %s, value %s in %.2fs", number + 1, stage['objective'],
+                        report['status'], solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+                        else None, report['solve_time'])
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if best is None:
+                    return solver, status, reports
+                break  # Keep the previous stage's solution
+
+            value = int(round(solver.ObjectiveValue()))
+            report.update(value=value, bound=solver.BestObjectiveBound())
+            best = (solver, status)
+            if number + 1 == len(stages):
+                break
+
+            # Fix this stage's optimum and hint the whole solution to the next one
+            model.Add(expression <= value + stage['tolerance'])
+            if all_variables is None:
+                all_variables = [model.GetIntVarFromProtoIndex(i) for i in range(len(model.Proto().variables))]
+            model.ClearHints()
+            for variable, hint in zip(all_variables, solver.Values(pd.Index(all_variables)).tolist()):
+                model.AddHint(variable, hint)
+
+        solver, status = best
+        optimal = len(reports) == len(stages) and all(report['status'] == 'OPTIMAL' for report in reports)
+        return solver, cp_model.OPTIMAL if optimal else cp_model.FEASIBLE, reports
+
+    def export_proto(self, path):
+        """
+        Writes the bare CpModelProto (binary for *.pb, text otherwise), e.g.
+        for CP-SAT's own command-line tools. It cannot be decoded into a
+        schedule; use save() for that.
+        """
+        if not self.model.ExportToFile(str(path)):
+            raise OSError(f"Could not write the model to {path}")
+
+    def to_bytes(self):
+        """
+        The model and its metadata as a zip archive (see MODEL_FORMAT_VERSION).
+        """
+        def indices(variables):
+            return [variable.Index() for variable in variables]
+
+        columns = self.task_columns
+        metadata = {
+            'format_version': MODEL_FORMAT_VERSION,
+            'task_columns': {
+                **{name: columns[name].tolist() for name in _TASK_ARRAY_COLUMNS},
+                'start_vars': indices(columns['start_vars']),
+                'presences': indices(columns['presences']),
+                'fixed_end_vars': indices(columns['fixed_end_vars']),
+                'categories': columns['categories'],
+            },
+            'orders': [dict(order, violation_var=order['violation_var'].Index(),
+                            lot_ends=indices(order['lot_ends'])) for order in self.orders],
+            'makespan': self.makespan.Index() if self.makespan is not None else None,
+            'start_datetime': self.start_datetime.isoformat(),
+            'total_work': self.total_work,
+            'stats': self.stats,
+            'objective': self.objective,
+            'objective_terms': {
+                'sequencing': self.objective_terms['sequencing'],
+                'full_circuit': self.objective_terms.get('full_circuit', False),
+                'setup_arcs': [[literal.Index(), hours] for literal, hours in self.objective_terms['setup_arcs']],
+                'deviation_weight': self.objective_terms['deviation_weight'],
+                'deviation_vars': indices(self.objective_terms['deviation_vars']),
+            },
+        }
 
-    # ========================================================================
-    # STEP 10: Display Solver Statistics
-    # ========================================================================
-    print(f"\n[SOLVER FINISHED]")
-    print(f"Status: {solver.StatusName(status)}")
-    print(f"Solve time: {solver.WallTime():.2f} seconds")
-    print(f"Branches: {solver.NumBranches()}")  # Search tree branches explored
-    print(f"Conflicts: {solver.NumConflicts()}")  # Conflicts found during search
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            # Text format: the Python protos of OR-Tools 9.x have no binary parser
+            archive.writestr('model.pbtxt', str(self.model.Proto()))
+            archive.writestr('metadata.json', json.dumps(metadata))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Restores a CompiledModel from to_bytes() output.
+
+        Raises:
+            ValueError: If the data is no saved model or of another format version
+        """
+        started = perf_counter()
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                metadata = json.loads(archive.read('metadata.json'))
+                model_text = archive.read('model.pbtxt').decode()
+        except (zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"Not a saved model: {e}") from e
+        if metadata.get('format_version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {metadata.get('format_version')}, "
+                             f"expected {MODEL_FORMAT_VERSION}")
+        model = cp_model.CpModel()
+        model.Proto().parse_text_format(model_text)
+
+        def int_vars(indices):
+            return [model.GetIntVarFromProtoIndex(index) for index in indices]
+
+        saved = metadata['task_columns']
+        task_columns = {name: np.array(saved[name], dtype=np.int64) for name in _TASK_ARRAY_COLUMNS}
+        task_columns.update({
+            'start_vars': int_vars(saved['start_vars']),
+            'presences': [model.GetBoolVarFromProtoIndex(index) for index in saved['presences']],
+            'fixed_end_vars': int_vars(saved['fixed_end_vars']),
+            'categories': saved['categories'],
+        })
+        order_products = task_columns['categories']['order']
+        task_columns['setup_matrix'] = task_columns['setup_matrix'].reshape(len(order_products),
+                                                                            len(order_products))
+        orders = [dict(order, violation_var=model.GetIntVarFromProtoIndex(order['violation_var']),
+                       lot_ends=int_vars(order['lot_ends'])) for order in metadata['orders']]
+        makespan = metadata['makespan']
+        terms = metadata['objective_terms']
+        objective_terms = dict(terms, setup_arcs=[(model.GetBoolVarFromProtoIndex(index), hours)
+                                                  for index, hours in terms['setup_arcs']],
+                               deviation_vars=int_vars(terms['deviation_vars']))
+
+        return cls(model, task_columns, orders,
+                   makespan=model.GetIntVarFromProtoIndex(makespan) if makespan is not None else None,
+                   start_datetime=datetime.fromisoformat(metadata['start_datetime']),
+                   total_work=metadata['total_work'], stats=metadata['stats'],
+                   build_phases={'model_load': perf_counter() - started},
+                   objective=metadata['objective'], objective_terms=objective_terms)
+
+    def save(self, path):
+        """
+        Writes to_bytes() to a file (load it with load_model).
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+def load_model(path):
+    """
+    Loads a CompiledModel written by CompiledModel.save().
+    """
+    with open(path, 'rb') as f:
+        return CompiledModel.from_bytes(f.read())
 
-    # ========================================================================
-    # STEP 11: Process Results
-    # ========================================================================
-    # Extract the solution values from the solver and format for output
 
-    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        from datetime import timedelta
+def default_solver_config():
+    """
+    Default CP-SAT settings, tuned to the host.
 
-        # ====================================================================
-        # Extract Schedule from Solver Solution
-        # ====================================================================
-        # The solver has assigned values to all our decision variables
-        # We now extract those values to create the final schedule
-
-        schedule = []
-        for task in all_tasks:
-            # Get the solved start and end times for this task
-            task_start_hours = solver.Value(task['start'])
-            task_end_hours = solver.Value(task['end'])
-
-            # Convert relative hours to actual datetime
-            actual_start = start_datetime + timedelta(hours=task_start_hours)
-            actual_end = start_datetime + timedelta(hours=task_end_hours)
-
-            schedule.append({
-                'task_id': task['id'],
-                'order': task['order'],
-                'operation': task['operation'],
-                'machine': task['machine'],
-                'product': task['product'],  # Temporary, removed later
-                'start': task_start_hours,
-                'end': task_end_hours,
-                'duration': task['duration'],
-                'start_datetime': actual_start.strftime('%Y-%m-%d %H:%M'),
-                'end_datetime': actual_end.strftime('%Y-%m-%d %H:%M'),
-                'setup_time': 0  # Will be calculated below
-            })
-
-        # Sort schedule by start time for readability
-        schedule.sort(key=lambda x: x['start'])
+    Uses one search worker per CPU core (CP-SAT runs a portfolio of
+    strategies across workers, so more cores = more diverse search) and
+    keeps the console log off so production runs are not flooded.
+    """
+    return {
+        'num_workers': os.cpu_count() or 1,
+        'time_limit': 60,
+        'relative_gap': None,
+        'absolute_gap': None,
+        'random_seed': None,
+        'use_hints': True,
+        'log_search_progress': False,
+        'search_branching': None,
+    }
+
+
+def resolve_solver_config(solver_config=None):
+    """
+    Merges a (possibly partial) solver config over the defaults.
 
-        # ====================================================================
-        # Calculate Setup Times (Post-Processing)
-        # ====================================================================
-        # Setup times are the transition time between different products
-        # on the same machine. We calculate this based on the actual sequence.
-
-        # Group tasks by machine
-        machine_schedule = {}
-        for task in schedule:
-            machine = task['machine']
-            if machine not in machine_schedule:
-                machine_schedule[machine] = []
-            machine_schedule[machine].append(task)
-
-        # For each machine, calculate setup times between consecutive tasks
-        for machine, tasks in machine_schedule.items():
-            tasks.sort(key=lambda x: x['start'])  # Ensure chronological order
-            for i in range(len(tasks)):
-                if i > 0:  # If not the first task on this machine
-                    prev_task = tasks[i - 1]
-                    curr_task = tasks[i]
-
-                    # Check if a setup time is defined for this product transition
-                    setup_key = f"{prev_task['product']}-{curr_task['product']}"
-                    setup_time = setup_times.get(setup_key, 0)
-                    curr_task['setup_time'] = setup_time
-
-        # Clean up: remove internal 'product' field from output
-        for task in schedule:
-            task.pop('product', None)
+    Raises:
+        ValueError: On unknown keys or an unknown search branching name
+    """
+    config = default_solver_config()
+    if not solver_config:
+        return config
 
-        # ====================================================================
-        # Calculate Deadline Violations
-        # ====================================================================
-        # Check which orders exceeded their deadlines and by how much
-
-        deadline_violations = []
-        total_violations = 0
-
-        for oid, oinfo in order_info.items():
-            # Get the violation variable value (hours late)
-            violation_hours = solver.Value(oinfo['violation_var'])
-            actual_end = solver.Value(oinfo['last_task_end'])
-
-            if violation_hours > 0:
-                deadline_violations.append({
-                    'product': oinfo['product'],
-                    'quantity': oinfo['quantity'],
-                    'deadline': oinfo['deadline'],
-                    'actual_completion': actual_end,
-                    'violation_hours': violation_hours
-                })
-                total_violations += violation_hours
+    unknown = set(solver_config) - set(SOLVER_CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown solver_config keys: {sorted(unknown)}")
 
-        # ====================================================================
-        # Determine Final Status
-        # ====================================================================
-        # OPTIMAL: Found proven optimal solution with no violations
-        # FEASIBLE: Found good solution with no violations (may not be optimal)
-        # FEASIBLE_WITH_VIOLATIONS: Found solution but some deadlines missed
+    config.update({k: v for k, v in solver_config.items() if v is not None})
+    branching = config['search_branching']
+    if branching is not None and branching not in SEARCH_BRANCHINGS:
+        raise ValueError(f"Unknown search_branching '{branching}'")
+    return config
 
-        if total_violations > 0:
-            result_status = 'FEASIBLE_WITH_VIOLATIONS'
-        else:
-            result_status = 'OPTIMAL' if status == cp_model.OPTIMAL else 'FEASIBLE'
 
-        # ====================================================================
-        # Return Success Result
-        # ====================================================================
-        result = {
-            'status': result_status,
-            'makespan': solver.Value(makespan) if all_tasks else 0,
-            'schedule': schedule,
-            'start_datetime': start_datetime.strftime('%Y-%m-%d %H:%M'),
-            'deadline_violations': deadline_violations,
-            'total_violation_hours': total_violations
+def resolve_objective(objective, stages=None, solver_config=None, sequencing='pairwise'):
+    """
+    Checks the objective arguments of solve_schedule; returns the resolved
+    stages (see resolve_stages), or None for the weighted objective.
+
+    Raises:
+        ValueError: On an unknown objective or invalid stages
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
+    if objective == 'weighted':
+        if stages:
+            raise ValueError("stages need objective='lexicographic'")
+        return None
+    return resolve_stages(stages or DEFAULT_STAGES, resolve_solver_config(solver_config)['time_limit'], sequencing)
+
+
+def resolve_stages(stages, time_limit, sequencing='pairwise'):
+    """
+    Normalizes lexicographic stages - names from OBJECTIVE_STAGES or dicts
+    with STAGE_KEYS - into dicts with every key set. Stages without a
+    time_limit share what the others leave of `time_limit` equally (at
+    least one second each); 'tolerance' is the number of objective units a
+    stage's optimum may be exceeded by in later stages (default 0).
+
+    Raises:
+        ValueError: On unknown stage keys or objectives, or a setup_time
+            stage without sequencing='circuit'
+    """
+    resolved = []
+    for stage in stages:
+        stage = {'objective': stage} if isinstance(stage, str) else dict(stage)
+        unknown = set(stage) - set(STAGE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown stage keys: {sorted(unknown)}")
+        if stage.get('objective') not in OBJECTIVE_STAGES:
+            raise ValueError(f"Unknown stage objective '{stage.get('objective')}', "
+                             f"expected one of {OBJECTIVE_STAGES}")
+        if stage['objective'] == 'setup_time' and sequencing != 'circuit':
+            raise ValueError("The setup_time stage needs sequencing='circuit' (the pairwise model has no "
+                             "setup variables)")
+        if stage.get('tolerance', 0) < 0:
+            raise ValueError(f"Stage tolerance must not be negative, got {stage['tolerance']}")
+        resolved.append({'objective': stage['objective'], 'time_limit': stage.get('time_limit'),
+                         'relative_gap': stage.get('relative_gap'), 'tolerance': int(stage.get('tolerance', 0))})
+    if not resolved:
+        raise ValueError("At least one stage is needed")
+
+    open_stages = [stage for stage in resolved if stage['time_limit'] is None]
+    if open_stages:
+        budget = float(time_limit) - sum(stage['time_limit'] for stage in resolved if stage['time_limit'] is not None)
+        for stage in open_stages:
+            stage['time_limit'] = max(1.0, budget / len(open_stages))
+    return resolved
+
+
+def apply_solver_config(solver, model, config):
+    """
+    Copies a resolved solver config onto a CpSolver's parameters.
+    """
+    solver.parameters.num_workers = int(config['num_workers'])
+    solver.parameters.max_time_in_seconds = float(config['time_limit'])
+    solver.parameters.log_search_progress = bool(config['log_search_progress'])
+
+    if config['relative_gap'] is not None:
+        solver.parameters.relative_gap_limit = float(config['relative_gap'])
+    if config['absolute_gap'] is not None:
+        solver.parameters.absolute_gap_limit = float(config['absolute_gap'])
+    if config['random_seed'] is not None:
+        solver.parameters.random_seed = int(config['random_seed'])
+    if config['search_branching'] is not None:
+        solver.parameters.search_branching = getattr(cp_model, config['search_branching'])
+    if not config['use_hints']:
+        model.ClearHints()
+
+
+def get_master_data_index(machines, products):
+    """
+    Builds (or reuses) lookup tables over the master data.
+
+    The indexes replace the linear scans over products and machines that used
+    to run once per order and once per task. They are cached by a signature
+    of the machine names/operations and product recipes, so repeated calls
+    with unchanged master data skip the rebuild.
+
+    Returns:
+        Dict with:
+            'product_by_name': product name -> product dict (first match wins)
+            'machine_for_operation': operation -> first machine able to do it
+            'machines_for_operation': operation -> all capable machines, in order
+            'recipe_options': product name -> per recipe task, the list of
+                (machine, duration on that machine) it can run on
+            'product_work': total recipe duration per entry of `products`,
+                using the slowest capable machine for each task
+    """
+    signature = (
+        tuple((m['name'], tuple(m['operations']), m.get('speed', 1)) for m in machines),
+        tuple(
+            (p['name'], tuple(
+                (t['operation'], t['duration'], tuple(sorted(t.get('machine_durations', {}).items())))
+                for t in p['tasks']
+            ))
+            for p in products
+        ),
+    )
+    with _index_cache_lock:
+        cached = _index_cache.get(signature)
+    if cached is not None:
+        return cached
+
+    product_by_name = {}
+    for product in products:
+        product_by_name.setdefault(product['name'], product)
+
+    machines_for_operation = {}
+    for machine in machines:
+        for operation in machine['operations']:
+            capable = machines_for_operation.setdefault(operation, [])
+            if not capable or capable[-1] is not machine:
+                capable.append(machine)
+
+    def task_options(task):
+        return [
+            (machine, _machine_duration(task, machine))
+            for machine in machines_for_operation.get(task['operation'], [])
+        ]
+
+    recipe_options = {
+        name: [task_options(task) for task in product['tasks']]
+        for name, product in product_by_name.items()
+    }
+
+    product_work = []
+    for product in products:
+        options = recipe_options[product['name']] if product_by_name[product['name']] is product \
+            else [task_options(task) for task in product['tasks']]
+        product_work.append(sum(
+            max((d for _, d in opts), default=task['duration'])
+            for task, opts in zip(product['tasks'], options)
+        ))
+
+    index = {
+        'product_by_name': product_by_name,
+        'machine_for_operation': {op: capable[0] for op, capable in machines_for_operation.items()},
+        'machines_for_operation': machines_for_operation,
+        'recipe_options': recipe_options,
+        'product_work': product_work,
+    }
+
+    with _index_cache_lock:
+        if signature not in _index_cache and len(_index_cache) >= _INDEX_CACHE_SIZE:
+            _index_cache.pop(next(iter(_index_cache)))
+        _index_cache[signature] = index
+    return index
+
+
+def _circuit_arcs(tasks, setup_matrix):
+    """
+    Arcs of a machine's successor graph that some schedule can use.
+
+    An arc i -> j means "j directly follows i". Arcs are dropped when:
+    - j cannot start setup(i, j) after the earliest end of i (time windows)
+    - i and j belong to one unit (or lot) and j is an earlier recipe step,
+      or a later one with another step of that unit certainly on this
+      machine in between
+    - i and j are interchangeable units of one order (same step and lot
+      size, every step on a single machine, nothing pinned): their order
+      is fixed by unit number, so only the next unit can follow directly
+
+    Args:
+        tasks: The machine's tasks ('time_window' = (earliest end, latest
+            start) on this machine, plus the unit fields of build_model)
+        setup_matrix: Setup hours between product ids (NumPy array)
+
+    Returns:
+        (arcs, unit_order) with arcs a list of (i, j, setup hours) and
+        unit_order the (i, j) pairs of interchangeable units where j must
+        start after i ends; None if no two products on the machine have a
+        setup time
+    """
+    size = len(tasks)
+    products = np.array([t['product_id'] for t in tasks], dtype=np.int64)
+    setups = setup_matrix[products[:, None], products[None, :]]
+    setups[products[:, None] == products[None, :]] = 0
+    if not setups.any():
+        return None
+
+    earliest_end = np.array([t['time_window'][0] for t in tasks], dtype=np.int64)
+    latest_start = np.array([t['time_window'][1] for t in tasks], dtype=np.int64)
+    possible = earliest_end[:, None] + setups <= latest_start[None, :]
+    np.fill_diagonal(possible, False)
+
+    # Recipe order within a unit: the next step of the unit that is certainly
+    # on this machine bounds the steps that can follow directly
+    chain_codes = {}
+    chains = np.array([chain_codes.setdefault((t['order_index'], t['first_unit']), len(chain_codes))
+                       for t in tasks], dtype=np.int64)
+    steps = np.array([t['step'] for t in tasks], dtype=np.int64)
+    mandatory_steps = defaultdict(list)
+    for t, chain in zip(tasks, chains):
+        if t['presence'] is None:
+            mandatory_steps[chain].append(t['step'])
+    next_step = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    for i, (t, chain) in enumerate(zip(tasks, chains)):
+        next_step[i] = min((step for step in mandatory_steps[chain] if step > t['step']), default=next_step[i])
+    same_chain = chains[:, None] == chains[None, :]
+    possible &= ~(same_chain & ((steps[None, :] <= steps[:, None]) | (steps[None, :] > next_step[:, None])))
+
+    # Interchangeable units: ordered by unit number, each followed directly
+    # by the next one at most
+    groups = defaultdict(list)
+    for i, t in enumerate(tasks):
+        if t['symmetric']:
+            groups[(t['order_index'], t['step'], t['units'])].append(i)
+    unit_order = []
+    group_of = np.full(size, -1, dtype=np.int64)
+    successor = np.full(size, -1, dtype=np.int64)
+    for number, members in enumerate(groups.values()):
+        members.sort(key=lambda i: tasks[i]['first_unit'])
+        group_of[members] = number
+        for before, after in zip(members, members[1:]):
+            successor[before] = after
+            unit_order.append((before, after))
+    same_group = (group_of[:, None] == group_of[None, :]) & (group_of[:, None] >= 0)
+    possible &= ~same_group | (np.arange(size)[None, :] == successor[:, None])
+
+    arcs = [(i, j, setups[i, j]) for i, j in zip(*np.nonzero(possible))]
+    return [(int(i), int(j), int(hours)) for i, j, hours in arcs], unit_order
+
+
+def _circuit_size(tasks, arcs, unit_order):
+    """
+    Literals plus constraints of a machine's circuit model: a literal and an
+    enforced constraint per arc, two depot literals per task and one
+    ordering constraint per pair of interchangeable units.
+    """
+    return 2 * len(arcs) + 2 * len(tasks) + len(unit_order)
+
+
+def _pairwise_size(tasks, setup_matrix):
+    """
+    Literals plus constraints of a machine's pairwise setup model: a literal
+    and two enforced constraints per ordered pair of tasks of different
+    products with a setup time (pairs of pinned tasks are skipped).
+    """
+    products = np.array([t['product_id'] for t in tasks], dtype=np.int64)
+    pinned = np.array([bool(t.get('fixed')) for t in tasks])
+    with_setup = (setup_matrix[products[:, None], products[None, :]] > 0) \
+        & (products[:, None] != products[None, :]) & ~(pinned[:, None] & pinned[None, :])
+    return 3 * int(np.count_nonzero(with_setup))
+
+
+def _add_circuit_setup_constraints(model, machine_name, tasks, arcs, unit_order=(), setup_arcs=None):
+    """
+    Models the task sequence on one machine as a successor graph.
+
+    Node 0 is a dummy depot, node i+1 is tasks[i]. The circuit visits every
+    task exactly once, so each chosen arc i -> j means "j directly follows i"
+    and carries the setup time for that product transition:
+
+        arc(i, j) => start_j >= end_i + setup(product_i, product_j)
+
+    Tasks with a presence literal (flexible assignment) get a self-loop
+    that is active when the task runs on another machine.
+
+    Unlike the pairwise formulation this only enforces setups between
+    consecutive tasks. That needs an arc for every ordered pair of tasks
+    that may be adjacent, with or without a setup time; _circuit_arcs drops
+    the pairs that cannot be, so the model has len(arcs) arc literals and
+    enforced constraints plus 2n depot arcs (n tasks) and the unit_order
+    constraints. build_model uses the circuit where _circuit_size is no
+    larger than _pairwise_size.
+
+    Args:
+        arcs: (i, j, setup hours) from _circuit_arcs
+        unit_order: (i, j) pairs where tasks[j] starts after tasks[i] ends
+        setup_arcs: List the arcs with a setup time are appended to as
+            (literal, hours)
+
+    Returns:
+        Number of arc literals added for this machine
+    """
+    for i, j in unit_order:
+        model.Add(tasks[j]['start'] >= tasks[i]['end'])
+
+    circuit = []
+    if any(t['presence'] is not None for t in tasks):
+        # Every task may be assigned elsewhere, so the depot may be alone
+        circuit.append((0, 0, model.NewBoolVar(f'empty_{machine_name}')))
+    for i, task_i in enumerate(tasks):
+        # Depot arcs: task i is the first / last task on this machine
+        circuit.append((0, i + 1, model.NewBoolVar(f'first_{machine_name}_{task_i["id"]}')))
+        circuit.append((i + 1, 0, model.NewBoolVar(f'last_{machine_name}_{task_i["id"]}')))
+
+        # Optional (flexible) tasks not assigned here are skipped via a self-loop
+        if task_i['presence'] is not None:
+            circuit.append((i + 1, i + 1, task_i['presence'].Not()))
+
+    for i, j, setup_time in arcs:
+        task_i, task_j = tasks[i], tasks[j]
+        literal = model.NewBoolVar(f'next_{task_i["id"]}_{task_j["id"]}')
+        model.Add(task_j['start'] >= task_i['end'] + setup_time).OnlyEnforceIf(literal)  # ← SETUP TIME ON ARC
+        circuit.append((i + 1, j + 1, literal))
+        if setup_time and setup_arcs is not None:
+            setup_arcs.append((literal, setup_time))
+
+    model.AddCircuit(circuit)
+    return len(circuit)
+
+
+class _PhaseTimer:
+    """
+    Wall time per solve_schedule phase (see SOLVE_PHASES). lap(phase) adds
+    the time since the previous lap to that phase.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.started = self.last = perf_counter()
+
+    def lap(self, phase):
+        now = perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+
+def _model_stats(model, intervals_per_machine):
+    """
+    Size of a CpModel: variables, literals (Boolean variables), constraints by
+    type and intervals per machine. Parsed from CP-SAT's own model statistics,
+    which is much faster than walking the proto from Python.
+    """
+    stats = {'variables': 0, 'literals': 0, 'constraints': 0, 'enforced_constraints': 0,
+             'constraints_by_type': {}, 'intervals': sum(intervals_per_machine.values()),
+             'intervals_per_machine': dict(intervals_per_machine)}
+
+    def count(text):
+        return int(text.replace("'", ''))
+
+    for line in model.ModelStats().splitlines():
+        line = line.strip()
+        if line.startswith('#Variables:'):
+            stats['variables'] = count(line.split()[1])
+        elif line.startswith('- ') and 'Booleans in' in line:
+            stats['literals'] = count(line.split()[1])
+        elif line.startswith('#k'):
+            name, _, rest = line[2:].partition(':')
+            stats['constraints_by_type'][name] = count(rest.split()[0])
+            stats['constraints'] += count(rest.split()[0])
+            if '#enforced:' in rest:
+                stats['enforced_constraints'] += count(rest.split('#enforced:')[1].split()[0].rstrip(')'))
+    return stats
+
+
+class _ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Forwards every improving CP-SAT solution to a plain Python callable.
+    """
+
+    def __init__(self, progress_callback, extract_schedule=None):
+        super().__init__()
+        self._progress_callback = progress_callback
+        self._extract_schedule = extract_schedule
+        self._solutions = 0
+
+    def on_solution_callback(self):
+        self._solutions += 1
+        objective = self.ObjectiveValue()
+        bound = self.BestObjectiveBound()
+        progress = {
+            'objective': objective,
+            'bound': bound,
+            'gap': abs(objective - bound) / max(1.0, abs(objective)),
+            'elapsed': self.WallTime(),
+            'solutions': self._solutions,
         }
-    else:
-        # ====================================================================
-        # STEP 12: Handle Solver Failure
-        # ====================================================================
-        # The solver could not find a solution. Provide diagnostics to help
-        # the user understand why and how to fix the problem.
-
-        print(f"\n[SOLVER FAILED]")
-        print(f"Status: {solver.StatusName(status)}")
-
-        # Provide detailed diagnostics based on failure type
-        if status == cp_model.INFEASIBLE:
-            # INFEASIBLE: No solution exists that satisfies all constraints
-            # This usually means the problem is over-constrained
-            print("Problem is INFEASIBLE - constraints cannot be satisfied")
-            print("Possible causes:")
-            print(f"  - Total work ({total_work}h) too large for machine capacity")
-            print(f"  - Setup time constraints too restrictive")
-            print(f"  - Precedence constraints create circular dependencies")
-            print(f"  - Deadlines too tight (even with soft constraints)")
-
-        elif status == cp_model.MODEL_INVALID:
-            # MODEL_INVALID: The model itself has errors
-            # This is usually a programming error, not a data issue
-            print("Model is INVALID - check constraint definitions")
-            print("This indicates a bug in the model construction code")
-
-        elif status == cp_model.UNKNOWN:
-            # UNKNOWN: Solver timed out or hit resource limits
-            # The problem might be solvable with more time or smaller input
-            print("Status UNKNOWN - solver may have timed out or hit resource limits")
-            print(f"  Consider: reducing orders, increasing time limit, or simplifying setup times")
-
-        # Return failure result
-        result = {
-            'status': 'INFEASIBLE',
-            'message': f'Solver status: {solver.StatusName(status)}. Check console for details.'
+        if self._extract_schedule is not None:
+            progress['schedule'] = self._extract_schedule(
+                lambda variables: [self.Value(v) for v in variables],
+                lambda variables: [self.BooleanValue(v) for v in variables])
+        self._progress_callback(progress)
+
+
+def _task_columns(all_tasks, setup_rows, product_names):
+    """
+    Static per-task arrays used by _extract_columns, built once per model.
+
+    Machines and operations are replaced by integer codes, products by their
+    product id (index into product_names / setup_rows).
+    """
+    machine_codes, operation_codes = {}, {}
+
+    def code(codes, name):
+        return codes.setdefault(name, len(codes))
+
+    num_tasks = len(all_tasks)
+    columns = {name: np.zeros(num_tasks, dtype=np.int64) for name in
+               ('machine', 'duration', 'units', 'first_unit', 'step', 'order_index', 'product', 'operation')}
+    presences, alternative_task, alternative_machine, alternative_duration = [], [], [], []
+    fixed_tasks = []
+
+    for i, task in enumerate(all_tasks):
+        columns['units'][i] = task['units']
+        columns['first_unit'][i] = task['first_unit']
+        columns['step'][i] = task['step']
+        columns['order_index'][i] = task['order_index']
+        columns['product'][i] = task['product_id']
+        columns['operation'][i] = code(operation_codes, task['operation'])
+        if task['machine'] is None:
+            # Flexible task: the machine is whichever presence literal is true
+            for name, presence, duration in task['alternatives']:
+                presences.append(presence)
+                alternative_task.append(i)
+                alternative_machine.append(code(machine_codes, name))
+                alternative_duration.append(duration)
+        else:
+            columns['machine'][i] = code(machine_codes, task['machine'])
+            columns['duration'][i] = task['duration']
+        if task.get('fixed'):
+            fixed_tasks.append(i)
+
+    setup_matrix = np.array(setup_rows, dtype=np.int64).reshape(len(product_names), len(product_names))
+
+    columns.update({
+        'start_vars': [task['start'] for task in all_tasks],
+        'presences': presences,
+        'alternative_task': np.array(alternative_task, dtype=np.int64),
+        'alternative_machine': np.array(alternative_machine, dtype=np.int64),
+        'alternative_duration': np.array(alternative_duration, dtype=np.int64),
+        'fixed_tasks': np.array(fixed_tasks, dtype=np.int64),
+        'fixed_end_vars': [all_tasks[i]['end'] for i in fixed_tasks],
+        'setup_matrix': setup_matrix,
+        'categories': {'machine': list(machine_codes), 'order': list(product_names),
+                       'operation': list(operation_codes)},
+    })
+    return columns
+
+
+def _extract_columns(task_columns, values, boolean_values):
+    """
+    Turns solved task variables into per-unit schedule columns (NumPy arrays).
+
+    Args:
+        task_columns: Output of _task_columns
+        values / boolean_values: Map a list of variables to an array of their
+            solution values (solver.Values, or a solution callback's Value
+            applied element-wise)
+
+    Returns:
+        Dict of equal-length arrays ('task_id', 'order', 'order_index', 'step', 'unit',
+        'operation', 'machine', 'start', 'end', 'duration', 'setup_time'),
+        sorted by start, plus 'categories' with the names behind the 'order',
+        'operation' and 'machine' codes
+    """
+    num_tasks = len(task_columns['start_vars'])
+    starts = np.asarray(values(task_columns['start_vars']), dtype=np.int64) if num_tasks \
+        else np.zeros(0, dtype=np.int64)
+
+    # Resolve the machine chosen for flexible tasks
+    machine = task_columns['machine'].copy()
+    duration = task_columns['duration'].copy()
+    if task_columns['presences']:
+        chosen = np.asarray(boolean_values(task_columns['presences']), dtype=bool)
+        machine[task_columns['alternative_task'][chosen]] = task_columns['alternative_machine'][chosen]
+        duration[task_columns['alternative_task'][chosen]] = task_columns['alternative_duration'][chosen]
+
+    # A lot of k units is expanded back into k consecutive per-unit rows
+    units = task_columns['units']
+    row_task = np.repeat(np.arange(num_tasks), units)
+    lot_offset = np.arange(len(row_task)) - np.repeat(np.cumsum(units) - units, units)
+    row_duration = duration[row_task]
+    start = starts[row_task] + lot_offset * row_duration
+    end = start + row_duration
+    if len(task_columns['fixed_tasks']):
+        # Pinned tasks keep their recorded end on the lot's last unit
+        last_rows = np.cumsum(units)[task_columns['fixed_tasks']] - 1
+        end[last_rows] = np.asarray(values(task_columns['fixed_end_vars']), dtype=np.int64)
+
+    columns = {
+        'task_id': np.arange(len(row_task)),  # Creation order (task, then unit)
+        'order': task_columns['product'][row_task],
+        'order_index': task_columns['order_index'][row_task],
+        'step': task_columns['step'][row_task],
+        'unit': task_columns['first_unit'][row_task] + lot_offset,
+        'operation': task_columns['operation'][row_task],
+        'machine': machine[row_task],
+        'start': start,
+        'end': end,
+        'duration': end - start,
+    }
+
+    # Sort by start time for readability (stable: ties keep task/unit order)
+    by_start = np.argsort(start, kind='stable')
+    columns = {name: column[by_start] for name, column in columns.items()}
+
+    # Setup time = changeover from the previous row on the same machine.
+    # A stable sort by machine keeps each machine's rows in start order.
+    by_machine = np.argsort(columns['machine'], kind='stable')
+    machine_sorted = columns['machine'][by_machine]
+    product_sorted = columns['order'][by_machine]
+    setup_sorted = np.zeros(len(by_machine), dtype=np.int64)
+    if len(by_machine) > 1:
+        same_machine = machine_sorted[1:] == machine_sorted[:-1]
+        changeover = task_columns['setup_matrix'][product_sorted[:-1], product_sorted[1:]]
+        setup_sorted[1:] = np.where(same_machine, changeover, 0)
+    columns['setup_time'] = np.empty_like(setup_sorted)
+    columns['setup_time'][by_machine] = setup_sorted
+
+    columns['categories'] = task_columns['categories']
+    return columns
+
+
+def _format_hours(hours, start_datetime):
+    """
+    Vectorized start_datetime + hours, formatted as 'YYYY-MM-DD HH:MM'.
+    """
+    base = np.datetime64(start_datetime.replace(tzinfo=None), 'm')
+    stamps = base + np.asarray(hours, dtype=np.int64).astype('timedelta64[h]')
+    return np.char.replace(np.datetime_as_string(stamps, unit='m'), 'T', ' ')
+
+
+def _columns_to_rows(columns, start_datetime):
+    """
+    Per-task dicts (the classic 'schedule' format) from schedule columns.
+    """
+    categories = columns['categories']
+    orders = np.array(categories['order'], dtype=object)[columns['order']]
+    operations = np.array(categories['operation'], dtype=object)[columns['operation']]
+    machines = np.array(categories['machine'], dtype=object)[columns['machine']]
+    start_datetimes = _format_hours(columns['start'], start_datetime)
+    end_datetimes = _format_hours(columns['end'], start_datetime)
+
+    return [
+        {
+            'task_id': task_id,
+            'order': order,
+            'order_index': order_index,
+            'step': step,
+            'unit': unit,
+            'operation': operation,
+            'machine': machine,
+            'start': start,
+            'end': end,
+            'duration': duration,
+            'start_datetime': start_text,
+            'end_datetime': end_text,
+            'setup_time': setup_time
         }
+        for task_id, order, order_index, step, unit, operation, machine, start, end, duration, \
+            start_text, end_text, setup_time in zip(
+            columns['task_id'].tolist(), orders.tolist(), columns['order_index'].tolist(), columns['step'].tolist(),
+            columns['unit'].tolist(), operations.tolist(), machines.tolist(),
+            columns['start'].tolist(), columns['end'].tolist(), columns['duration'].tolist(),
+            start_datetimes.tolist(), end_datetimes.tolist(), columns['setup_time'].tolist()
+        )
+    ]
 
-    return result
+
+def compact_schedule(columns):
+    """
+    Columnar JSON form of a schedule: one list per field instead of one dict
+    per task, with machine / order / operation names dictionary-encoded.
+
+    Args:
+        columns: Output of _extract_columns, or a list of schedule rows
+
+    Returns:
+        Dict with 'size', 'columns' (field -> list) and 'categories'
+        (field -> list of names indexed by the codes in 'columns'); datetimes
+        are left out (start_datetime + hours)
+    """
+    if isinstance(columns, list):
+        frame = pd.DataFrame(columns, columns=list(COMPACT_COLUMNS))
+        categories = {}
+        encoded = {}
+        for name in COMPACT_COLUMNS:
+            if name in ('order', 'operation', 'machine'):
+                codes, uniques = pd.factorize(frame[name])
+                encoded[name] = codes.tolist()
+                categories[name] = uniques.tolist()
+            else:
+                encoded[name] = frame[name].astype('int64').tolist()
+        return {'size': len(frame), 'columns': encoded, 'categories': categories}
+
+    return {
+        'size': len(columns['start']),
+        'columns': {name: columns[name].tolist() for name in COMPACT_COLUMNS},
+        'categories': columns['categories'],
+    }
+
+
+def expand_schedule(compact, start_datetime):
+    """
+    Schedule rows from a compact_schedule dict (inverse of compact_schedule).
+
+    Args:
+        compact: Output of compact_schedule
+        start_datetime: Datetime (or result['start_datetime'] string) of hour 0
+    """
+    if isinstance(start_datetime, str):
+        start_datetime = datetime.fromisoformat(start_datetime)
+    columns = {name: np.asarray(values, dtype=np.int64) for name, values in compact['columns'].items()}
+    columns['categories'] = compact['categories']
+    return _columns_to_rows(columns, start_datetime)
+
+
+def _respects_pairwise_setups(schedule, setup_times):
+    """
+    Checks a schedule against the pairwise setup semantics: on each machine,
+    every later task of product q must start at least setup(p, q) after the
+    end of every earlier task of a different product p (not only the next one).
+    """
+    setup_times = as_setup_matrix(setup_times)
+    if not setup_times:
+        return True
+
+    names = list(dict.fromkeys(row['order'] for row in schedule))
+    product_id = {name: i for i, name in enumerate(names)}
+    setup_rows = setup_times.dense(names).tolist()
+    max_setup_from = {name: max(setup_rows[i], default=0) for name, i in product_id.items()}
+
+    by_machine = defaultdict(list)
+    for row in schedule:
+        by_machine[row['machine']].append(row)
+
+    for rows in by_machine.values():
+        rows.sort(key=lambda r: r['start'])
+        for i, earlier in enumerate(rows):
+            reach = earlier['end'] + max_setup_from[earlier['order']]
+            for later in rows[i + 1:]:
+                if later['start'] >= reach:
+                    break  # Sorted by start: every later task is far enough away
+                if later['order'] != earlier['order'] and \
+                        later['start'] < earlier['end'] + setup_rows[product_id[earlier['order']]][product_id[later['order']]]:
+                    return False
+    return True
+
+
+def _add_warm_start_hints(model, all_tasks, prior_schedule):
+    """
+    Adds AddHint() calls that replay a previous schedule on a new model.
+
+    Prior rows are matched to model tasks by (order_index, order, step,
+    operation, unit). For lots (batching) the row of the lot's first unit
+    provides the hint. Flexible tasks also get their presence literals
+    hinted towards the previous machine, when it is still an option.
+    Tasks without a matching row (e.g. a newly added order) are left free.
+
+    Returns:
+        Dict with 'hinted_tasks', 'unmatched_tasks', 'hinted_variables'
+        and 'prior_rows' counts
+    """
+    prior_by_key = {}
+    for row in prior_schedule:
+        if 'order_index' not in row or 'unit' not in row:
+            continue  # Rows from results produced before warm start support
+        key = (row['order_index'], row['order'], row.get('step'), row['operation'], row['unit'])
+        prior_by_key[key] = row
+
+    hinted_tasks = 0
+    hinted_variables = 0
+    for task in all_tasks:
+        key = (task['order_index'], task['order'], task['step'], task['operation'], task['first_unit'])
+        row = prior_by_key.get(key)
+        if row is None:
+            continue
+
+        machine_duration = next(
+            (d for name, _, d in task['alternatives'] if name == row['machine']), None
+        )
+        model.AddHint(task['start'], row['start'])
+        hinted_variables += 1
+        if machine_duration is not None:
+            model.AddHint(task['end'], row['start'] + machine_duration * task['units'])
+            hinted_variables += 1
+
+        if task['interval'] is None and machine_duration is not None:
+            for name, presence, _ in task['alternatives']:
+                model.AddHint(presence, name == row['machine'])
+                hinted_variables += 1
+        hinted_tasks += 1
+
+    return {
+        'hinted_tasks': hinted_tasks,
+        'unmatched_tasks': len(all_tasks) - hinted_tasks,
+        'hinted_variables': hinted_variables,
+        'prior_rows': len(prior_schedule),
+    }
+
+
+def _machine_duration(task, machine):
+    """
+    Duration of one unit of `task` on `machine`.
+
+    An explicit task['machine_durations'][machine name] wins; otherwise the
+    base duration is scaled by the machine's optional 'speed' factor.
+    """
+    override = task.get('machine_durations', {}).get(machine['name'])
+    if override is not None:
+        return override
+    speed = machine.get('speed', 1)
+    if speed == 1:
+        return task['duration']
+    return max(1, math.ceil(task['duration'] / speed))
+
+
+def _split_into_lots(quantity, sublots):
+    """
+    Splits an order quantity into at most `sublots` lots of near-equal size.
+
+    Example: quantity=10, sublots=3 -> [4, 3, 3]
+    """
+    num_lots = max(1, min(sublots, quantity))
+    base, remainder = divmod(quantity, num_lots)
+    return [base + (1 if i < remainder else 0) for i in range(num_lots)]
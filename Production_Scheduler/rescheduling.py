@@ -0,0 +1,246 @@
+"""
+Incremental Rescheduling
+========================
+Repairs an existing plan after shop-floor events instead of solving the
+whole problem again from scratch:
+
+- machine_down   {'type': 'machine_down', 'machine': 'M1', 'start': ..., 'end': ...}
+- new_order      {'type': 'new_order', 'order': {'product': ..., 'quantity': ..., 'deadline': ...}}
+- cancel_order   {'type': 'cancel_order', 'order_index': 2}
+- task_completed {'type': 'task_completed', 'order_index': 0, 'step': 1, 'unit': 3, 'end': ...}
+
+Times are hours from the plan's start, or ISO datetime strings.
+
+How it works:
+1. Tasks that already started, or that start inside the frozen zone
+   [now, now + frozen_hours), keep their machine and times (reported
+   completions replace the planned end). A pinned task is released again
+   when a breakdown hits it, its order is cancelled, or its recipe
+   predecessor / machine predecessor no longer finishes in time.
+2. Everything else may move, but not before `now`, and every hour a task
+   starts away from its old start costs deviation_weight in the objective,
+   so the new plan stays close to the old one.
+3. The old plan is also used as the solution hint, so CP-SAT starts from a
+   nearly feasible solution.
+
+The result has the solve_schedule format, plus the new order list in
+'orders' (cancelled orders removed, new orders appended) and a summary in
+'reschedule'.
+"""
+
+import bisect
+import logging
+import math
+from datetime import datetime
+
+from or_tools import solve_schedule, _split_into_lots
+from setup_matrix import as_setup_matrix
+
+EVENT_TYPES = ('machine_down', 'new_order', 'cancel_order', 'task_completed')
+
+logger = logging.getLogger(__name__)
+
+
+def reschedule(machines, products, setup_times, orders, start_time, current, now, events=(),
+               frozen_hours=0, deviation_weight=1, **solve_kwargs):
+    """
+    Re-optimizes the not yet started part of a schedule after events.
+
+    Args:
+        machines, products, setup_times, orders, start_time: As for
+            solve_schedule, describing the current plan (start_time is the
+            plan's hour 0; defaults to current['start_datetime'])
+        current: The current plan: a solve_schedule result or its 'schedule' rows
+        now: Current time (hours from start or ISO datetime string)
+        events: List of event dicts (see EVENT_TYPES)
+        frozen_hours: Tasks starting before now + frozen_hours stay pinned
+        deviation_weight: Objective cost per hour a task moves from its old start
+        **solve_kwargs: Passed through to solve_schedule (batching, sublots,
+            flexible, sequencing, solver_config, ...)
+
+    Returns:
+        Dict in the solve_schedule result format with extra 'orders' and
+        'reschedule' entries
+
+    Raises:
+        ValueError: On unknown event types or references to unknown orders/machines
+    """
+    schedule = current.get('schedule', []) if isinstance(current, dict) else current
+    if not isinstance(start_time, str):
+        if not (isinstance(current, dict) and current.get('start_datetime')):
+            raise ValueError("start_time is required when current has no 'start_datetime'")
+        start_time = datetime.strptime(current['start_datetime'], '%Y-%m-%d %H:%M').isoformat()
+    start_datetime = datetime.fromisoformat(start_time)
+    now_hours = _to_hours(now, start_datetime)
+    machine_names = {m['name'] for m in machines}
+    setup_times = as_setup_matrix(setup_times, products)
+
+    logger.info("Reschedule: now=%sh, %d event(s), frozen zone %sh", now_hours, len(events), frozen_hours)
+
+    # ========================================================================
+    # Apply Events
+    # ========================================================================
+    cancelled = set()
+    new_orders = []
+    unavailable = {name: list(windows) for name, windows
+                   in (solve_kwargs.pop('machine_unavailable', None) or {}).items()}
+    completions = {}  # (order_index, step, unit) -> actual end
+    for event in events:
+        kind = event.get('type')
+        if kind == 'cancel_order':
+            if not 0 <= event['order_index'] < len(orders):
+                raise ValueError(f"cancel_order: unknown order_index {event['order_index']}")
+            cancelled.add(event['order_index'])
+        elif kind == 'new_order':
+            new_orders.append(event['order'])
+        elif kind == 'machine_down':
+            if event['machine'] not in machine_names:
+                raise ValueError(f"machine_down: unknown machine '{event['machine']}'")
+            # Only the future matters: the past cannot be rescheduled anyway
+            down_start = max(now_hours, _to_hours(event['start'], start_datetime))
+            down_end = _to_hours(event['end'], start_datetime)
+            if down_end > down_start:
+                unavailable.setdefault(event['machine'], []).append((down_start, down_end))
+        elif kind == 'task_completed':
+            key = (event['order_index'], event['step'], event['unit'])
+            completions[key] = _to_hours(event['end'], start_datetime)
+        else:
+            raise ValueError(f"Unknown event type '{kind}', expected one of {EVENT_TYPES}")
+
+    kept = [i for i in range(len(orders)) if i not in cancelled]
+    index_map = {old: new for new, old in enumerate(kept)}
+    rescheduled_orders = [orders[i] for i in kept] + new_orders
+
+    # ========================================================================
+    # Collect Tasks of the Current Plan (lots with batching)
+    # ========================================================================
+    batching = solve_kwargs.get('batching', False)
+    sublots = solve_kwargs.get('sublots', 1)
+    lot_starts = {}
+    if batching:
+        for order_index, order in enumerate(orders):
+            firsts, first = [], 0
+            for lot_size in _split_into_lots(order['quantity'], sublots):
+                firsts.append(first)
+                first += lot_size
+            lot_starts[order_index] = firsts
+
+    tasks = {}  # (old order_index, step, first unit) -> task summary
+    for row in schedule:
+        if row['order_index'] in cancelled:
+            continue
+        first_unit = row['unit']
+        if batching:
+            firsts = lot_starts[row['order_index']]
+            first_unit = firsts[bisect.bisect_right(firsts, row['unit']) - 1]
+        key = (row['order_index'], row['step'], first_unit)
+        task = tasks.setdefault(key, {'start': row['start'], 'end': row['end'],
+                                      'machine': row['machine'], 'product': row['order']})
+        task['start'] = min(task['start'], row['start'])
+        task['end'] = max(task['end'], row['end'])
+        actual_end = completions.get((row['order_index'], row['step'], row['unit']))
+        if actual_end is not None:
+            task['completed_end'] = max(task.get('completed_end', actual_end), actual_end)
+
+    for task in tasks.values():
+        if 'completed_end' in task:
+            task['end'] = task['completed_end']
+            task['start'] = min(task['start'], task['end'])
+
+    # ========================================================================
+    # Decide Which Tasks Stay Pinned
+    # ========================================================================
+    # Candidates: started or inside the frozen zone, and not hit by a breakdown.
+    # Then, in start order, a candidate is kept only if its recipe predecessor
+    # is pinned and done by its start, and the machine's previous pinned task
+    # (plus changeover) is done by its start.
+    def hit_by_breakdown(task):
+        return any(task['start'] < end and start < task['end']
+                   for start, end in unavailable.get(task['machine'], []))
+
+    previous_step = {}
+    steps_by_unit = {}
+    for order_index, step, first_unit in tasks:
+        steps_by_unit.setdefault((order_index, first_unit), []).append(step)
+    for (order_index, first_unit), steps in steps_by_unit.items():
+        steps.sort()
+        for before, after in zip(steps, steps[1:]):
+            previous_step[(order_index, after, first_unit)] = (order_index, before, first_unit)
+
+    fixed = {}
+    machine_last = {}
+    for key, task in sorted(tasks.items(), key=lambda item: item[1]['start']):
+        if task['start'] >= now_hours + frozen_hours or hit_by_breakdown(task):
+            continue
+        predecessor_key = previous_step.get(key)
+        if predecessor_key is not None:
+            predecessor = fixed.get(predecessor_key)
+            if predecessor is None or predecessor['end'] > task['start']:
+                continue
+        last = machine_last.get(task['machine'])
+        if last is not None:
+            setup = setup_times.between(last['product'], task['product']) \
+                if last['product'] != task['product'] else 0
+            if last['end'] + setup > task['start']:
+                continue
+        fixed[key] = task
+        machine_last[task['machine']] = task
+
+    fixed_tasks = {
+        (index_map[order_index], step, first_unit): {
+            'start': task['start'], 'end': task['end'], 'machine': task['machine']}
+        for (order_index, step, first_unit), task in fixed.items()
+    }
+
+    reference = []
+    for row in schedule:
+        if row['order_index'] not in cancelled:
+            reference.append(dict(row, order_index=index_map[row['order_index']]))
+
+    logger.info("Pinned %d of %d planned tasks, %d cancelled / %d new order(s)",
+                len(fixed_tasks), len(tasks), len(cancelled), len(new_orders))
+
+    # ========================================================================
+    # Re-optimize the Tail
+    # ========================================================================
+    result = solve_schedule(machines, products, setup_times, rescheduled_orders, start_time,
+                            fixed_tasks=fixed_tasks, release_time=now_hours,
+                            machine_unavailable=unavailable, reference_schedule=reference,
+                            deviation_weight=deviation_weight,
+                            warm_start=solve_kwargs.pop('warm_start', None) or reference,
+                            **solve_kwargs)
+
+    result['orders'] = rescheduled_orders
+    summary = {
+        'now': now_hours,
+        'pinned_tasks': len(fixed_tasks),
+        'planned_tasks': len(tasks),
+        'cancelled_orders': sorted(cancelled),
+        'new_orders': len(new_orders),
+        'unavailable_windows': {name: windows for name, windows in unavailable.items() if windows},
+        'order_index_map': index_map,
+    }
+    if 'schedule' in result:
+        reference_by_key = {(row['order_index'], row['step'], row['unit']): row for row in reference}
+        moved, deviation = 0, 0
+        for row in result['schedule']:
+            old = reference_by_key.get((row['order_index'], row['step'], row['unit']))
+            if old is not None and (old['start'] != row['start'] or old['machine'] != row['machine']):
+                moved += 1
+                deviation += abs(old['start'] - row['start'])
+        summary['moved_tasks'] = moved
+        summary['total_deviation_hours'] = deviation
+    result['reschedule'] = summary
+    return result
+
+
+def _to_hours(value, start_datetime):
+    """
+    Hours from the plan start: numbers pass through, ISO strings are
+    converted (rounded up to whole hours).
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return math.ceil((value - start_datetime).total_seconds() / 3600)
+    return int(value)
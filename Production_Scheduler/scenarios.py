@@ -0,0 +1,258 @@
+"""
+What-If Scenario Batches
+========================
+Solves many variants of one scheduling problem in parallel and compares
+them, e.g. "add a machine", "pull all deadlines in by a day", "double the
+orders of product X":
+
+    batch = solve_many(machines, products, setup_times, orders, start_time, [
+        {'name': 'extra lathe', 'add_machines': [{'name': 'Lathe 2', 'operations': ['turning']}]},
+        {'name': 'deadlines -8h', 'deadline_shift': -8},
+        {'name': 'rush order', 'add_orders': [{'product': 'P1', 'quantity': 5, 'deadline': 24}]},
+    ])
+    batch['comparison']   # one row per scenario: makespan, violations, solve time, ...
+
+Patch keys of a scenario (applied in this order, all optional):
+    name              Label in the comparison (default "scenario <n>")
+    machines, products, setup_times, orders
+                      Replace the base value entirely
+    remove_machines   Machine names to drop
+    add_machines      Machine dicts to append
+    setup_overrides   {"from-to": hours} pairs set on top of the base setup times
+    remove_orders     Indices (into the base orders) to drop
+    update_orders     {index: {field: value}} changes to single orders
+    add_orders        Order dicts to append
+    deadline_shift    Hours added to every deadline
+    quantity_factor   Every quantity is multiplied by this (rounded, at least 1)
+    options           solve_schedule keyword overrides (flexible, batching, ...)
+
+Parallelism: scenarios run in a pool of worker processes. The CPU cores are
+split between scenarios and CP-SAT search workers: at least
+MIN_WORKERS_PER_SCENARIO workers per solve (CP-SAT's portfolio search needs
+a few), and as many scenarios in parallel as that allows.
+
+The base data is pickled once and handed to each pool process when it
+starts; a scenario only sends its (small) patch, and the master-data index
+cached in or_tools is reused by all scenarios a process solves.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from setup_matrix import SetupMatrix, as_setup_matrix
+
+PATCH_KEYS = ('name', 'machines', 'products', 'setup_times', 'orders', 'remove_machines', 'add_machines',
+              'setup_overrides', 'remove_orders', 'update_orders', 'add_orders', 'deadline_shift',
+              'quantity_factor', 'options')
+
+# Columns of the comparison table
+COMPARISON_COLUMNS = ('scenario', 'status', 'makespan', 'violation_hours', 'late_orders', 'orders',
+                      'machines', 'solve_time', 'objective', 'gap', 'makespan_change',
+                      'violation_change', 'error')
+
+# CP-SAT search workers each scenario gets at least
+MIN_WORKERS_PER_SCENARIO = 4
+
+logger = logging.getLogger(__name__)
+
+# Base problem of the current pool process (set by _init_worker)
+_worker_base = None
+
+
+def solve_many(machines, products, setup_times, orders, start_time, scenarios, include_base=True,
+               include_schedules=False, max_processes=None, **solve_kwargs):
+    """
+    Solves a base problem under a list of scenario patches in parallel.
+
+    Args:
+        machines, products, setup_times, orders, start_time: The base problem
+            (as for solve_schedule)
+        scenarios: List of patch dicts (see PATCH_KEYS)
+        include_base: Also solve the unpatched problem, as the first row and
+            the reference for the *_change columns
+        include_schedules: Keep the full result (with schedule) of every
+            scenario in 'results'; otherwise results carry no schedule
+        max_processes: Upper bound on parallel scenarios (default: derived
+            from the CPU count, see module docstring)
+        **solve_kwargs: solve_schedule options for every scenario; a
+            solver_config num_workers fixes the CP-SAT workers per scenario
+
+    Returns:
+        Dict with 'comparison' (rows with COMPARISON_COLUMNS), 'results'
+        (per scenario) and 'parallelism' ({'processes', 'workers_per_scenario'})
+
+    Raises:
+        ValueError: On unknown patch keys or malformed patches
+    """
+    scenarios = list(scenarios)
+    for number, patch in enumerate(scenarios):
+        unknown = set(patch) - set(PATCH_KEYS)
+        if unknown:
+            raise ValueError(f"Scenario {number}: unknown patch keys {sorted(unknown)}, expected {PATCH_KEYS}")
+    if include_base:
+        scenarios.insert(0, {'name': 'base'})
+    names = [patch.get('name') or f"scenario {number}" for number, patch in enumerate(scenarios)]
+    if not scenarios:
+        return {'comparison': [], 'results': [], 'parallelism': {'processes': 0, 'workers_per_scenario': 0}}
+
+    # Split the cores between parallel scenarios and CP-SAT workers
+    cpu_count = os.cpu_count() or 1
+    solver_config = dict(solve_kwargs.pop('solver_config', None) or {})
+    workers = solver_config.get('num_workers')
+    if workers is None:
+        processes = max(1, cpu_count // MIN_WORKERS_PER_SCENARIO)
+    else:
+        processes = max(1, cpu_count // max(1, int(workers)))
+    processes = min(processes, len(scenarios), max_processes or len(scenarios))
+    if workers is None:
+        workers = max(1, cpu_count // processes)
+    solver_config['num_workers'] = workers
+    solve_kwargs['solver_config'] = solver_config
+
+    logger.info("Solving %d scenario(s) in %d process(es) with %d CP-SAT workers each",
+                len(scenarios), processes, workers)
+
+    # Master data is pickled once; each pool process unpickles it once
+    base = {
+        'machines': machines,
+        'products': products,
+        'setup_times': as_setup_matrix(setup_times, products),
+        'orders': orders,
+        'start_time': start_time,
+        'solve_kwargs': solve_kwargs,
+        'include_schedules': include_schedules,
+    }
+    payload = pickle.dumps(base, protocol=pickle.HIGHEST_PROTOCOL)
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_worker, initargs=(payload,)) as pool:
+        results = list(pool.map(_solve_scenario, scenarios))
+
+    return {
+        'comparison': compare_results(names, results, reference=0 if include_base else None),
+        'results': [dict(result, scenario=name) for name, result in zip(names, results)],
+        'parallelism': {'processes': processes, 'workers_per_scenario': workers},
+    }
+
+
+def apply_patch(base, patch):
+    """
+    Returns the (machines, products, setup_times, orders, solve options) of
+    a base problem with a scenario patch applied. The base is not modified.
+    """
+    machines = list(patch.get('machines', base['machines']))
+    products = list(patch.get('products', base['products']))
+    setup_times = patch.get('setup_times', base['setup_times'])
+    orders = [dict(order) for order in patch.get('orders', base['orders'])]
+
+    removed_machines = set(patch.get('remove_machines', ()))
+    machines = [m for m in machines if m['name'] not in removed_machines] + list(patch.get('add_machines', ()))
+
+    if patch.get('setup_overrides'):
+        setup_times = _override_setup_times(as_setup_matrix(setup_times, products),
+                                            patch['setup_overrides'], products)
+
+    for index, changes in (patch.get('update_orders') or {}).items():
+        index = int(index)  # JSON object keys are strings
+        if not 0 <= index < len(orders):
+            raise ValueError(f"update_orders: unknown order index {index}")
+        orders[index].update(changes)
+    removed_orders = {int(i) for i in patch.get('remove_orders', ())}
+    orders = [o for i, o in enumerate(orders) if i not in removed_orders]
+    orders += [dict(order) for order in patch.get('add_orders', ())]
+
+    shift = patch.get('deadline_shift', 0)
+    factor = patch.get('quantity_factor', 1)
+    for order in orders:
+        order['deadline'] = order['deadline'] + shift
+        if factor != 1:
+            order['quantity'] = max(1, round(order['quantity'] * factor))
+
+    options = dict(base.get('solve_kwargs', {}), **patch.get('options', {}))
+    if 'solver_config' in patch.get('options', {}):
+        options['solver_config'] = dict(base['solve_kwargs'].get('solver_config', {}),
+                                        **patch['options']['solver_config'])
+    return machines, products, setup_times, orders, options
+
+
+def compare_results(names, results, reference=None):
+    """
+    Comparison rows (COMPARISON_COLUMNS) for scenario results; *_change
+    columns are relative to results[reference] when given.
+    """
+    rows = []
+    for name, result in zip(names, results):
+        solver_stats = result.get('stats', {}).get('solver', {})
+        rows.append({
+            'scenario': name,
+            'status': result.get('status'),
+            'makespan': result.get('makespan'),
+            'violation_hours': result.get('total_violation_hours'),
+            'late_orders': len(result['deadline_violations']) if 'deadline_violations' in result else None,
+            'orders': result.get('num_orders'),
+            'machines': result.get('num_machines'),
+            'solve_time': result.get('stats', {}).get('total_time', solver_stats.get('solve_time')),
+            'objective': solver_stats.get('objective'),
+            'gap': solver_stats.get('gap'),
+            'makespan_change': None,
+            'violation_change': None,
+            'error': result.get('message') if result.get('status') == 'ERROR' else None,
+        })
+
+    if reference is not None and rows[reference]['makespan'] is not None:
+        base = rows[reference]
+        for row in rows:
+            if row['makespan'] is not None:
+                row['makespan_change'] = row['makespan'] - base['makespan']
+                row['violation_change'] = row['violation_hours'] - base['violation_hours']
+    return rows
+
+
+def _override_setup_times(matrix, overrides, products):
+    """
+    New SetupMatrix with {"from-to": hours} pairs set on top of `matrix`.
+    """
+    names = list(matrix.products)
+    for product in products:
+        name = product['name'] if isinstance(product, dict) else product
+        if name not in names:
+            names.append(name)
+    values = SetupMatrix.from_dict(overrides, names)
+    # items() skips zero entries, so the overridden pairs come from a 1-valued copy
+    # (an explicit 0 must still replace the old time or a family default)
+    overridden = SetupMatrix.from_dict({key: 1 for key in overrides}, names)
+    pairs = {(a, b): hours for a, b, hours in matrix.items()}
+    for a, b, _ in overridden.items():
+        pairs[(a, b)] = values.between(a, b)
+    return SetupMatrix(names, pairs=[(a, b, hours) for (a, b), hours in pairs.items()],
+                       families=matrix.families, family_times=matrix.family_times)
+
+
+def _init_worker(payload):
+    # Pool process start: unpickle the shared base problem once
+    global _worker_base
+    _worker_base = pickle.loads(payload)
+
+
+def _solve_scenario(patch):
+    """
+    Pool process: applies one patch to the base problem and solves it.
+    """
+    from or_tools import solve_schedule
+
+    try:
+        machines, products, setup_times, orders, options = apply_patch(_worker_base, patch)
+        result = solve_schedule(machines, products, setup_times, orders, _worker_base['start_time'], **options)
+    except Exception as e:
+        return {'status': 'ERROR', 'message': f"{type(e).__name__}: {e}"}
+
+    result['num_orders'] = len(orders)
+    result['num_machines'] = len(machines)
+    if not _worker_base['include_schedules']:
+        result.pop('schedule', None)
+        result.pop('schedule_columns', None)
+    return result
@@ -0,0 +1,325 @@
+"""
+Setup-Time Matrix
+=================
+Changeover times between products, indexed by integer product ids instead of
+"from-to" string keys. The solvers convert whatever they are given into a
+SetupMatrix once (as_setup_matrix) and then only do array lookups.
+
+Storage:
+- dense  - a (products x products) NumPy array, for small catalogs
+- sparse - CSR (row pointers, column indices, values), for large catalogs
+           where only a fraction of the pairs has a setup time
+
+Product families: products can belong to a family (e.g. colour group), with
+a default changeover time between families. An explicit pair entry always
+wins over the family default; in a dense matrix every entry is explicit.
+Changing over to the same product costs 0 unless set explicitly.
+
+Accepted inputs (as_setup_matrix):
+    {"Product X-Product Y": 1, ...}                 legacy string keys
+    {"products": [...], "matrix": [[0, 1], ...]}    dense JSON
+    {"products": [...], "pairs": [[0, 1, 3], ...]}  sparse JSON (from, to, hours)
+optionally with "families": {product: family} and
+"family_times": {from family: {to family: hours}}.
+"""
+
+import numpy as np
+
+
+class SetupMatrix:
+    """
+    Setup times between products, addressed by product index or name.
+    """
+
+    def __init__(self, products, matrix=None, pairs=None, families=None, family_times=None):
+        """
+        Args:
+            products: Product names; position = product index. A repeated
+                name resolves to its first position, like a repeated
+                product definition in the solvers
+            matrix: Optional dense (n x n) array-like of setup hours
+            pairs: Optional iterable of (from, to, hours), from/to as product
+                names or indices (stored sparse; used when matrix is None)
+            families: Optional dict product name -> family name
+            family_times: Optional dict from family -> {to family: hours}
+        """
+        self.products = list(products)
+        self._index = {}
+        for i, name in enumerate(self.products):
+            self._index.setdefault(name, i)
+        size = len(self.products)
+
+        self._dense = None
+        if matrix is not None:
+            dense = np.asarray(matrix)
+            if dense.shape != (size, size):
+                raise ValueError(f"Setup matrix must be {size}x{size}, got {dense.shape}")
+            self._dense = dense.astype(_hours_dtype(dense.max(initial=0)))
+        else:
+            rows, cols, values = [], [], []
+            for from_product, to_product, hours in (pairs or []):
+                rows.append(self._resolve(from_product))
+                cols.append(self._resolve(to_product))
+                values.append(hours)
+            rows = np.asarray(rows, dtype=np.int64)
+            order = np.lexsort((np.asarray(cols, dtype=np.int64), rows))
+            self._indices = np.asarray(cols, dtype=np.int32)[order]
+            self._data = np.asarray(values, dtype=_hours_dtype(max(values, default=0)))[order]
+            self._indptr = np.searchsorted(rows[order], np.arange(size + 1)).astype(np.int32)
+
+        # Family defaults: family id per product plus a small family x family matrix
+        families = families or {}
+        family_times = family_times or {}
+        family_names = sorted({f for f in families.values()}
+                              | set(family_times)
+                              | {f for targets in family_times.values() for f in targets})
+        family_index = {name: i for i, name in enumerate(family_names)}
+        self.families = dict(families)
+        self.family_times = {f: dict(targets) for f, targets in family_times.items()}
+        self._family_of = np.full(size, -1, dtype=np.int32)
+        for product, family in families.items():
+            if product in self._index:
+                self._family_of[self._index[product]] = family_index[family]
+        self._family_matrix = np.zeros((len(family_names), len(family_names)), dtype=np.int64)
+        for from_family, targets in family_times.items():
+            for to_family, hours in targets.items():
+                self._family_matrix[family_index[from_family], family_index[to_family]] = hours
+
+    # ------------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, setup_times, products=None):
+        """
+        Builds a sparse matrix from legacy {"from-to": hours} keys.
+
+        Keys are split at the hyphen whose two sides are both known product
+        names, so names that contain hyphens work. Without `products`, every
+        key must contain exactly one hyphen.
+        """
+        names = list(dict.fromkeys(products)) if products is not None else []
+        known = set(names)
+        pairs = []
+        for key, hours in setup_times.items():
+            if products is None:
+                parts = key.split('-')
+                if len(parts) != 2:
+                    raise ValueError(f"Ambiguous setup key '{key}': pass the product names")
+                for name in parts:
+                    if name not in known:
+                        known.add(name)
+                        names.append(name)
+                pairs.append((parts[0], parts[1], hours))
+                continue
+            split = _split_key(key, known)
+            if split is not None:
+                pairs.append((split[0], split[1], hours))
+        return cls(names, pairs=pairs)
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Builds a matrix from its JSON form (see to_json).
+        """
+        return cls(data['products'], matrix=data.get('matrix'), pairs=data.get('pairs'),
+                   families=data.get('families'), family_times=data.get('family_times'))
+
+    # ------------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------------
+
+    def index(self, product):
+        """
+        Index of a product name, or -1 if unknown.
+        """
+        return self._index.get(product, -1)
+
+    def time(self, i, j):
+        """
+        Setup hours from product index i to product index j (-1 = unknown: 0).
+        """
+        if i < 0 or j < 0:
+            return 0
+        if self._dense is not None:
+            return int(self._dense[i, j])
+        start, end = self._indptr[i], self._indptr[i + 1]
+        position = start + np.searchsorted(self._indices[start:end], j)
+        if position < end and self._indices[position] == j:
+            return int(self._data[position])
+        return self._family_time(i, j)
+
+    def between(self, from_product, to_product):
+        """
+        Setup hours between two product names.
+        """
+        return self.time(self.index(from_product), self.index(to_product))
+
+    def dense(self, products=None):
+        """
+        Dense int64 matrix over `products` (names, default: all), including
+        family defaults. Unknown names get zero rows and columns.
+        """
+        names = self.products if products is None else list(products)
+        ids = np.array([self.index(name) for name in names], dtype=np.int64)
+        known = ids >= 0
+        size = len(names)
+
+        out = np.zeros((size, size), dtype=np.int64)
+        if self._family_matrix.size:
+            family = np.where(known, self._family_of[np.maximum(ids, 0)], -1)
+            has_family = family >= 0
+            both = has_family[:, None] & has_family[None, :]
+            out[both] = self._family_matrix[np.maximum(family, 0)[:, None],
+                                            np.maximum(family, 0)[None, :]][both]
+            np.fill_diagonal(out, 0)
+
+        if self._dense is not None:
+            sub = self._dense[np.ix_(ids[known], ids[known])]
+            out[np.ix_(np.flatnonzero(known), np.flatnonzero(known))] = sub
+            return out
+
+        # Sparse: scatter the explicit entries of each selected row
+        local = np.full(len(self.products), -1, dtype=np.int64)
+        local[ids[known]] = np.flatnonzero(known)
+        for row, i in enumerate(ids):
+            if i < 0:
+                continue
+            start, end = self._indptr[i], self._indptr[i + 1]
+            cols = local[self._indices[start:end]]
+            mask = cols >= 0
+            out[row, cols[mask]] = self._data[start:end][mask]
+        return out
+
+    def max_from(self, product):
+        """
+        Largest setup time out of a product (explicit entries and family defaults).
+        """
+        i = self.index(product)
+        if i < 0:
+            return 0
+        if self._dense is not None:
+            return int(self._dense[i].max(initial=0))
+        start, end = self._indptr[i], self._indptr[i + 1]
+        explicit = int(self._data[start:end].max(initial=0))
+        family = self._family_of[i]
+        family_max = int(self._family_matrix[family].max(initial=0)) if family >= 0 else 0
+        return max(explicit, family_max)
+
+    def items(self):
+        """
+        Yields (from name, to name, hours) for every explicit non-zero entry.
+        """
+        if self._dense is not None:
+            for i, j in zip(*np.nonzero(self._dense)):
+                yield self.products[i], self.products[j], int(self._dense[i, j])
+            return
+        for i in range(len(self.products)):
+            for position in range(self._indptr[i], self._indptr[i + 1]):
+                if self._data[position]:
+                    yield self.products[i], self.products[self._indices[position]], int(self._data[position])
+
+    def __len__(self):
+        """
+        Number of explicit non-zero entries.
+        """
+        if self._dense is not None:
+            return int(np.count_nonzero(self._dense))
+        return int(np.count_nonzero(self._data))
+
+    def __bool__(self):
+        return len(self) > 0 or bool(np.any(self._family_matrix))
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the stored times (excluding product names).
+        """
+        if self._dense is not None:
+            stored = self._dense.nbytes
+        else:
+            stored = self._indptr.nbytes + self._indices.nbytes + self._data.nbytes
+        return stored + self._family_of.nbytes + self._family_matrix.nbytes
+
+    # ------------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------------
+
+    def to_dict(self):
+        """
+        Legacy {"from-to": hours} dict, with family defaults expanded.
+        """
+        full = self.dense()
+        return {f"{self.products[i]}-{self.products[j]}": int(full[i, j]) for i, j in zip(*np.nonzero(full))}
+
+    def to_json(self):
+        """
+        JSON-serialisable form, accepted by from_json and the /solve API.
+        """
+        data = {'products': self.products}
+        if self._dense is not None:
+            data['matrix'] = self._dense.tolist()
+        else:
+            data['pairs'] = [[self.index(a), self.index(b), hours] for a, b, hours in self.items()]
+        if self.families:
+            data['families'] = self.families
+        if self.family_times:
+            data['family_times'] = self.family_times
+        return data
+
+    # ------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------
+
+    def _resolve(self, product):
+        if isinstance(product, str):
+            if product not in self._index:
+                raise ValueError(f"Unknown product '{product}' in setup times")
+            return self._index[product]
+        return int(product)
+
+    def _family_time(self, i, j):
+        if i == j:
+            return 0
+        fi, fj = self._family_of[i], self._family_of[j]
+        if fi < 0 or fj < 0:
+            return 0
+        return int(self._family_matrix[fi, fj])
+
+
+def as_setup_matrix(setup_times, products=None):
+    """
+    Converts any accepted setup-time input into a SetupMatrix.
+
+    Args:
+        setup_times: SetupMatrix, legacy {"from-to": hours} dict, JSON form, or None
+        products: Product names used to split legacy keys (product dicts with
+            a 'name' are accepted too)
+    """
+    if isinstance(setup_times, SetupMatrix):
+        return setup_times
+    names = None
+    if products is not None:
+        names = [p['name'] if isinstance(p, dict) else p for p in products]
+    if not setup_times:
+        return SetupMatrix(names or [], pairs=[])
+    if isinstance(setup_times.get('products'), list):
+        return SetupMatrix.from_json(setup_times)
+    return SetupMatrix.from_dict(setup_times, names)
+
+
+def _split_key(key, known):
+    """
+    Splits "from-to" at the hyphen where both sides are known product names.
+    """
+    position = key.find('-')
+    while position != -1:
+        if key[:position] in known and key[position + 1:] in known:
+            return key[:position], key[position + 1:]
+        position = key.find('-', position + 1)
+    return None
+
+
+def _hours_dtype(max_hours):
+    # Smallest integer type that holds every setup time
+    return np.int16 if max_hours < 2 ** 15 else np.int32
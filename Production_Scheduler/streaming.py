@@ -0,0 +1,136 @@
+"""
+Streaming Solves
+================
+Runs solve_schedule in a background thread and hands every improving CP-SAT
+solution to the caller as it is found, instead of only the final result.
+Used by the /solve/stream Server-Sent Events endpoint and the live view in
+the Streamlit UI.
+
+    stream = SolveStream(machines, products, setup_times, orders, start_time,
+                         stop_at_gap=0.05)
+    for kind, payload in stream:   # ('progress', {...}) ... ('result', {...})
+        ...
+    stream.stop()                  # Optional: stop early, keep the incumbent
+
+Progress payloads carry 'objective', 'bound', 'gap', 'elapsed' and
+'solutions'. With diff=True they also carry a compact 'diff' against the
+previous solution (see schedule_diff), which apply_schedule_diff turns back
+into the full schedule on the receiving side.
+"""
+
+import queue
+import threading
+
+from or_tools import solve_schedule
+
+# Column order of the compact rows in a schedule diff
+DIFF_COLUMNS = ('order_index', 'step', 'unit', 'order', 'operation', 'machine', 'start', 'end')
+
+
+class SolveStream:
+    """
+    Iterable over the progress events of one solve_schedule call.
+    """
+
+    def __init__(self, machines, products, setup_times, orders, start_time,
+                 diff=False, stop_at_gap=None, **solve_kwargs):
+        """
+        Args:
+            machines, products, setup_times, orders, start_time: As for solve_schedule
+            diff: If True, progress events include a schedule diff
+            stop_at_gap: Stop the search once the relative gap is at or below
+                this value (e.g. 0.05 for 5%)
+            **solve_kwargs: Passed through to solve_schedule
+        """
+        self._args = (machines, products, setup_times, orders, start_time)
+        self._solve_kwargs = solve_kwargs
+        self._diff = diff
+        self._stop_at_gap = stop_at_gap
+        self._events = queue.Queue()
+        self._stop_event = threading.Event()
+        self._previous = {}
+        self._thread = None
+
+    def stop(self):
+        """
+        Stops the search; the stream still ends with the best result so far.
+        """
+        self._stop_event.set()
+
+    def __iter__(self):
+        if self._thread is not None:
+            raise RuntimeError("A SolveStream can only be iterated once")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        try:
+            while True:
+                kind, payload = self._events.get()
+                if kind == 'error':
+                    raise payload
+                yield kind, payload
+                if kind == 'result':
+                    return
+        finally:
+            # Consumer went away (e.g. SSE client disconnected): stop solving
+            self._stop_event.set()
+
+    def _run(self):
+        try:
+            result = solve_schedule(*self._args, progress_callback=self._on_progress,
+                                    progress_schedule=self._diff, stop_event=self._stop_event,
+                                    **self._solve_kwargs)
+            self._events.put(('result', result))
+        except Exception as e:
+            self._events.put(('error', e))
+
+    def _on_progress(self, progress):
+        # Called from the solver thread for every improving solution
+        schedule = progress.pop('schedule', None)
+        if schedule is not None:
+            progress['diff'] = schedule_diff(self._previous, schedule)
+            self._previous = {_row_key(row): row for row in schedule}
+        if self._stop_at_gap is not None and progress['gap'] <= self._stop_at_gap:
+            self._stop_event.set()
+        self._events.put(('progress', progress))
+
+
+def _row_key(row):
+    return (row['order_index'], row['step'], row['unit'])
+
+
+def schedule_diff(previous, schedule):
+    """
+    Compact difference between two solutions.
+
+    Args:
+        previous: Dict (order_index, step, unit) -> row of the previous solution
+        schedule: Schedule rows of the new solution
+
+    Returns:
+        Dict with 'columns' (DIFF_COLUMNS), 'changed' (rows that are new or
+        moved, as lists in column order) and 'removed' (keys no longer present)
+    """
+    changed = []
+    seen = set()
+    for row in schedule:
+        key = _row_key(row)
+        seen.add(key)
+        old = previous.get(key)
+        if old is None or old['start'] != row['start'] or old['machine'] != row['machine'] \
+                or old['end'] != row['end']:
+            changed.append([row[column] for column in DIFF_COLUMNS])
+    removed = [list(key) for key in previous if key not in seen]
+    return {'columns': list(DIFF_COLUMNS), 'changed': changed, 'removed': removed}
+
+
+def apply_schedule_diff(rows, diff):
+    """
+    Applies a schedule_diff to a dict (order_index, step, unit) -> row, in place.
+    """
+    for key in diff['removed']:
+        rows.pop(tuple(key), None)
+    for values in diff['changed']:
+        row = dict(zip(diff['columns'], values))
+        rows[_row_key(row)] = row
+    return rows
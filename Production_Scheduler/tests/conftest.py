@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# The scheduler modules import each other by bare name, as when run from their directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+START_TIME = '2025-01-01T08:00'
+
+
+@pytest.fixture
+def small():
+    """Seeded 'small' benchmark instance (sparse setup times)."""
+    from benchmark import make_instance
+    return make_instance('small', 1)
+
+
+@pytest.fixture
+def tiny():
+    """
+    Two machines, four products with one unit each and a setup time on every
+    product change (triangle inequality holds): small enough to solve to
+    optimality in well under a second.
+    """
+    machines = [{'name': 'M1', 'operations': ['cut']}, {'name': 'M2', 'operations': ['paint']}]
+    products = [{'name': name, 'tasks': [{'operation': 'cut', 'duration': duration},
+                                         {'operation': 'paint', 'duration': 2}]}
+                for name, duration in (('A', 2), ('B', 3), ('C', 1), ('D', 2))]
+    setup_times = {f'{p}-{q}': 1 + (ord(p) + ord(q)) % 2 for p in 'ABCD' for q in 'ABCD' if p != q}
+    orders = [{'product': name, 'quantity': 1, 'deadline': deadline}
+              for name, deadline in (('A', 6), ('B', 12), ('C', 4), ('D', 20))]
+    return {'machines': machines, 'products': products, 'setup_times': setup_times, 'orders': orders}
+
+
+def check_schedule(schedule, setup_times=None):
+    """
+    Asserts that no machine runs two tasks at once (nor without the setup
+    time between consecutive products) and that each unit's recipe steps
+    run in order.
+    """
+    from collections import defaultdict
+    from setup_matrix import as_setup_matrix
+
+    setup_times = as_setup_matrix(setup_times) if setup_times else None
+    by_machine = defaultdict(list)
+    by_unit = defaultdict(list)
+    for row in schedule:
+        by_machine[row['machine']].append(row)
+        by_unit[row['order_index'], row['unit']].append(row)
+    for rows in by_machine.values():
+        rows.sort(key=lambda row: row['start'])
+        for earlier, later in zip(rows, rows[1:]):
+            gap = setup_times.between(earlier['order'], later['order']) if setup_times else 0
+            assert later['start'] >= earlier['end'] + gap, (earlier, later)
+    for rows in by_unit.values():
+        rows.sort(key=lambda row: row['step'])
+        for earlier, later in zip(rows, rows[1:]):
+            assert later['start'] >= earlier['end'], (earlier, later)
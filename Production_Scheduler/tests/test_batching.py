@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+import pytest
+
+from conftest import START_TIME, check_schedule
+from or_tools import _split_into_lots, build_model, solve_schedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+@pytest.fixture
+def bulk(tiny):
+    """The tiny instance with several units per order and relaxed deadlines."""
+    orders = [dict(order, quantity=quantity, deadline=60) for order, quantity in zip(tiny['orders'], (5, 3, 4, 1))]
+    return dict(tiny, orders=orders)
+
+
+def _solve(problem, **kwargs):
+    return solve_schedule(problem['machines'], problem['products'], problem['setup_times'], problem['orders'],
+                          START_TIME, solver_config=SOLVER_CONFIG, **kwargs)
+
+
+def test_split_into_lots():
+    assert _split_into_lots(10, 3) == [4, 3, 3]
+    assert _split_into_lots(2, 5) == [1, 1]
+    assert _split_into_lots(7, 1) == [7]
+
+
+@pytest.mark.parametrize('sublots', [1, 2])
+def test_lots_are_expanded_into_unit_rows(bulk, sublots):
+    result = _solve(bulk, batching=True, sublots=sublots)
+    schedule = result['schedule']
+    check_schedule(schedule, bulk['setup_times'])
+
+    # One row per unit and recipe step, as without batching
+    quantities = [order['quantity'] for order in bulk['orders']]
+    assert sorted((row['order_index'], row['step'], row['unit']) for row in schedule) == \
+        sorted((i, step, unit) for i, quantity in enumerate(quantities) for step in (0, 1) for unit in range(quantity))
+
+    # The units of a lot run back to back on one machine
+    lots = defaultdict(list)
+    for row in schedule:
+        lot = row['unit'] * sublots // quantities[row['order_index']] if sublots > 1 else 0
+        lots[row['order_index'], row['step'], lot].append(row)
+    for rows in lots.values():
+        rows.sort(key=lambda row: row['unit'])
+        assert len({row['machine'] for row in rows}) == 1
+        assert all(later['start'] == earlier['end'] for earlier, later in zip(rows, rows[1:]))
+
+
+def test_batching_builds_one_task_per_lot(bulk):
+    args = (bulk['machines'], bulk['products'], bulk['setup_times'], bulk['orders'], START_TIME)
+    assert build_model(*args).num_tasks == 2 * 13
+    assert build_model(*args, batching=True).num_tasks == 2 * 4
+    assert build_model(*args, batching=True, sublots=2).num_tasks == 2 * 7  # Lots of 3+2, 2+1, 2+2, 1
+
+
+def test_every_lot_must_meet_the_deadline(bulk):
+    orders = [dict(order, deadline=20 if i == 0 else 200) for i, order in enumerate(bulk['orders'])]
+    result = _solve(dict(bulk, orders=orders), batching=True, sublots=5)
+    first_order = [row for row in result['schedule'] if row['order_index'] == 0]
+    late = max(row['end'] for row in first_order) - 20
+    assert result['total_violation_hours'] == max(0, late)
@@ -0,0 +1,43 @@
+import pytest
+
+from benchmark import (MIN_TIME_DELTA, compare_to_baseline, load_results, make_instance, run_engine,
+                       write_results)
+
+
+def _record(**values):
+    record = {'family': 'small', 'seed': 1, 'engine': 'cp_sat', 'status': 'OPTIMAL',
+              'total_time': 2.0, 'objective': 100, 'peak_rss_mb': 200.0}
+    record.update(values)
+    return record
+
+
+def test_instances_are_seeded():
+    assert make_instance('small', 1) == make_instance('small', 1)
+    assert make_instance('small', 1) != make_instance('small', 2)
+    assert len(make_instance('small', 1, num_orders=3)['orders']) == 3
+    with pytest.raises(ValueError, match='Unknown family'):
+        make_instance('huge', 1)
+
+
+def test_only_clear_regressions_are_reported():
+    baseline = [_record()]
+    assert compare_to_baseline([_record(objective=105, peak_rss_mb=210.0)], baseline) == []
+    # 25% slower, but by less than MIN_TIME_DELTA seconds: timer noise
+    assert compare_to_baseline([_record(total_time=2.0 + MIN_TIME_DELTA / 2)], baseline) == []
+
+    regressions = compare_to_baseline([_record(total_time=4.0, objective=150)], baseline)
+    assert [(r['metric'], r['change']) for r in regressions] == [('total_time', 1.0), ('objective', 0.5)]
+
+
+def test_losing_the_solution_is_a_regression():
+    regressions = compare_to_baseline([_record(status='UNKNOWN', objective=None)], [_record()])
+    assert [(r['metric'], r['baseline'], r['current']) for r in regressions] == [('status', 'OPTIMAL', 'UNKNOWN')]
+    assert compare_to_baseline([_record(seed=2, objective=None)], [_record()]) == []  # Not in the baseline
+
+
+def test_results_round_trip(tmp_path, small):
+    record = dict(_record(), **run_engine(small, 'dispatch'))
+    path = tmp_path / 'results.json'
+    write_results([record], json_path=path, csv_path=tmp_path / 'results.csv', metadata={'time_limit': 1})
+    assert load_results(path) == [record]
+    assert compare_to_baseline(load_results(path), [record]) == []
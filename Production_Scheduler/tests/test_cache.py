@@ -0,0 +1,91 @@
+import copy
+from datetime import datetime
+
+from cache import SolveCache, make_cache_key
+from conftest import START_TIME
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+START = datetime.fromisoformat(START_TIME)
+
+
+def _key(problem, **kwargs):
+    return make_cache_key(problem['machines'], problem['products'], problem['setup_times'], problem['orders'],
+                          **kwargs)
+
+
+def test_key_ignores_dict_order_and_settings_without_effect(tiny):
+    reordered = copy.deepcopy(tiny)
+    reordered['machines'] = [dict(reversed(list(m.items()))) for m in reordered['machines']]
+    reordered['setup_times'] = dict(reversed(list(reordered['setup_times'].items())))
+    assert _key(tiny) == _key(reordered)
+    assert _key(tiny) == _key(tiny, objective='weighted')
+    assert _key(tiny) == _key(tiny, solver_config={'log_search_progress': True})
+    assert _key(tiny) == _key(tiny, warm_start='dispatch')
+
+
+def test_key_changes_with_the_model(tiny):
+    assert _key(tiny) != _key(tiny, sequencing='circuit')
+    assert _key(tiny) != _key(tiny, objective='lexicographic')
+    assert _key(tiny) != _key(tiny, solver_config={'time_limit': 1})
+    changed = copy.deepcopy(tiny)
+    changed['orders'][0]['quantity'] += 1
+    assert _key(tiny) != _key(changed)
+
+
+def test_key_compares_options_with_their_defaults(tiny):
+    assert _key(tiny) != _key(tiny, tighten_domains=False)
+    assert _key(tiny) == _key(tiny, tighten_domains=True)
+    assert _key(tiny) != _key(tiny, deviation_weight=1, reference_schedule=[{'order_index': 0}])
+    assert _key(tiny) == _key(tiny, deviation_weight=0, fixed_tasks={}, calendars=None)
+    assert _key(tiny, sublots=1) != _key(tiny, sublots=2)
+
+
+def test_start_time_only_matters_with_calendars(tiny):
+    assert _key(tiny, start_time='2025-01-01T08:00') == _key(tiny, start_time='2025-01-02T08:00')
+    calendars = {'default': {'shifts': [{'days': 'mon-fri', 'start': '06:00', 'end': '22:00'}]}}
+    assert _key(tiny, calendars=calendars, start_time='2025-01-01T08:00') != \
+        _key(tiny, calendars=calendars, start_time='2025-01-02T08:00')
+
+
+def test_hit_from_another_start_is_rebased(tiny):
+    cache = SolveCache()
+    args = (tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'])
+    first = cache.solve(*args, START_TIME, solver_config=SOLVER_CONFIG)
+    same = cache.solve(*args, START_TIME, solver_config=SOLVER_CONFIG)
+    moved = cache.solve(*args, '2025-01-02T08:00', solver_config=SOLVER_CONFIG)
+
+    assert [first['cache'], same['cache'], moved['cache']] == ['miss', 'hit', 'rebased']
+    assert [row['start'] for row in moved['schedule']] == [row['start'] for row in first['schedule']]
+    assert moved['start_datetime'] == '2025-01-02 08:00'
+    assert moved['schedule'][0]['start_datetime'].startswith('2025-01-02')
+    assert cache.info()['hits'] == 2 and cache.info()['rebased_hits'] == 1
+
+
+def _result(size):
+    return {'status': 'OPTIMAL', 'start_datetime': '2025-01-01 08:00',
+            'schedule': [{'start': i, 'end': i + 1, 'machine': f'M{i}'} for i in range(size)]}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    probe = SolveCache()
+    probe.put('probe', _result(20))
+    cache = SolveCache(max_bytes=int(probe.info()['bytes'] * 2.5))
+    cache.put('a', _result(20))
+    cache.put('b', _result(20))
+    assert cache.get('a', START) is not None  # 'a' is now the most recent
+    cache.put('c', _result(20))
+    assert cache.get('b', START) is None
+    assert cache.get('a', START) is not None and cache.get('c', START) is not None
+    assert cache.info()['evictions'] == 1
+
+
+def test_timeouts_are_not_cached():
+    cache = SolveCache()
+    cache.put('key', {'status': 'UNKNOWN', 'solver_status': 'UNKNOWN'})
+    assert cache.info()['entries'] == 0
+
+
+def test_sqlite_backend_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    SolveCache(path=path).put('key', _result(3))
+    assert SolveCache(path=path).get('key', START)['cache'] == 'hit'
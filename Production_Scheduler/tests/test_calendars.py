@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from calendars import MachineCalendar, machine_calendars, uses_calendars
+from conftest import START_TIME
+
+START = datetime.fromisoformat(START_TIME)  # A Wednesday, 08:00
+
+TWO_SHIFTS = {'shifts': [{'days': 'mon-fri', 'start': '06:00', 'end': '22:00'}]}
+
+
+def test_shift_pattern_becomes_blocked_model_hours():
+    calendar = MachineCalendar(TWO_SHIFTS, START)
+    # Wednesday and Thursday nights, then the weekend until Monday 06:00
+    assert calendar.blocked(120) == [(14, 22), (38, 46), (62, 118)]
+    assert calendar.availability == pytest.approx(80 / 168)
+    assert calendar.longest_shift == 16
+
+
+def test_next_start_skips_to_the_next_fitting_stretch():
+    calendar = MachineCalendar(TWO_SHIFTS, START)
+    assert calendar.next_start(0, 5) == 0
+    assert calendar.next_start(10, 6) == 22  # Would run into the night
+    assert calendar.next_start(14, 1) == 22
+    assert calendar.next_start(50, 16) == 118  # Friday is too short after 10:00
+    assert calendar.next_start(5000, 2) >= 5000  # Compiles further weeks on demand
+    with pytest.raises(ValueError, match='does not fit'):
+        calendar.next_start(0, 17)
+
+
+def test_night_shift_over_the_week_boundary_counts_as_one():
+    calendar = MachineCalendar({'shifts': [{'days': 'daily', 'start': '22:00', 'end': '06:00'}]}, START)
+    assert calendar.longest_shift == 8
+    assert calendar.next_start(0, 8) == 14  # Wednesday 22:00
+
+
+def test_breaks_and_one_off_windows():
+    spec = {'breaks': [{'days': 'wed', 'start': '12:00', 'end': '13:00'}],
+            'blocked': [{'start': '2025-01-02T00:00', 'end': '2025-01-02T01:30'}, [30, 31]]}
+    calendar = MachineCalendar(spec, START, extra_blocked=[(40.5, 41)])
+    assert calendar.blocked(48) == [(4, 5), (16, 18), (30, 31), (40, 41)]
+    assert calendar.longest_shift == 167
+    with pytest.raises(ValueError, match='Unknown calendar keys'):
+        MachineCalendar({'shift': []}, START)
+    with pytest.raises(ValueError, match='Unknown calendar day'):
+        MachineCalendar({'shifts': [{'days': 'someday'}]}, START)
+
+
+def test_machines_share_compiled_calendars():
+    machines = [{'name': 'M1'}, {'name': 'M2'}, {'name': 'M3', 'calendar': 'nights'}, {'name': 'M4', 'calendar': {}}]
+    calendars = {'default': TWO_SHIFTS, 'nights': {'shifts': [{'start': '22:00', 'end': '06:00'}]}}
+    result = machine_calendars(machines, calendars, START, machine_unavailable={'M2': [(0, 4)]})
+    assert sorted(result) == ['M1', 'M2', 'M3']  # An empty spec means always working
+    assert result['M2'] is not result['M1'] and result['M2'].blocked(5) == [(0, 4)]
+    assert uses_calendars(machines) and uses_calendars([{'name': 'M1'}], calendars)
+    assert not uses_calendars([{'name': 'M1'}])
+    with pytest.raises(ValueError, match="unknown calendar 'weekend'"):
+        machine_calendars([{'name': 'M1', 'calendar': 'weekend'}], {}, START)
@@ -0,0 +1,43 @@
+import pytest
+
+from conftest import START_TIME
+from or_tools import build_model, compact_schedule, expand_schedule, solve_schedule
+
+# One worker and a fixed seed: two solves of the same model find the same schedule
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1, 'random_seed': 0}
+
+
+@pytest.mark.parametrize('options', [{}, {'batching': True, 'sublots': 2}, {'flexible': True}])
+def test_columnar_result_matches_the_rows(small, options):
+    compiled = build_model(small['machines'], small['products'], small['setup_times'], small['orders'],
+                           START_TIME, **options)
+    rows = compiled.solve(SOLVER_CONFIG)
+    columnar = compiled.solve(SOLVER_CONFIG, result_format='columnar')
+
+    assert 'schedule' not in columnar
+    assert columnar['schedule_columns']['size'] == len(rows['schedule'])
+    assert expand_schedule(columnar['schedule_columns'], columnar['start_datetime']) == rows['schedule']
+    # Codes may be numbered differently, the decoded rows may not
+    assert expand_schedule(compact_schedule(rows['schedule']), rows['start_datetime']) == rows['schedule']
+    for key in ('status', 'makespan', 'deadline_violations', 'total_violation_hours'):
+        assert columnar[key] == rows[key]
+
+
+def test_unknown_result_format_is_rejected(tiny):
+    with pytest.raises(ValueError, match='result_format'):
+        solve_schedule(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                       result_format='arrow')
+
+
+@pytest.mark.parametrize('engine', ['cp_sat', 'dispatch'])
+def test_solve_endpoint_returns_the_same_schedule_as_columns(tiny, engine):
+    from main import app
+
+    client = app.test_client()
+    request = dict(tiny, start_time=START_TIME, engine=engine, cache=False, solver_config=SOLVER_CONFIG)
+    rows = client.post('/solve', json=request).get_json()
+    columnar = client.post('/solve', json=dict(request, format='columnar')).get_json()
+
+    assert 'schedule' not in columnar
+    assert expand_schedule(columnar['schedule_columns'], columnar['start_datetime']) == rows['schedule']
+    assert client.post('/solve', json=dict(request, format='arrow')).status_code == 400
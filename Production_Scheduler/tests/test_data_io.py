@@ -0,0 +1,82 @@
+import io
+
+import pandas as pd
+import pytest
+
+import data_io
+from conftest import START_TIME
+from data_io import SchemaError, export_data, export_schedule, import_data, iter_orders
+from dispatching import solve_dispatch
+
+
+@pytest.fixture(params=data_io.FORMATS)
+def file_format(request):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    return request.param
+
+
+@pytest.mark.parametrize('kind', data_io.KINDS)
+def test_export_import_round_trip(tiny, kind, file_format):
+    machines = [dict(machine, speed=1.5) for machine in tiny['machines']]
+    data = dict(tiny, machines=machines)[kind]
+    exported = export_data(kind, data, format=file_format, products=tiny['products'])
+    assert import_data(kind, io.BytesIO(exported), format=file_format, products=tiny['products']) == data
+
+
+def test_orders_are_read_in_validated_chunks(tiny):
+    orders = [dict(order, customer=f'C{i}') for i, order in enumerate(tiny['orders'] * 3)]
+    exported = export_data('orders', orders, format='jsonl')
+    chunks = list(iter_orders(io.BytesIO(exported), format='jsonl', chunksize=5))
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert sum(chunks, []) == orders
+
+
+def test_optional_integer_columns_survive_a_round_trip_and_solve(tiny, file_format):
+    from or_tools import solve_schedule
+    orders = [dict(order, weight=3, priority=2) if i % 2 else order for i, order in enumerate(tiny['orders'])]
+    exported = export_data('orders', orders, format=file_format)
+    imported = import_data('orders', io.BytesIO(exported), format=file_format, products=tiny['products'])
+    assert imported == orders
+    assert all(type(order['weight']) is int for order in imported if 'weight' in order)
+    result = solve_schedule(tiny['machines'], tiny['products'], tiny['setup_times'], imported, START_TIME,
+                            objective='lexicographic', stages=['weighted_tardiness', 'makespan'],
+                            solver_config={'time_limit': 10, 'num_workers': 1})
+    assert result['status'] in ('OPTIMAL', 'FEASIBLE')
+
+
+def test_schema_errors_name_the_rows(tiny):
+    text = "product,quantity,deadline\nA,2,10\nB,0,10\nZ,1,\nC,1.5,4\n"
+    with pytest.raises(SchemaError) as error:
+        import_data('orders', io.BytesIO(text.encode()), format='csv', products=tiny['products'])
+    assert error.value.problems == ["row 4: 'quantity' must be a whole number", "row 2: 'quantity' must be >= 1",
+                                    "row 3: 'deadline' is missing", "row 3: unknown product in 'product'"]
+    with pytest.raises(SchemaError, match='missing columns'):
+        import_data('setup_times', io.BytesIO(b"from,to\nA,B\n"), format='csv')
+    with pytest.raises(ValueError, match='Cannot tell the file format'):
+        import_data('orders', io.BytesIO(b""))
+
+
+def test_schedule_export_keeps_hours_and_datetimes(tiny, file_format):
+    result = solve_dispatch(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME)
+    exported = export_schedule(result, format=file_format)
+    if file_format == 'csv':
+        frame = pd.read_csv(io.BytesIO(exported), parse_dates=['start_datetime', 'end_datetime'])
+    elif file_format == 'parquet':
+        frame = pd.read_parquet(io.BytesIO(exported))
+    else:
+        frame = pd.read_json(io.BytesIO(exported), lines=True, convert_dates=['start_datetime', 'end_datetime'])
+    expected = pd.DataFrame(result['schedule'])
+    assert frame['start'].tolist() == expected['start'].tolist()
+    assert frame['machine'].astype(str).tolist() == expected['machine'].tolist()
+    assert frame['end_datetime'].dt.strftime('%Y-%m-%d %H:%M').tolist() == expected['end_datetime'].tolist()
+
+
+def test_csv_schedule_export_needs_no_pyarrow(tiny, monkeypatch):
+    result = solve_dispatch(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME)
+    expected = export_schedule(result, format='csv')
+    monkeypatch.setattr(data_io, 'pyarrow', None)
+    assert not data_io.parquet_available()
+    assert export_schedule(result, format='csv') == expected
+    with pytest.raises(ValueError, match='pyarrow'):
+        export_schedule(result, format='parquet')
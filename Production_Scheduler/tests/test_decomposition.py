@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import START_TIME, check_schedule
+from decomposition import _deadline_windows, _machine_clusters, solve_rolling_horizon
+from or_tools import get_master_data_index
+
+
+def test_machine_clusters_split_orders_without_shared_machines(tiny):
+    machines = tiny['machines'] + [{'name': 'M3', 'operations': ['weld']}]
+    products = tiny['products'] + [{'name': 'W', 'tasks': [{'operation': 'weld', 'duration': 1}]}]
+    orders = tiny['orders'] + [{'product': 'W', 'quantity': 1, 'deadline': 5}]
+    index = get_master_data_index(machines, products)
+    clusters = _machine_clusters(machines, orders, index, flexible=False)
+    assert sorted(clusters) == [[0, 1, 2, 3], [4]]
+
+
+def test_deadline_windows_respect_the_task_limit(tiny):
+    index = get_master_data_index(tiny['machines'], tiny['products'])
+    windows = _deadline_windows(range(4), tiny['orders'], index, max_tasks_per_window=4, batching=False, sublots=1)
+    assert windows == [[2, 0], [1, 3]]  # Two 2-task orders per window, by deadline
+
+
+def test_rolling_horizon_schedules_every_task_without_conflicts(small):
+    result = solve_rolling_horizon(small['machines'], small['products'], small['setup_times'], small['orders'],
+                                   START_TIME, max_tasks_per_window=15, time_limit=10,
+                                   solver_config={'num_workers': 1})
+    assert result['decomposition']['num_windows'] > 1
+    expected_tasks = sum(len(next(p for p in small['products'] if p['name'] == order['product'])['tasks'])
+                         * order['quantity'] for order in small['orders'])
+    assert len(result['schedule']) == expected_tasks
+    check_schedule(result['schedule'], small['setup_times'])
+
+
+def test_budget_comes_from_the_solver_config_unless_given(tiny):
+    args = (tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME)
+    result = solve_rolling_horizon(*args, split='deadline', max_tasks_per_window=4,
+                                   solver_config={'time_limit': 4, 'num_workers': 1})
+    assert [window['time_limit'] for window in result['windows']] == [2, 2]
+    assert solve_rolling_horizon(*args, time_limit=3, solver_config={'time_limit': 3})['status'] != 'ERROR'
+    with pytest.raises(ValueError, match='disagree'):
+        solve_rolling_horizon(*args, time_limit=10, solver_config={'time_limit': 4})
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import START_TIME, check_schedule
+from dispatching import DISPATCH_RULES, solve_dispatch, solve_dispatch_best
+
+
+def _score(result):
+    return result['makespan'] + 1000 * result['total_violation_hours']
+
+
+@pytest.mark.parametrize('rule', DISPATCH_RULES)
+def test_every_rule_builds_a_valid_schedule(small, rule):
+    result = solve_dispatch(small['machines'], small['products'], small['setup_times'], small['orders'],
+                            START_TIME, rule=rule)
+    assert result['rule'] == rule
+    assert result['makespan'] == max(row['end'] for row in result['schedule'])
+    check_schedule(result['schedule'], small['setup_times'])
+
+
+def test_batching_schedules_lots(tiny):
+    orders = [dict(order, quantity=4) for order in tiny['orders']]
+    result = solve_dispatch(tiny['machines'], tiny['products'], tiny['setup_times'], orders, START_TIME,
+                            batching=True, sublots=2)
+    assert len(result['schedule']) == 4 * 2 * 4  # Rows stay per unit
+    check_schedule(result['schedule'], tiny['setup_times'])
+
+
+def test_best_rule_is_no_worse_than_any_single_rule(small):
+    args = (small['machines'], small['products'], small['setup_times'], small['orders'], START_TIME)
+    best = solve_dispatch_best(*args)
+    assert _score(best) == min(_score(solve_dispatch(*args, rule=rule)) for rule in DISPATCH_RULES)
+
+
+def test_unknown_rule_is_rejected(tiny):
+    with pytest.raises(ValueError, match="Unknown dispatching rule"):
+        solve_dispatch(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                       rule='FIFO')
@@ -0,0 +1,62 @@
+import math
+
+import pytest
+
+from conftest import START_TIME, check_schedule
+from or_tools import build_model, solve_schedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+@pytest.fixture
+def two_cutters(tiny):
+    """The tiny instance with a second, twice as fast cutting machine."""
+    machines = [tiny['machines'][0], {'name': 'M3', 'operations': ['cut'], 'speed': 2}, tiny['machines'][1]]
+    return dict(tiny, machines=machines)
+
+
+def _solve(problem, **kwargs):
+    return solve_schedule(problem['machines'], problem['products'], problem['setup_times'], problem['orders'],
+                          START_TIME, solver_config=SOLVER_CONFIG, **kwargs)
+
+
+def test_tasks_are_bound_to_the_first_machine_unless_flexible(two_cutters):
+    bound = _solve(two_cutters)
+    assert {row['machine'] for row in bound['schedule'] if row['operation'] == 'cut'} == {'M1'}
+
+    flexible = _solve(two_cutters, flexible=True)
+    check_schedule(flexible['schedule'], two_cutters['setup_times'])
+    assert {row['machine'] for row in flexible['schedule'] if row['operation'] == 'cut'} == {'M1', 'M3'}
+    assert flexible['makespan'] <= bound['makespan']
+
+
+def test_each_flexible_task_runs_once_at_its_machine_speed(two_cutters):
+    result = _solve(two_cutters, flexible=True)
+    durations = {product['name']: product['tasks'][0]['duration'] for product in two_cutters['products']}
+    cuts = [row for row in result['schedule'] if row['operation'] == 'cut']
+    assert sorted((row['order_index'], row['unit']) for row in cuts) == [(i, 0) for i in range(4)]
+    for row in cuts:
+        speed = 2 if row['machine'] == 'M3' else 1
+        assert row['end'] - row['start'] == math.ceil(durations[row['order']] / speed)
+
+
+def test_machine_durations_override_the_speed(two_cutters):
+    products = [dict(product, tasks=[dict(product['tasks'][0], machine_durations={'M3': 20}),
+                                     product['tasks'][1]])
+                for product in two_cutters['products']]
+    result = _solve(dict(two_cutters, products=products), flexible=True)
+    # 20 hours on M3 never pays off against 1-3 hours on M1
+    assert {row['machine'] for row in result['schedule'] if row['operation'] == 'cut'} == {'M1'}
+
+
+def test_flexible_model_has_an_optional_interval_per_capable_machine(two_cutters):
+    args = (two_cutters['machines'], two_cutters['products'], two_cutters['setup_times'], two_cutters['orders'],
+            START_TIME)
+    bound = build_model(*args).stats['model']
+    flexible = build_model(*args, flexible=True).stats['model']
+    assert bound['intervals_per_machine'] == {'M1': 4, 'M2': 4}
+    # Each cut gets an optional interval on both cutters and picks exactly one;
+    # paint has a single option and keeps its fixed interval
+    assert flexible['intervals_per_machine'] == {'M1': 4, 'M3': 4, 'M2': 4}
+    assert flexible['constraints_by_type']['ExactlyOne'] == 4
+    assert 'ExactlyOne' not in bound['constraints_by_type']
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from conftest import START_TIME
+from gantt import MIXED, gantt_figure, merge_adjacent
+
+
+def _frame(rows):
+    return pd.DataFrame([dict(zip(('order', 'machine', 'operation', 'start', 'end', 'setup_time'), row))
+                         for row in rows])
+
+
+ROWS = [('A', 'M1', 'cut', 0, 2, 0), ('A', 'M1', 'cut', 2, 4, 0), ('B', 'M1', 'cut', 5, 6, 1),
+        ('A', 'M2', 'paint', 2, 3, 0), ('A', 'M2', 'paint', 4, 5, 0)]
+
+
+def test_back_to_back_tasks_of_one_product_are_merged():
+    blocks = merge_adjacent(_frame(ROWS))
+    assert blocks[['order', 'machine', 'start', 'end', 'tasks']].values.tolist() == \
+        [['A', 'M1', 0, 4, 2], ['B', 'M1', 5, 6, 1], ['A', 'M2', 2, 3, 1], ['A', 'M2', 4, 5, 1]]
+
+
+def test_gaps_and_mixed_products():
+    assert merge_adjacent(_frame(ROWS), max_gap=1)['tasks'].tolist() == [2, 1, 2]
+    blocks = merge_adjacent(merge_adjacent(_frame(ROWS)), max_gap=1, same_product=False)
+    assert blocks[['order', 'start', 'end', 'tasks']].values.tolist() == [[MIXED, 0, 6, 3], ['A', 2, 5, 2]]
+    assert len(merge_adjacent(_frame(ROWS).iloc[:0])) == 0
+
+
+def test_figure_has_one_bar_per_product_plus_hover():
+    figure, info = gantt_figure(_frame(ROWS).to_dict('records'), START_TIME)
+    assert info == {'tasks': 5, 'blocks': 5, 'merged': False}
+    assert [trace.type for trace in figure.data] == ['bar', 'bar', 'scattergl']
+
+
+def test_large_schedules_are_merged_and_windowed():
+    rows = [('P', f'M{i % 3}', 'cut', i // 3, i // 3 + 1, 0) for i in range(300)]
+    _, info = gantt_figure(_frame(rows), START_TIME, detail_limit=50)
+    assert info == {'tasks': 300, 'blocks': 3, 'merged': True}
+    _, info = gantt_figure(_frame(rows), START_TIME, window=(10, 20), detail_limit=50)
+    assert info == {'tasks': 30, 'blocks': 30, 'merged': False}
+    _, info = gantt_figure(_frame(rows), START_TIME, window=(500, 600))
+    assert info == {'tasks': 0, 'blocks': 0, 'merged': False}
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from conftest import START_TIME
+from jobs import JobManager
+
+
+def _wait(manager, job_id, statuses=('done', 'cancelled', 'failed'), timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.1)
+    pytest.fail(f"Job {job_id} still {job['status']} after {timeout}s")
+
+
+def _submit(manager, instance, **kwargs):
+    return manager.submit(machines=instance['machines'], products=instance['products'],
+                          setup_times=instance['setup_times'], orders=instance['orders'], start_time=START_TIME,
+                          solver_config={'time_limit': 10}, **kwargs)
+
+
+def test_job_runs_to_a_result(tiny):
+    manager = JobManager(max_workers=1)
+    job = _wait(manager, _submit(manager, tiny))
+    assert job['status'] == 'done'
+    assert job['result']['status'] == 'OPTIMAL'
+    assert 'partial_schedule' not in job
+
+
+def test_partial_schedules_are_opt_in(small):
+    manager = JobManager(max_workers=1)
+    plain = _submit(manager, small)
+    with_schedule = _submit(manager, small, progress_schedule=True)
+    for job_id, expected in ((plain, False), (with_schedule, True)):
+        _wait(manager, job_id)
+        # The last progress message carried a schedule only when asked for
+        assert (manager._jobs[job_id]['partial_schedule'] is not None) is expected
+
+
+def test_cancelling_a_queued_job_drops_it(tiny):
+    manager = JobManager(max_workers=1)
+    running = _submit(manager, tiny)
+    queued = _submit(manager, tiny)
+    assert manager.cancel(queued) == 'cancelled'
+    assert manager.get(queued)['status'] == 'cancelled'
+    assert manager.cancel('missing') is None
+    _wait(manager, running)
+
+
+def test_dead_worker_fails_its_job_and_frees_the_slot(small, tiny):
+    manager = JobManager(max_workers=1)
+    killed = manager.submit(machines=small['machines'], products=small['products'],
+                            setup_times=small['setup_times'], orders=small['orders'], start_time=START_TIME,
+                            solver_config={'time_limit': 60, 'relative_gap': 0})
+    queued = _submit(manager, tiny)
+    manager._processes[killed].kill()
+
+    job = _wait(manager, killed)
+    assert job['status'] == 'failed'
+    assert 'code -9' in job['error']
+    assert _wait(manager, queued)['status'] == 'done'
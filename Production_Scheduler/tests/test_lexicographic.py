@@ -0,0 +1,122 @@
+import pytest
+from ortools.sat.python import cp_model
+
+from conftest import START_TIME, check_schedule
+from or_tools import build_model, resolve_stages, solve_schedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+@pytest.fixture
+def tight(tiny):
+    """The tiny instance with deadlines it cannot all meet."""
+    orders = [dict(order, deadline=deadline) for order, deadline in zip(tiny['orders'], (3, 5, 2, 8))]
+    return dict(tiny, orders=orders)
+
+
+def _solve(problem, stages, **kwargs):
+    return solve_schedule(problem['machines'], problem['products'], problem['setup_times'], problem['orders'],
+                          START_TIME, objective='lexicographic', stages=stages,
+                          solver_config=kwargs.pop('solver_config', SOLVER_CONFIG), **kwargs)
+
+
+def test_stage_budgets_add_up_to_the_time_limit():
+    stages = resolve_stages(['total_tardiness', {'objective': 'makespan', 'time_limit': 4}, 'max_tardiness'], 10)
+    assert [stage['time_limit'] for stage in stages] == [3.0, 4, 3.0]
+    assert sum(stage['time_limit'] for stage in stages) == 10
+    assert [stage['tolerance'] for stage in stages] == [0, 0, 0]
+    # Every stage gets at least a second, even when the others use up the budget
+    assert resolve_stages(['makespan', {'objective': 'total_tardiness', 'time_limit': 10}], 10)[0]['time_limit'] == 1
+
+
+def test_invalid_stages_are_rejected():
+    with pytest.raises(ValueError, match='Unknown stage objective'):
+        resolve_stages(['lateness'], 10)
+    with pytest.raises(ValueError, match='Unknown stage keys'):
+        resolve_stages([{'objective': 'makespan', 'weight': 2}], 10)
+    with pytest.raises(ValueError, match='must not be negative'):
+        resolve_stages([{'objective': 'makespan', 'tolerance': -1}], 10)
+    with pytest.raises(ValueError, match="sequencing='circuit'"):
+        resolve_stages(['setup_time'], 10)
+    with pytest.raises(ValueError, match='At least one stage'):
+        resolve_stages([], 10)
+
+
+def test_later_stages_never_worsen_earlier_ones(tight):
+    tardiness_first = _solve(tight, ['total_tardiness', 'makespan'])
+    makespan_first = _solve(tight, ['makespan', 'total_tardiness'])
+    for result in (tardiness_first, makespan_first):
+        assert result['status'] == 'FEASIBLE_WITH_VIOLATIONS'
+        assert [stage['status'] for stage in result['stages']] == ['OPTIMAL', 'OPTIMAL']
+        check_schedule(result['schedule'], tight['setup_times'])
+
+    # The final schedule keeps the first stage's optimum
+    assert tardiness_first['total_violation_hours'] == tardiness_first['stages'][0]['value']
+    assert tardiness_first['makespan'] == tardiness_first['stages'][1]['value']
+    assert makespan_first['makespan'] == makespan_first['stages'][0]['value']
+    assert makespan_first['total_violation_hours'] == makespan_first['stages'][1]['value']
+
+    # Each stage order wins on its first objective
+    assert tardiness_first['total_violation_hours'] <= makespan_first['total_violation_hours']
+    assert makespan_first['makespan'] <= tardiness_first['makespan']
+
+
+def test_stage_tolerance_lets_later_stages_trade(tight):
+    strict = _solve(tight, ['total_tardiness', 'makespan'])
+    relaxed = _solve(tight, [{'objective': 'total_tardiness', 'tolerance': 100}, 'makespan'])
+    assert relaxed['total_violation_hours'] <= relaxed['stages'][0]['value'] + 100
+    assert relaxed['makespan'] <= strict['makespan']
+
+
+def test_each_stage_is_hinted_with_the_previous_solution(tight, monkeypatch):
+    hinted = []  # Hinted variables per stage solve
+    solve = cp_model.CpSolver.solve
+
+    def recording_solve(solver, model, *args, **kwargs):
+        hinted.append(len(model.Proto().solution_hint.vars))
+        return solve(solver, model, *args, **kwargs)
+
+    monkeypatch.setattr(cp_model.CpSolver, 'solve', recording_solve)
+    compiled = build_model(tight['machines'], tight['products'], tight['setup_times'], tight['orders'],
+                           START_TIME, objective='lexicographic')
+    stage_names = ['max_tardiness', 'total_tardiness', 'makespan']
+    result = compiled.solve(SOLVER_CONFIG, stages=stage_names)
+
+    assert [stage['objective'] for stage in result['stages']] == stage_names
+    # Hints are replaced, not added to: each later stage has one per variable
+    # (the max_tardiness variable belongs to the stage that created it)
+    variables = len(compiled.model.Proto().variables)
+    assert hinted[1:] == [variables + 1, variables + 1]
+
+
+def test_stage_bounds_stay_on_the_solve_not_the_model(tight):
+    compiled = build_model(tight['machines'], tight['products'], tight['setup_times'], tight['orders'],
+                           START_TIME, objective='lexicographic')
+    constraints = len(compiled.model.Proto().constraints)
+    makespan_first = compiled.solve(SOLVER_CONFIG, stages=['makespan', 'total_tardiness'])
+    tardiness_first = compiled.solve(SOLVER_CONFIG, stages=['total_tardiness', 'makespan'])
+    assert len(compiled.model.Proto().constraints) == constraints
+    # The second solve is not held to the first one's makespan
+    assert tardiness_first['total_violation_hours'] <= makespan_first['total_violation_hours']
+
+
+def test_stages_share_the_time_limit_on_a_larger_instance(small):
+    config = {'time_limit': 6, 'num_workers': 1}
+    result = _solve(small, ['total_tardiness', {'objective': 'makespan', 'time_limit': 2}, 'max_tardiness'],
+                    solver_config=config)
+    assert result['status'] in ('OPTIMAL', 'FEASIBLE')
+    assert sum(stage['time_limit'] for stage in result['stages']) == config['time_limit']
+    for stage in result['stages']:
+        assert stage['solve_time'] <= stage['time_limit'] + 1
+    assert result['stages'][1]['value'] == result['makespan']
+    assert result['stages'][2]['value'] == max([row['violation_hours'] for row in result['deadline_violations']],
+                                               default=0)
+
+
+def test_setup_time_stage_sums_the_circuit_arcs(tight):
+    result = _solve(tight, ['total_tardiness', 'setup_time', 'makespan'], sequencing='circuit')
+    assert [stage['status'] for stage in result['stages']] == ['OPTIMAL'] * 3
+    first, setup, _ = result['stages']
+    assert result['total_violation_hours'] == first['value']
+    # Setup hours between consecutive tasks on each machine, as scheduled
+    assert sum(row['setup_time'] for row in result['schedule']) == setup['value']
@@ -0,0 +1,52 @@
+import threading
+
+import or_tools
+from or_tools import get_master_data_index
+
+
+def _machines(speed=1):
+    return [{'name': 'M1', 'operations': ['cut', 'paint']}, {'name': 'M2', 'operations': ['cut'], 'speed': speed}]
+
+
+PRODUCTS = [
+    {'name': 'A', 'tasks': [{'operation': 'cut', 'duration': 4}, {'operation': 'paint', 'duration': 2}]},
+    {'name': 'B', 'tasks': [{'operation': 'cut', 'duration': 3, 'machine_durations': {'M1': 5}}]},
+    {'name': 'A', 'tasks': [{'operation': 'paint', 'duration': 9}]},  # Duplicate name: the first one wins
+]
+
+
+def test_index_lists_capable_machines_and_durations():
+    index = get_master_data_index(_machines(speed=2), PRODUCTS)
+    assert index['product_by_name']['A'] is PRODUCTS[0]
+    assert index['machine_for_operation']['cut']['name'] == 'M1'
+    assert [m['name'] for m in index['machines_for_operation']['cut']] == ['M1', 'M2']
+    options = {name: [[(m['name'], d) for m, d in task] for task in tasks]
+               for name, tasks in index['recipe_options'].items()}
+    assert options == {'A': [[('M1', 4), ('M2', 2)], [('M1', 2)]], 'B': [[('M1', 5), ('M2', 2)]]}
+    # Work per product entry on the slowest capable machine
+    assert index['product_work'] == [6, 5, 9]
+
+
+def test_index_is_reused_until_the_master_data_changes():
+    first = get_master_data_index(_machines(), PRODUCTS)
+    assert get_master_data_index(_machines(), [dict(p) for p in PRODUCTS]) is first
+    assert get_master_data_index(_machines(speed=2), PRODUCTS) is not first
+
+
+def test_index_cache_stays_bounded_under_concurrent_calls():
+    errors = []
+
+    def build(speeds):
+        try:
+            for speed in speeds:
+                assert get_master_data_index(_machines(speed), PRODUCTS)['product_work'][0] == 6
+        except Exception as e:  # Surface failures from the worker threads
+            errors.append(e)
+
+    threads = [threading.Thread(target=build, args=(range(i, i + 200),)) for i in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(or_tools._index_cache) <= or_tools._INDEX_CACHE_SIZE
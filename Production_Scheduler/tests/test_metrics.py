@@ -0,0 +1,40 @@
+import pytest
+
+import metrics
+from metrics import metrics_enabled, record_solve
+
+
+def test_disabled_by_environment(monkeypatch):
+    monkeypatch.setenv('SCHEDULER_METRICS', '0')
+    assert not metrics_enabled()
+    record_solve({'status': 'OPTIMAL'})  # No-op
+
+
+def test_disabled_without_prometheus_client(monkeypatch):
+    monkeypatch.setattr(metrics, 'prometheus_client', None)
+    assert not metrics_enabled()
+    record_solve({'status': 'OPTIMAL'})
+
+
+def test_solves_and_cache_lookups_are_counted(monkeypatch):
+    prometheus_client = pytest.importorskip('prometheus_client')
+    monkeypatch.delenv('SCHEDULER_METRICS', raising=False)
+
+    def sample(name, **labels):
+        return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+    solves = sample('scheduler_solves_total', engine='cp_sat', status='OPTIMAL')
+    seconds = sample('scheduler_solve_seconds_count', engine='cp_sat')
+    hits = sample('scheduler_cache_lookups_total', outcome='hit')
+
+    stats = {'total_time': 1.5, 'phases': {'solve': 1.0}, 'model': {'variables': 120},
+             'solver': {'gap': 0.0}}
+    record_solve({'status': 'OPTIMAL', 'stats': stats})
+    record_solve({'status': 'OPTIMAL', 'stats': stats, 'cache': 'hit'})
+
+    assert sample('scheduler_solves_total', engine='cp_sat', status='OPTIMAL') == solves + 2
+    assert sample('scheduler_cache_lookups_total', outcome='hit') == hits + 1
+    # The cache hit solved nothing, so only the first solve is timed
+    assert sample('scheduler_solve_seconds_count', engine='cp_sat') == seconds + 1
+    body, content_type = metrics.render_metrics()
+    assert b'scheduler_model_size' in body and content_type.startswith('text/plain')
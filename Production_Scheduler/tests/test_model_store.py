@@ -0,0 +1,44 @@
+import pytest
+
+from conftest import START_TIME
+from model_store import ModelStore
+from or_tools import CompiledModel, build_model
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+@pytest.fixture
+def compiled(tiny):
+    return build_model(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME)
+
+
+def test_saved_model_solves_like_the_original(compiled):
+    copy = CompiledModel.from_bytes(compiled.to_bytes())
+    original, restored = compiled.solve(SOLVER_CONFIG), copy.solve(SOLVER_CONFIG)
+    assert restored['status'] == original['status'] == 'OPTIMAL'
+    assert restored['makespan'] == original['makespan']
+    assert len(restored['schedule']) == len(original['schedule'])
+
+
+def test_garbage_is_not_a_model():
+    with pytest.raises(ValueError, match='Not a saved model'):
+        CompiledModel.from_bytes(b'not a zip file')
+
+
+def test_least_recently_used_model_is_dropped(compiled):
+    store = ModelStore(max_models=2)
+    first, second = store.put(compiled), store.put(compiled)
+    assert store.get(first) is compiled  # 'first' is now the most recent
+    third = store.put(compiled)
+    assert store.info()['models'] == [first, third]
+    assert store.get(second) is None
+    assert store.get('../../etc/passwd') is None
+
+
+def test_directory_backend_survives_a_new_store(compiled, tmp_path):
+    model_id = ModelStore(path=str(tmp_path)).put(compiled)
+    store = ModelStore(path=str(tmp_path))
+    assert store.get(model_id).solve(SOLVER_CONFIG)['status'] == 'OPTIMAL'
+    assert store.delete(model_id)
+    assert not store.delete(model_id)
+    assert ModelStore(path=str(tmp_path)).get(model_id) is None
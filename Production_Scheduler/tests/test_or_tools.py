@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from conftest import START_TIME, check_schedule
+from or_tools import _circuit_arcs, build_model, solve_schedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1, 'random_seed': 0}
+
+
+def test_circuit_and_pairwise_reach_the_same_optimum(tiny):
+    results = {}
+    for sequencing in ('pairwise', 'circuit'):
+        results[sequencing] = solve_schedule(tiny['machines'], tiny['products'], tiny['setup_times'],
+                                             tiny['orders'], START_TIME, sequencing=sequencing,
+                                             solver_config=SOLVER_CONFIG)
+        assert results[sequencing]['status'] == 'OPTIMAL'
+    assert results['circuit']['makespan'] == results['pairwise']['makespan']
+    assert results['circuit']['total_violation_hours'] == results['pairwise']['total_violation_hours']
+
+
+def test_circuit_is_built_where_most_pairs_carry_a_setup(tiny):
+    compiled = build_model(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                           sequencing='circuit')
+    assert compiled.stats['model']['constraints_by_type'].get('Circuit') == 2
+
+
+def test_circuit_falls_back_to_pairwise_on_sparse_setups(small):
+    stats = {}
+    for sequencing in ('pairwise', 'circuit'):
+        compiled = build_model(small['machines'], small['products'], small['setup_times'], small['orders'],
+                               START_TIME, sequencing=sequencing)
+        stats[sequencing] = compiled.stats['model']
+    assert 'Circuit' not in stats['circuit']['constraints_by_type']
+    assert stats['circuit']['variables'] == stats['pairwise']['variables']
+
+
+def test_circuit_is_chosen_and_smaller_with_interchangeable_units(tiny):
+    orders = [dict(order, quantity=4) for order in tiny['orders']]
+    stats = {}
+    for sequencing in ('pairwise', 'circuit'):
+        compiled = build_model(tiny['machines'], tiny['products'], tiny['setup_times'], orders, START_TIME,
+                               sequencing=sequencing)
+        stats[sequencing] = compiled.stats['model']
+    assert stats['circuit']['circuit_machines'] == 2
+    assert stats['circuit']['variables'] + stats['circuit']['constraints'] < \
+        stats['pairwise']['variables'] + stats['pairwise']['constraints']
+
+
+def test_circuit_with_ordered_units_keeps_the_optimum(tiny):
+    orders = [dict(order, quantity=2) for order in tiny['orders']]
+    results = {}
+    for sequencing in ('pairwise', 'circuit'):
+        results[sequencing] = solve_schedule(tiny['machines'], tiny['products'], tiny['setup_times'], orders,
+                                             START_TIME, sequencing=sequencing, solver_config=SOLVER_CONFIG)
+        assert results[sequencing]['status'] == 'OPTIMAL'
+        check_schedule(results[sequencing]['schedule'], tiny['setup_times'])
+    assert results['circuit']['makespan'] == results['pairwise']['makespan']
+    assert results['circuit']['total_violation_hours'] == results['pairwise']['total_violation_hours']
+
+
+def _task(order_index, step, first_unit, product_id, symmetric=False, time_window=(0, 100)):
+    return {'order_index': order_index, 'step': step, 'first_unit': first_unit, 'units': 1,
+            'product_id': product_id, 'symmetric': symmetric, 'presence': None, 'time_window': time_window}
+
+
+def test_circuit_arcs_drop_recipe_order_later_units_and_time_windows():
+    setup_matrix = np.array([[0, 2], [2, 0]])
+    tasks = [_task(0, 0, 0, 0), _task(0, 1, 0, 0), _task(0, 2, 0, 0),  # One unit, three steps here
+             _task(1, 0, 0, 1, symmetric=True), _task(1, 0, 1, 1, symmetric=True),
+             _task(1, 0, 2, 1, symmetric=True),
+             _task(2, 0, 0, 1, time_window=(99, 100))]  # Ends too late to precede a product change
+    arcs, unit_order = _circuit_arcs(tasks, setup_matrix)
+    pairs = {(i, j) for i, j, _ in arcs}
+    assert (0, 1) in pairs and (1, 2) in pairs
+    assert (1, 0) not in pairs and (0, 2) not in pairs  # Backwards, and past step 1
+    assert unit_order == [(3, 4), (4, 5)]
+    assert (3, 4) in pairs and (4, 3) not in pairs and (3, 5) not in pairs
+    assert (6, 0) not in pairs and (6, 3) in pairs  # Same product: no setup
+    assert dict(((i, j), hours) for i, j, hours in arcs)[(0, 3)] == 2
+    assert _circuit_arcs(tasks, np.zeros((2, 2), dtype=int)) is None
+
+
+def test_setup_time_stage_needs_a_model_built_for_it(tiny):
+    compiled = build_model(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                           sequencing='circuit', objective='lexicographic')
+    with pytest.raises(ValueError, match='setup_time'):
+        compiled.solve(SOLVER_CONFIG, stages=['setup_time'])
+
+
+def test_horizon_cut_is_skipped_with_a_deviation_penalty():
+    from benchmark import make_instance
+    instance = make_instance('small', 2)  # The greedy bound cuts this horizon
+    args = (instance['machines'], instance['products'], instance['setup_times'], instance['orders'], START_TIME)
+    cut = build_model(*args).stats['domains']
+    assert cut['horizon'] < cut['horizon_before']
+    assert cut['greedy_makespan'] is not None
+
+    reference = solve_schedule(*args, solver_config=SOLVER_CONFIG)['schedule']
+    domains = build_model(*args, reference_schedule=reference, deviation_weight=1).stats['domains']
+    assert domains['horizon'] == domains['horizon_before']
+
+
+def test_horizon_cut_needs_a_greedy_schedule_without_violations():
+    from benchmark import make_instance
+    instance = make_instance('small', 2)
+    orders = [dict(order, deadline=1) for order in instance['orders']]  # Every order late
+    domains = build_model(instance['machines'], instance['products'], instance['setup_times'], orders,
+                          START_TIME).stats['domains']
+    assert domains['greedy_violation_hours'] > 0
+    assert domains['horizon'] == domains['horizon_before']
+
+
+def test_greedy_schedule_is_hinted_after_a_horizon_cut():
+    from benchmark import make_instance
+    instance = make_instance('small', 2)
+    compiled = build_model(instance['machines'], instance['products'], instance['setup_times'],
+                           instance['orders'], START_TIME)
+    assert compiled.stats['warm_start']['hinted_tasks'] == compiled.num_tasks
@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import START_TIME, check_schedule
+from or_tools import solve_schedule
+from rescheduling import reschedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+@pytest.fixture
+def plan(tiny):
+    return solve_schedule(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                          solver_config=SOLVER_CONFIG)
+
+
+def _reschedule(tiny, plan, now, events=(), **kwargs):
+    return reschedule(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], None, plan, now,
+                      events=events, solver_config=SOLVER_CONFIG, **kwargs)
+
+
+def _rows(result):
+    return {(row['order_index'], row['step'], row['unit']): row for row in result['schedule']}
+
+
+def test_without_events_the_plan_is_kept(tiny, plan):
+    result = _reschedule(tiny, plan, now=0)
+    assert result['reschedule']['moved_tasks'] == 0
+    assert result['makespan'] == plan['makespan']
+
+
+def test_started_tasks_stay_and_the_tail_starts_after_now(tiny, plan):
+    now = 3
+    result = _reschedule(tiny, plan, now, events=[{'type': 'machine_down', 'machine': 'M2',
+                                                   'start': now, 'end': now + 4}])
+    check_schedule(result['schedule'], tiny['setup_times'])
+    new_rows = _rows(result)
+    for key, old in _rows(plan).items():
+        new = new_rows[key]
+        if old['start'] < now:
+            assert (new['start'], new['machine']) == (old['start'], old['machine'])
+        else:
+            assert new['start'] >= now
+        if new['machine'] == 'M2' and new['start'] >= now:
+            assert new['start'] >= now + 4 or new['end'] <= now
+    assert result['reschedule']['pinned_tasks'] == sum(1 for row in plan['schedule'] if row['start'] < now)
+
+
+def test_cancelled_and_new_orders(tiny, plan):
+    new_order = {'product': 'A', 'quantity': 1, 'deadline': 30}
+    result = _reschedule(tiny, plan, now=0, events=[{'type': 'cancel_order', 'order_index': 1},
+                                                    {'type': 'new_order', 'order': new_order}])
+    assert result['orders'] == [tiny['orders'][0], tiny['orders'][2], tiny['orders'][3], new_order]
+    assert result['reschedule']['order_index_map'] == {0: 0, 2: 1, 3: 2}
+    assert {row['order_index'] for row in result['schedule']} == {0, 1, 2, 3}
+    check_schedule(result['schedule'], tiny['setup_times'])
+
+
+def test_unknown_events_are_rejected(tiny, plan):
+    with pytest.raises(ValueError, match='Unknown event type'):
+        _reschedule(tiny, plan, now=0, events=[{'type': 'earthquake'}])
+    with pytest.raises(ValueError, match='unknown machine'):
+        _reschedule(tiny, plan, now=0, events=[{'type': 'machine_down', 'machine': 'M9', 'start': 0, 'end': 1}])
+    with pytest.raises(ValueError, match='unknown order_index'):
+        _reschedule(tiny, plan, now=0, events=[{'type': 'cancel_order', 'order_index': 9}])
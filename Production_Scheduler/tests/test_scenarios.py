@@ -0,0 +1,74 @@
+import copy
+
+import pytest
+
+from conftest import START_TIME
+from scenarios import COMPARISON_COLUMNS, apply_patch, compare_results, solve_many
+
+
+def _base(problem):
+    return dict(problem, solve_kwargs={'solver_config': {'time_limit': 10, 'num_workers': 1}})
+
+
+def test_patch_leaves_the_base_untouched(tiny):
+    base = _base(tiny)
+    before = copy.deepcopy(base)
+    machines, _, _, orders, options = apply_patch(base, {
+        'remove_machines': ['M2'],
+        'add_machines': [{'name': 'M3', 'operations': ['paint']}],
+        'update_orders': {'1': {'quantity': 3}},
+        'remove_orders': [0],
+        'add_orders': [{'product': 'A', 'quantity': 1, 'deadline': 10}],
+        'deadline_shift': -2,
+        'quantity_factor': 2,
+        'options': {'flexible': True, 'solver_config': {'time_limit': 1}},
+    })
+    assert base == before
+    assert [m['name'] for m in machines] == ['M1', 'M3']
+    assert [(o['product'], o['quantity'], o['deadline']) for o in orders] == \
+        [('B', 6, 10), ('C', 2, 2), ('D', 2, 18), ('A', 2, 8)]
+    assert options == {'flexible': True, 'solver_config': {'time_limit': 1, 'num_workers': 1}}
+
+
+def test_setup_overrides_replace_single_pairs(tiny):
+    _, products, setup_times, _, _ = apply_patch(_base(tiny), {'setup_overrides': {'A-B': 7, 'B-A': 0}})
+    assert setup_times.between('A', 'B') == 7
+    assert setup_times.between('B', 'A') == 0
+    assert setup_times.between('A', 'C') == tiny['setup_times']['A-C']
+
+
+def test_unknown_order_index_is_rejected(tiny):
+    with pytest.raises(ValueError, match='unknown order index'):
+        apply_patch(_base(tiny), {'update_orders': {9: {'quantity': 2}}})
+
+
+def test_changes_are_relative_to_the_reference():
+    results = [{'status': 'OPTIMAL', 'makespan': 20, 'total_violation_hours': 4, 'deadline_violations': [{}]},
+               {'status': 'OPTIMAL', 'makespan': 17, 'total_violation_hours': 0, 'deadline_violations': []},
+               {'status': 'ERROR', 'message': 'ValueError: bad'}]
+    rows = compare_results(['base', 'extra machine', 'broken'], results, reference=0)
+    assert all(tuple(row) == COMPARISON_COLUMNS for row in rows)
+    assert [(row['makespan_change'], row['violation_change'], row['late_orders']) for row in rows] == \
+        [(0, 0, 1), (-3, -4, 0), (None, None, None)]
+    assert rows[2]['error'] == 'ValueError: bad'
+
+
+def test_unknown_patch_keys_are_rejected(tiny):
+    with pytest.raises(ValueError, match='unknown patch keys'):
+        solve_many(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                   [{'name': 'typo', 'dedline_shift': 4}])
+
+
+def test_scenarios_are_solved_in_worker_processes(tiny):
+    batch = solve_many(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                       [{'name': 'later deadlines', 'deadline_shift': 20},
+                        {'name': 'broken', 'update_orders': {9: {'quantity': 2}}}],
+                       max_processes=1, solver_config={'time_limit': 10, 'num_workers': 1})
+    base, relaxed, broken = batch['comparison']
+    assert [row['scenario'] for row in batch['comparison']] == ['base', 'later deadlines', 'broken']
+    assert relaxed['violation_hours'] == 0 and relaxed['violation_change'] <= 0
+    assert base['status'] == 'OPTIMAL' and base['orders'] == 4
+    assert 'schedule' not in batch['results'][0]
+    assert batch['parallelism'] == {'processes': 1, 'workers_per_scenario': 1}
+    # A failing scenario becomes an error row instead of failing the batch
+    assert broken['status'] == 'ERROR' and 'unknown order index' in broken['error']
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from setup_matrix import SetupMatrix, as_setup_matrix
+
+
+def test_keys_split_at_the_hyphen_between_known_names():
+    products = ['Steel-Plate', 'Steel', 'Plate-X']
+    matrix = SetupMatrix.from_dict({'Steel-Plate-Plate-X': 3, 'Steel-Steel-Plate': 2, 'Steel-Nope': 9}, products)
+    assert matrix.between('Steel-Plate', 'Plate-X') == 3
+    assert matrix.between('Steel', 'Steel-Plate') == 2
+    assert len(matrix) == 2  # Keys naming unknown products are skipped
+
+
+def test_keys_without_products_need_exactly_one_hyphen():
+    matrix = SetupMatrix.from_dict({'A-B': 1, 'B-C': 2})
+    assert matrix.products == ['A', 'B', 'C']
+    assert matrix.between('B', 'C') == 2
+    with pytest.raises(ValueError, match='Ambiguous'):
+        SetupMatrix.from_dict({'A-B-C': 1})
+
+
+def test_dense_and_sparse_agree():
+    setup_times = {'A-B': 1, 'B-A': 4, 'C-A': 2}
+    sparse = as_setup_matrix(setup_times, ['A', 'B', 'C'])
+    dense = SetupMatrix(sparse.products, matrix=sparse.dense())
+    for p in 'ABC':
+        for q in 'ABC':
+            assert sparse.between(p, q) == dense.between(p, q) == setup_times.get(f'{p}-{q}', 0)
+    assert sparse.max_from('B') == dense.max_from('B') == 4
+    assert sparse.between('A', 'unknown') == 0
+    np.testing.assert_array_equal(sparse.dense(['C', 'X', 'A']), [[0, 0, 2], [0, 0, 0], [0, 0, 0]])
+
+
+def test_pair_entries_win_over_family_defaults():
+    matrix = SetupMatrix(['red', 'pink', 'blue'], pairs=[('red', 'blue', 1)],
+                         families={'red': 'warm', 'pink': 'warm', 'blue': 'cold'},
+                         family_times={'warm': {'cold': 5, 'warm': 2}, 'cold': {'warm': 3}})
+    assert matrix.between('red', 'blue') == 1
+    assert matrix.between('pink', 'blue') == 5
+    assert matrix.between('red', 'pink') == 2
+    assert matrix.between('red', 'red') == 0
+    assert matrix.max_from('pink') == 5
+    assert matrix.dense().tolist() == [[0, 2, 1], [2, 0, 5], [3, 3, 0]]
+
+
+def test_json_round_trip():
+    matrix = SetupMatrix(['A', 'B'], pairs=[('A', 'B', 2)], families={'A': 'f', 'B': 'g'},
+                         family_times={'g': {'f': 7}})
+    copy = as_setup_matrix(matrix.to_json())
+    assert copy.dense().tolist() == matrix.dense().tolist() == [[0, 2], [7, 0]]
+    assert SetupMatrix.from_dict(matrix.to_dict(), ['A', 'B']).dense().tolist() == [[0, 2], [7, 0]]
+
+
+def test_duplicate_names_resolve_to_the_first_position():
+    matrix = SetupMatrix(['A', 'B', 'A'], pairs=[('A', 'B', 3)])
+    assert matrix.index('A') == 0
+    assert matrix.between('A', 'B') == 3
+    assert SetupMatrix.from_dict({'A-B': 1}, ['A', 'B', 'A']).products == ['A', 'B']
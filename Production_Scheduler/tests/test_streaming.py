@@ -0,0 +1,52 @@
+from conftest import START_TIME
+from streaming import DIFF_COLUMNS, SolveStream, _row_key, apply_schedule_diff, schedule_diff
+
+
+def _row(order_index, step, unit, machine, start, end):
+    return {'order_index': order_index, 'step': step, 'unit': unit, 'order': 'A', 'operation': 'cut',
+            'machine': machine, 'start': start, 'end': end, 'setup_time': 0}
+
+
+def _trimmed(row):
+    return {column: row[column] for column in DIFF_COLUMNS}
+
+
+def test_diff_contains_only_new_moved_and_removed_rows():
+    previous = [_row(0, 0, 0, 'M1', 0, 2), _row(0, 1, 0, 'M2', 2, 4), _row(1, 0, 0, 'M1', 2, 3)]
+    current = [_row(0, 0, 0, 'M1', 0, 2), _row(0, 1, 0, 'M2', 3, 5), _row(2, 0, 0, 'M1', 5, 6)]
+    diff = schedule_diff({_row_key(row): row for row in previous}, current)
+    assert diff['columns'] == list(DIFF_COLUMNS)
+    assert [values[:3] for values in diff['changed']] == [[0, 1, 0], [2, 0, 0]]
+    assert diff['removed'] == [[1, 0, 0]]
+
+
+def test_applying_diffs_rebuilds_every_solution():
+    solutions = [
+        [_row(0, 0, 0, 'M1', 0, 2), _row(1, 0, 0, 'M1', 2, 3)],
+        [_row(1, 0, 0, 'M1', 0, 1), _row(0, 0, 0, 'M1', 1, 3)],
+        [_row(1, 0, 0, 'M2', 0, 1), _row(0, 0, 0, 'M1', 0, 2), _row(0, 1, 0, 'M2', 2, 4)],
+    ]
+    sender, receiver = {}, {}
+    for schedule in solutions:
+        apply_schedule_diff(receiver, schedule_diff(sender, schedule))
+        sender = {_row_key(row): row for row in schedule}
+        assert receiver == {key: _trimmed(row) for key, row in sender.items()}
+
+
+def test_empty_diff_for_an_unchanged_solution():
+    schedule = [_row(0, 0, 0, 'M1', 0, 2)]
+    diff = schedule_diff({_row_key(row): row for row in schedule}, schedule)
+    assert diff['changed'] == [] and diff['removed'] == []
+
+
+def test_stream_ends_with_the_result(tiny):
+    stream = SolveStream(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                         diff=True, solver_config={'time_limit': 10, 'num_workers': 1})
+    events = list(stream)
+    kind, result = events[-1]
+    assert kind == 'result' and result['status'] == 'OPTIMAL'
+    rows = {}
+    for kind, progress in events[:-1]:
+        assert kind == 'progress'
+        apply_schedule_diff(rows, progress['diff'])
+    assert rows == {_row_key(row): _trimmed(row) for row in result['schedule']}
@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import START_TIME
+from dispatching import solve_dispatch
+from or_tools import solve_schedule
+from validation import summarize, validate_problem
+
+
+def _late_orders(result):
+    return len(result['deadline_violations'])
+
+
+def test_bounds_hold_for_the_optimal_schedule(tiny):
+    args = (tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME)
+    report = validate_problem(*args)
+    result = solve_schedule(*args, solver_config={'time_limit': 10, 'num_workers': 1})
+    assert report['valid'] and report['errors'] == []
+    assert result['status'] == 'OPTIMAL'
+    assert 0 < report['lower_bounds']['makespan'] <= result['makespan']
+    assert report['lower_bounds']['total_tardiness'] <= result['total_violation_hours']
+
+
+@pytest.mark.parametrize('options', [{}, {'batching': True, 'sublots': 2}, {'flexible': True}])
+def test_bounds_hold_for_every_schedule(small, options):
+    # Tight deadlines so the tardiness bound is not trivially zero
+    orders = [dict(order, deadline=max(1, order['deadline'] // 4)) for order in small['orders']]
+    args = (small['machines'], small['products'], small['setup_times'], orders, START_TIME)
+    report = validate_problem(*args, **options)
+    assert report['late_orders'] > 0
+    for rule in ('EDD', 'SETUP'):
+        result = solve_dispatch(*args, rule=rule, **options)
+        assert report['lower_bounds']['makespan'] <= result['makespan']
+        assert report['lower_bounds']['total_tardiness'] <= result['total_violation_hours']
+        assert report['late_orders'] <= _late_orders(result)
+
+
+def test_issue_codes(tiny):
+    machines = tiny['machines'] + [{'name': 'M1', 'operations': ['cut']}]
+    products = tiny['products'] + [{'name': 'A', 'tasks': []}, {'name': 'E', 'tasks': []},
+                                   {'name': 'F', 'tasks': [{'operation': 'weld', 'duration': 1}]}]
+    orders = tiny['orders'] + [{'product': 'X', 'quantity': 1, 'deadline': 5},
+                               {'product': 'A', 'quantity': 0, 'deadline': 5},
+                               {'product': 'F', 'quantity': 1, 'deadline': 5},
+                               {'product': 'B', 'quantity': 9, 'deadline': 3}]
+    report = validate_problem(machines, products, tiny['setup_times'], orders)
+    assert not report['valid']
+    assert {issue['code'] for issue in report['errors']} == \
+        {'unknown_product', 'invalid_order', 'uncovered_operation'}
+    assert {issue['code'] for issue in report['warnings']} == \
+        {'duplicate_machine', 'duplicate_product', 'empty_recipe', 'machine_overloaded', 'guaranteed_late'}
+    assert summarize(report).startswith("Input check: 1 x duplicate_machine")
+
+    bad_setups = {'products': ['A', 'B'], 'matrix': [[0, 1]]}
+    report = validate_problem(tiny['machines'], tiny['products'], bad_setups, tiny['orders'])
+    assert [issue['code'] for issue in report['errors']] == ['invalid_setup_times']
+
+
+def test_calendars_reduce_the_available_hours(tiny):
+    calendars = {'default': {'shifts': [{'days': 'daily', 'start': '08:00', 'end': '16:00'}]}}
+    report = validate_problem(tiny['machines'], tiny['products'], tiny['setup_times'], tiny['orders'], START_TIME,
+                              calendars=calendars)
+    assert report['horizon'] == 20
+    assert [row['available'] for row in report['machine_load']] == [8, 8]
+    assert summarize(validate_problem(tiny['machines'], tiny['products'], tiny['setup_times'],
+                                      tiny['orders'])) == "No problems found in the input"
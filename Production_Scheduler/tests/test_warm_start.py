@@ -0,0 +1,52 @@
+from conftest import START_TIME
+from or_tools import solve_schedule
+
+SOLVER_CONFIG = {'time_limit': 10, 'num_workers': 1}
+
+
+def _solve(problem, **kwargs):
+    return solve_schedule(problem['machines'], problem['products'], problem['setup_times'], problem['orders'],
+                          START_TIME, solver_config=SOLVER_CONFIG, **kwargs)
+
+
+def test_previous_schedule_hints_every_task(tiny):
+    prior = _solve(tiny)
+    result = _solve(tiny, warm_start=prior)
+    assert result['warm_start'] == {'hinted_tasks': 8, 'unmatched_tasks': 0, 'hinted_variables': 16,
+                                    'prior_rows': 8}
+    assert result['makespan'] == prior['makespan']
+    # A bare schedule list works as well
+    assert _solve(tiny, warm_start=prior['schedule'])['warm_start']['hinted_tasks'] == 8
+
+
+def test_new_orders_are_left_unhinted(tiny):
+    prior = _solve(tiny)
+    orders = tiny['orders'] + [{'product': 'A', 'quantity': 2, 'deadline': 30}]
+    result = _solve(dict(tiny, orders=orders), warm_start=prior)
+    assert result['warm_start']['hinted_tasks'] == 8
+    assert result['warm_start']['unmatched_tasks'] == 4  # Two units of two steps
+    assert result['status'] == 'OPTIMAL'
+
+
+def test_flexible_tasks_also_hint_their_machine(tiny):
+    machines = tiny['machines'] + [{'name': 'M3', 'operations': ['cut']}]
+    problem = dict(tiny, machines=machines)
+    prior = _solve(problem, flexible=True)
+    stats = _solve(problem, flexible=True, warm_start=prior)['warm_start']
+    # Start and end per task, plus one presence literal per cutter for the 4 cuts
+    assert stats['hinted_tasks'] == 8
+    assert stats['hinted_variables'] == 16 + 4 * 2
+
+
+def test_rows_without_unit_keys_are_ignored(tiny):
+    prior = _solve(tiny)['schedule']
+    legacy = [{key: value for key, value in row.items() if key not in ('order_index', 'unit')} for row in prior]
+    stats = _solve(tiny, warm_start=legacy)['warm_start']
+    assert stats['hinted_tasks'] == 0
+    assert stats['prior_rows'] == 8
+
+
+def test_dispatch_warm_start_hints_the_greedy_schedule(small):
+    result = _solve(small, warm_start='dispatch', tighten_domains=False)
+    assert result['warm_start']['unmatched_tasks'] == 0
+    assert result['warm_start']['hinted_tasks'] == result['warm_start']['prior_rows']
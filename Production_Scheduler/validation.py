@@ -0,0 +1,217 @@
+"""
+Pre-Solve Validation
+====================
+Fast checks of a scheduling problem before any model is built, so broken
+inputs are reported in milliseconds instead of surfacing as skipped work or
+a bare INFEASIBLE after a long solve.
+
+Errors (work the solvers would silently drop, or inputs they cannot use):
+    unknown_product        Order for a product without a recipe
+    uncovered_operation    Recipe step no machine can perform
+    invalid_order          Quantity or deadline missing or below 1
+    invalid_setup_times    Setup times that cannot be read
+Warnings (the problem solves, but not as the input suggests):
+    duplicate_machine / duplicate_product   Only the first definition is used
+    empty_recipe           Product without tasks
+    machine_overloaded     More work than the machine has hours up to the
+                           last deadline: some orders will be late
+    guaranteed_late        Order whose lower bound exceeds its deadline
+
+Lower bounds ignore setup times and machine contention between orders, so
+they never exceed the true value. Per order and recipe step s (shortest
+duration d over its machines, k machines in flexible mode, else 1):
+
+    bound = max over s of  lot * (work before s) + ceil(quantity * d_s / k) + lot * (work after s)
+
+with lot the smallest lot (1 without batching): all units pass step s,
+the first one has to get there and the last one has to finish after it.
+"""
+
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+from calendars import machine_calendars
+from or_tools import get_master_data_index
+from setup_matrix import as_setup_matrix
+
+# Issues of one code listed individually before the rest are only counted
+MAX_ISSUES_PER_CODE = 50
+
+
+def validate_problem(machines, products, setup_times, orders, start_time=None, batching=False, sublots=1,
+                     flexible=False, calendars=None, machine_unavailable=None):
+    """
+    Analyzes a scheduling problem without solving it.
+
+    Args:
+        machines, products, setup_times, orders, start_time, batching,
+            sublots, flexible, calendars, machine_unavailable: As for
+            solve_schedule (start_time only matters with calendars)
+
+    Returns:
+        Dict with:
+            'valid': False if there are errors
+            'errors' / 'warnings': Issue dicts with 'code' and 'message'
+                (plus details); at most MAX_ISSUES_PER_CODE per code
+            'issue_counts': code -> number of issues, including unlisted ones
+            'horizon': Last order deadline (hours), the capacity reference
+            'machine_load': Per machine 'load' (hours of work; flexible
+                tasks spread evenly over their machines), 'available'
+                (working hours up to the horizon) and 'utilization'
+            'lower_bounds': 'makespan' and 'total_tardiness' (hours)
+            'late_orders': Number of orders that are late in every schedule
+            'elapsed': Seconds the analysis took
+    """
+    started = perf_counter()
+    issues = []
+    counts = Counter()
+
+    def add(severity, code, message, **details):
+        counts[code] += 1
+        if counts[code] <= MAX_ISSUES_PER_CODE:
+            issues.append({'severity': severity, 'code': code, 'message': message, **details})
+
+    # Master data
+    for name, count in Counter(m['name'] for m in machines).items():
+        if count > 1:
+            add('warning', 'duplicate_machine', f"Machine '{name}' is defined {count} times", machine=name)
+    for name, count in Counter(p['name'] for p in products).items():
+        if count > 1:
+            add('warning', 'duplicate_product', f"Product '{name}' is defined {count} times; the first is used",
+                product=name)
+    try:
+        as_setup_matrix(setup_times, products)
+    except (ValueError, KeyError, TypeError) as e:
+        add('error', 'invalid_setup_times', f"Setup times cannot be read: {e}")
+
+    index = get_master_data_index(machines, products)
+    recipe_options = index['recipe_options']
+    for name, product in index['product_by_name'].items():
+        if not product['tasks']:
+            add('warning', 'empty_recipe', f"Product '{name}' has no tasks", product=name)
+
+    # Orders, grouped by product
+    quantities = defaultdict(list)  # product -> quantities of its valid orders
+    order_indices = defaultdict(list)
+    unknown = defaultdict(list)
+    for order_index, order in enumerate(orders):
+        quantity, deadline = order.get('quantity'), order.get('deadline')
+        if not isinstance(quantity, int) or not isinstance(deadline, (int, float)) or quantity < 1 \
+                or deadline < 1:
+            add('error', 'invalid_order', f"Order {order_index}: quantity and deadline must be at least 1 "
+                f"(got {quantity!r}, {deadline!r})", order_index=order_index)
+        elif order.get('product') not in index['product_by_name']:
+            unknown[order.get('product')].append(order_index)
+        else:
+            quantities[order['product']].append(quantity)
+            order_indices[order['product']].append(order_index)
+    for product, indices in unknown.items():
+        add('error', 'unknown_product', f"{len(indices)} order(s) for unknown product '{product}' would be "
+            f"skipped", product=product, orders=indices[:MAX_ISSUES_PER_CODE])
+
+    horizon = max((order['deadline'] for order in orders
+                   if isinstance(order.get('deadline'), (int, float))), default=0)
+    machine_load = dict.fromkeys((m['name'] for m in machines), 0.0)
+    order_bounds = {}  # order index -> lower bound on its completion
+    for product, product_quantities in quantities.items():
+        options = recipe_options[product]
+        tasks = index['product_by_name'][product]['tasks']
+        covered = []
+        for step, (task, step_options) in enumerate(zip(tasks, options)):
+            if step_options:
+                covered.append(step_options if flexible else step_options[:1])
+            else:
+                add('error', 'uncovered_operation', f"No machine can perform '{task['operation']}' (step {step} "
+                    f"of '{product}'); it would be skipped in {len(product_quantities)} order(s)",
+                    product=product, operation=task['operation'], step=step)
+        if not covered:
+            continue
+
+        quantity = np.asarray(product_quantities, dtype=np.int64)
+        durations = np.array([min(d for _, d in step_options) for step_options in covered], dtype=np.int64)
+        machine_counts = np.array([len(step_options) for step_options in covered], dtype=np.int64)
+        if batching:
+            smallest_lot = quantity // np.minimum(sublots, quantity)  # As _split_into_lots
+        else:
+            smallest_lot = np.ones(len(quantity), dtype=np.int64)
+
+        # Bound per order (rows) and bottleneck step (columns)
+        before = np.concatenate(([0], np.cumsum(durations)[:-1]))
+        after = durations.sum() - before - durations
+        bottleneck = -(-quantity[:, None] * durations[None, :] // machine_counts[None, :])
+        bounds = (smallest_lot[:, None] * (before + after)[None, :] + bottleneck).max(axis=1)
+        order_bounds.update(zip(order_indices[product], bounds.tolist()))
+
+        total = int(quantity.sum())
+        for step_options in covered:
+            for machine, duration in step_options:
+                machine_load[machine['name']] += total * duration / len(step_options)
+
+    # Capacity up to the last deadline
+    machine_calendar = {}
+    if calendars or machine_unavailable:
+        try:
+            machine_calendar = machine_calendars(machines, calendars, _start_datetime(start_time),
+                                                 machine_unavailable)
+        except ValueError as e:
+            add('error', 'invalid_calendar', str(e))
+    load_report = []
+    for name, load in machine_load.items():
+        available = horizon
+        if name in machine_calendar:
+            available -= sum(end - start for start, end in machine_calendar[name].blocked(horizon))
+        utilization = load / available if available > 0 else (math.inf if load else 0.0)
+        load_report.append({'machine': name, 'load': round(load, 2), 'available': available,
+                            'utilization': round(utilization, 3) if math.isfinite(utilization) else None})
+        if load > available:
+            add('warning', 'machine_overloaded', f"Machine '{name}' has {load:.0f}h of work but only "
+                f"{available}h up to the last deadline", machine=name, load=round(load, 2), available=available)
+
+    # Orders late in every schedule
+    late_orders = 0
+    total_tardiness = 0
+    for order_index, bound in order_bounds.items():
+        deadline = orders[order_index]['deadline']
+        if bound > deadline:
+            late_orders += 1
+            total_tardiness += bound - deadline
+            add('warning', 'guaranteed_late', f"Order {order_index} ('{orders[order_index]['product']}') "
+                f"needs at least {bound}h but is due at {deadline}h", order_index=order_index,
+                lower_bound=bound, deadline=deadline)
+
+    errors, warnings = [], []
+    for issue in issues:
+        (errors if issue.pop('severity') == 'error' else warnings).append(issue)
+    makespan_bound = max(list(order_bounds.values()) + ([max(machine_load.values())] if not flexible and
+                                                         machine_load else []), default=0)
+    return {
+        'valid': not errors,
+        'errors': errors,
+        'warnings': warnings,
+        'issue_counts': dict(counts),
+        'horizon': horizon,
+        'machine_load': load_report,
+        'lower_bounds': {'makespan': math.ceil(makespan_bound), 'total_tardiness': total_tardiness},
+        'late_orders': late_orders,
+        'elapsed': perf_counter() - started,
+    }
+
+
+def summarize(report):
+    """
+    One-line summary of a validation report, e.g. for failure messages.
+    """
+    if not report['errors'] and not report['warnings']:
+        return "No problems found in the input"
+    parts = [f"{count} x {code}" for code, count in report['issue_counts'].items()]
+    return "Input check: " + ', '.join(parts)
+
+
+def _start_datetime(start_time):
+    if isinstance(start_time, str):
+        return datetime.fromisoformat(start_time)
+    return start_time if isinstance(start_time, datetime) else datetime.now()